@@ -48,7 +48,7 @@ export default function AdminBooksPage() {
 
   const loadBooks = async () => {
     setLoading(true)
-    const result = await getAllBooks(filters, 1, 100)
+    const result = await getAllBooks(filters, { limit: 100 })
     setBooks(result.data)
     setLoading(false)
   }
@@ -12,12 +12,15 @@ import {
 } from '@/components/ui/table'
 import { Badge } from '@/components/ui/badge'
 import { Button } from '@/components/ui/button'
+import { LoadMoreButton } from '@/components/load-more-button'
 import { getAllFines, syncOverdueFines } from '@/lib/actions/fines'
 import { formatDate, formatCurrency } from '@/lib/helpers'
 import type { Fine } from '@/types'
 
 export default function AdminFinesPage() {
   const [fines, setFines] = useState<Fine[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
@@ -29,10 +32,20 @@ export default function AdminFinesPage() {
     // Sync overdue fines first
     await syncOverdueFines()
     const result = await getAllFines()
-    setFines(result)
+    setFines(result.data)
+    setNextCursor(result.nextCursor)
     setLoading(false)
   }
 
+  const loadMore = async () => {
+    if (!nextCursor) return
+    setLoadingMore(true)
+    const result = await getAllFines({ cursor: nextCursor })
+    setFines((current) => [...current, ...result.data])
+    setNextCursor(result.nextCursor)
+    setLoadingMore(false)
+  }
+
   const totalAmount = fines.reduce((sum, fine) => sum + fine.amount, 0)
   const paidAmount = fines.filter((f) => f.paid).reduce((sum, fine) => sum + fine.amount, 0)
   const unpaidAmount = fines.filter((f) => !f.paid).reduce((sum, fine) => sum + fine.amount, 0)
@@ -159,6 +172,8 @@ export default function AdminFinesPage() {
           </Table>
         </div>
       )}
+
+      <LoadMoreButton hasMore={!!nextCursor} loading={loadingMore} onClick={loadMore} />
     </div>
   )
 }
@@ -41,7 +41,7 @@ export default async function AdminLayout({
 }: {
   children: React.ReactNode
 }) {
-  const supabase = await createClient()
+  const supabase = await createClient('app/admin/layout')
   const { data: { user } } = await supabase.auth.getUser()
 
   if (!user) {
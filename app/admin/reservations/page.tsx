@@ -11,12 +11,15 @@ import {
   TableRow,
 } from '@/components/ui/table'
 import { Badge } from '@/components/ui/badge'
+import { LoadMoreButton } from '@/components/load-more-button'
 import { getAllReservations } from '@/lib/actions/reservations'
 import { formatDate, getStatusColor } from '@/lib/helpers'
 import type { Reservation } from '@/types'
 
 export default function AdminReservationsPage() {
   const [reservations, setReservations] = useState<Reservation[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
@@ -26,10 +29,20 @@ export default function AdminReservationsPage() {
   const loadReservations = async () => {
     setLoading(true)
     const result = await getAllReservations()
-    setReservations(result)
+    setReservations(result.data)
+    setNextCursor(result.nextCursor)
     setLoading(false)
   }
 
+  const loadMore = async () => {
+    if (!nextCursor) return
+    setLoadingMore(true)
+    const result = await getAllReservations({ cursor: nextCursor })
+    setReservations((current) => [...current, ...result.data])
+    setNextCursor(result.nextCursor)
+    setLoadingMore(false)
+  }
+
   return (
     <div className="space-y-6">
       <div>
@@ -118,6 +131,8 @@ export default function AdminReservationsPage() {
         </div>
       )}
 
+      <LoadMoreButton hasMore={!!nextCursor} loading={loadingMore} onClick={loadMore} />
+
       <div className="rounded-lg border bg-card p-4">
         <div className="grid grid-cols-4 gap-4 text-sm">
           <div>
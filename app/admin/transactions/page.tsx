@@ -11,12 +11,16 @@ import {
   TableRow,
 } from '@/components/ui/table'
 import { Badge } from '@/components/ui/badge'
+import { LoadMoreButton } from '@/components/load-more-button'
 import { getAllTransactions } from '@/lib/actions/transactions'
 import { formatDate, formatCurrency, getStatusColor } from '@/lib/helpers'
 import type { Transaction } from '@/types'
 
 export default function AdminTransactionsPage() {
   const [transactions, setTransactions] = useState<Transaction[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const [total, setTotal] = useState<number | null>(null)
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
@@ -25,11 +29,22 @@ export default function AdminTransactionsPage() {
 
   const loadTransactions = async () => {
     setLoading(true)
-    const result = await getAllTransactions()
-    setTransactions(result)
+    const result = await getAllTransactions({ count: 'estimated' })
+    setTransactions(result.data)
+    setNextCursor(result.nextCursor)
+    setTotal(result.total)
     setLoading(false)
   }
 
+  const loadMore = async () => {
+    if (!nextCursor) return
+    setLoadingMore(true)
+    const result = await getAllTransactions({ cursor: nextCursor })
+    setTransactions((current) => [...current, ...result.data])
+    setNextCursor(result.nextCursor)
+    setLoadingMore(false)
+  }
+
   return (
     <div className="space-y-6">
       <div>
@@ -132,11 +147,13 @@ export default function AdminTransactionsPage() {
         </div>
       )}
 
+      <LoadMoreButton hasMore={!!nextCursor} loading={loadingMore} onClick={loadMore} />
+
       <div className="rounded-lg border bg-card p-4">
         <div className="grid grid-cols-4 gap-4 text-sm">
           <div>
             <p className="text-muted-foreground">Total Transactions</p>
-            <p className="text-2xl font-bold">{transactions.length}</p>
+            <p className="text-2xl font-bold">{total ?? transactions.length}</p>
           </div>
           <div>
             <p className="text-muted-foreground">Active</p>
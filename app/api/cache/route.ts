@@ -0,0 +1,40 @@
+import { NextResponse } from 'next/server'
+import { createClient } from '@/lib/supabase/server'
+import { clearCache, getCacheStats, resetCacheStats } from '@/lib/cache'
+
+// Hit and miss counters of the catalogue read cache, for staff and the benchmark scripts
+async function isStaff() {
+  const supabase = await createClient('app/api/cache')
+  const { data: { user } } = await supabase.auth.getUser()
+
+  if (!user) {
+    return false
+  }
+
+  const { data: profile } = await supabase
+    .from('profiles')
+    .select('role')
+    .eq('id', user.id)
+    .single()
+
+  return profile?.role === 'admin' || profile?.role === 'librarian'
+}
+
+export async function GET() {
+  if (!(await isStaff())) {
+    return NextResponse.json({ error: 'Forbidden' }, { status: 403 })
+  }
+
+  return NextResponse.json(getCacheStats())
+}
+
+// Empties the cache and zeroes the counters, so the next reads are cold
+export async function DELETE() {
+  if (!(await isStaff())) {
+    return NextResponse.json({ error: 'Forbidden' }, { status: 403 })
+  }
+
+  clearCache()
+  resetCacheStats()
+  return NextResponse.json(getCacheStats())
+}
@@ -46,7 +46,7 @@ export default async function LibrarianLayout({
 }: {
   children: React.ReactNode
 }) {
-  const supabase = await createClient()
+  const supabase = await createClient('app/librarian/layout')
   const { data: { user } } = await supabase.auth.getUser()
 
   if (!user) {
@@ -12,6 +12,7 @@ import {
 } from '@/components/ui/table'
 import { Button } from '@/components/ui/button'
 import { Badge } from '@/components/ui/badge'
+import { LoadMoreButton } from '@/components/load-more-button'
 import { getAllReservations, fulfillReservation, cancelReservation } from '@/lib/actions/reservations'
 import { formatDate, getStatusColor } from '@/lib/helpers'
 import { toast } from 'sonner'
@@ -19,6 +20,8 @@ import type { Reservation } from '@/types'
 
 export default function LibrarianReservationsPage() {
   const [reservations, setReservations] = useState<Reservation[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [loading, setLoading] = useState(true)
   const [processing, setProcessing] = useState<string | null>(null)
 
@@ -29,10 +32,20 @@ export default function LibrarianReservationsPage() {
   const loadReservations = async () => {
     setLoading(true)
     const result = await getAllReservations()
-    setReservations(result)
+    setReservations(result.data)
+    setNextCursor(result.nextCursor)
     setLoading(false)
   }
 
+  const loadMore = async () => {
+    if (!nextCursor) return
+    setLoadingMore(true)
+    const result = await getAllReservations({ cursor: nextCursor })
+    setReservations((current) => [...current, ...result.data])
+    setNextCursor(result.nextCursor)
+    setLoadingMore(false)
+  }
+
   const handleFulfill = async (id: string) => {
     setProcessing(id)
     try {
@@ -236,6 +249,8 @@ export default function LibrarianReservationsPage() {
             </div>
           )}
 
+          <LoadMoreButton hasMore={!!nextCursor} loading={loadingMore} onClick={loadMore} />
+
           {/* Summary */}
           <div className="rounded-lg border bg-card p-4">
             <div className="grid grid-cols-4 gap-4 text-sm">
@@ -48,7 +48,7 @@ export default function ReturnBookPage() {
   const handleReturn = async (transactionId: string) => {
     setReturning(transactionId)
     try {
-      const result = await returnBook(transactionId, 'librarian')
+      const result = await returnBook(transactionId)
       if (result.success) {
         toast.success(result.message)
         // Remove from list
@@ -18,12 +18,15 @@ import {
   SelectValue,
 } from '@/components/ui/select'
 import { Badge } from '@/components/ui/badge'
+import { LoadMoreButton } from '@/components/load-more-button'
 import { getAllTransactions } from '@/lib/actions/transactions'
 import { formatDate, formatCurrency, getStatusColor } from '@/lib/helpers'
 import type { Transaction } from '@/types'
 
 export default function LibrarianTransactionsPage() {
   const [transactions, setTransactions] = useState<Transaction[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [filteredTransactions, setFilteredTransactions] = useState<Transaction[]>([])
   const [loading, setLoading] = useState(true)
   const [statusFilter, setStatusFilter] = useState<string>('all')
@@ -43,10 +46,20 @@ export default function LibrarianTransactionsPage() {
   const loadTransactions = async () => {
     setLoading(true)
     const result = await getAllTransactions()
-    setTransactions(result)
+    setTransactions(result.data)
+    setNextCursor(result.nextCursor)
     setLoading(false)
   }
 
+  const loadMore = async () => {
+    if (!nextCursor) return
+    setLoadingMore(true)
+    const result = await getAllTransactions({ cursor: nextCursor })
+    setTransactions((current) => [...current, ...result.data])
+    setNextCursor(result.nextCursor)
+    setLoadingMore(false)
+  }
+
   return (
     <div className="space-y-6">
       <div className="flex items-center justify-between">
@@ -166,6 +179,8 @@ export default function LibrarianTransactionsPage() {
             </Table>
           </div>
 
+          <LoadMoreButton hasMore={!!nextCursor} loading={loadingMore} onClick={loadMore} />
+
           {/* Summary */}
           <div className="rounded-lg border bg-card p-4">
             <div className="grid grid-cols-4 gap-4 text-sm">
@@ -19,6 +19,8 @@ import { getGenres } from '@/lib/actions/books'
 import { toast } from 'sonner'
 import type { Book } from '@/types'
 
+const SEARCH_DEBOUNCE_MS = 300
+
 export default function MemberBooksPage() {
   const [books, setBooks] = useState<Book[]>([])
   const [filteredBooks, setFilteredBooks] = useState<Book[]>([])
@@ -30,23 +32,18 @@ export default function MemberBooksPage() {
   const [reserving, setReserving] = useState<string | null>(null)
 
   useEffect(() => {
-    loadData()
+    getGenres().then(setGenres)
   }, [])
 
+  // Search runs on the server against the whole catalogue, once typing pauses
   useEffect(() => {
-    let filtered = [...books]
+    const timer = setTimeout(() => loadBooks(search), search ? SEARCH_DEBOUNCE_MS : 0)
+    return () => clearTimeout(timer)
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [search])
 
-    // Search filter
-    if (search) {
-      const searchLower = search.toLowerCase()
-      filtered = filtered.filter(
-        (book) =>
-          book.title.toLowerCase().includes(searchLower) ||
-          book.author.toLowerCase().includes(searchLower) ||
-          book.isbn.toLowerCase().includes(searchLower) ||
-          book.genre.toLowerCase().includes(searchLower)
-      )
-    }
+  useEffect(() => {
+    let filtered = [...books]
 
     // Genre filter
     if (genreFilter !== 'all') {
@@ -61,16 +58,12 @@ export default function MemberBooksPage() {
     }
 
     setFilteredBooks(filtered)
-  }, [search, genreFilter, availabilityFilter, books])
+  }, [genreFilter, availabilityFilter, books])
 
-  const loadData = async () => {
+  const loadBooks = async (query: string) => {
     setLoading(true)
-    const [booksResult, genresResult] = await Promise.all([
-      getAllBooks(),
-      getGenres(),
-    ])
+    const booksResult = await getAllBooks(query.trim() ? { search: query.trim() } : undefined)
     setBooks(booksResult.data)
-    setGenres(genresResult)
     setLoading(false)
   }
 
@@ -84,7 +77,7 @@ export default function MemberBooksPage() {
         if (result.success) {
           toast.success(result.message)
           // Refresh books list
-          loadData()
+          loadBooks(search)
         } else {
           toast.error(result.error || 'Failed to create borrow request')
         }
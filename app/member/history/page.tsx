@@ -25,7 +25,7 @@ export default function HistoryPage() {
 
   const loadTransactions = async () => {
     setLoading(true)
-    const result = await getUserTransactions('current-user-id')
+    const result = await getUserTransactions()
     setTransactions(result)
     setLoading(false)
   }
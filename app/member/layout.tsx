@@ -46,7 +46,7 @@ export default async function MemberLayout({
 }: {
   children: React.ReactNode
 }) {
-  const supabase = await createClient()
+  const supabase = await createClient('app/member/layout')
   const { data: { user } } = await supabase.auth.getUser()
 
   if (!user) {
@@ -12,7 +12,7 @@ import {
   DialogHeader,
   DialogTitle,
 } from '@/components/ui/dialog'
-import { getActiveTransactions, memberReturnBook } from '@/lib/actions/transactions'
+import { getUserActiveTransactions, memberReturnBook } from '@/lib/actions/transactions'
 import { formatDate, formatCurrency, isOverdue, calculateFine } from '@/lib/helpers'
 import { toast } from 'sonner'
 import type { Transaction } from '@/types'
@@ -33,7 +33,7 @@ export default function MyBooksPage() {
 
   const loadTransactions = async () => {
     setLoading(true)
-    const result = await getActiveTransactions()
+    const result = await getUserActiveTransactions()
     setTransactions(result)
     setLoading(false)
   }
@@ -1,6 +1,6 @@
 import { Book, BookOpen, AlertCircle, DollarSign, BookMarked, Clock } from 'lucide-react'
 import { getDashboardStats } from '@/lib/actions/stats'
-import { getUserTransactions, getActiveTransactions } from '@/lib/actions/transactions'
+import { getUserActiveTransactions, getUserTransactionCount } from '@/lib/actions/transactions'
 import { getUserReservations } from '@/lib/actions/reservations'
 import { getUserFines } from '@/lib/actions/fines'
 import { createClient } from '@/lib/supabase/server'
@@ -8,17 +8,17 @@ import { StatCard } from '@/components/stat-card'
 import { formatDate, formatCurrency, isOverdue } from '@/lib/helpers'
 
 export default async function MemberDashboardPage() {
-  const supabase = await createClient()
+  const supabase = await createClient('app/member/page')
   const { data: { user } } = await supabase.auth.getUser()
 
   if (!user) {
     return null
   }
 
-  const [stats, activeTransactions, allTransactions, reservations, fines] = await Promise.all([
+  const [stats, activeTransactions, totalBorrowed, reservations, fines] = await Promise.all([
     getDashboardStats(),
-    getActiveTransactions(user.id),
-    getUserTransactions(user.id),
+    getUserActiveTransactions(user.id),
+    getUserTransactionCount(user.id),
     getUserReservations(user.id),
     getUserFines(user.id),
   ])
@@ -63,7 +63,7 @@ export default async function MemberDashboardPage() {
         />
         <StatCard
           title="Total Borrowed"
-          value={allTransactions.length}
+          value={totalBorrowed}
           description="All time"
           icon={Book}
         />
@@ -2,7 +2,7 @@ import { redirect } from 'next/navigation'
 import { createClient } from '@/lib/supabase/server'
 
 export default async function Home() {
-  const supabase = await createClient()
+  const supabase = await createClient('app/page')
   const { data: { user } } = await supabase.auth.getUser()
 
   if (user) {
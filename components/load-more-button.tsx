@@ -0,0 +1,23 @@
+import { Loader2 } from 'lucide-react'
+import { Button } from '@/components/ui/button'
+
+interface LoadMoreButtonProps {
+  hasMore: boolean
+  loading: boolean
+  onClick: () => void
+}
+
+export function LoadMoreButton({ hasMore, loading, onClick }: LoadMoreButtonProps) {
+  if (!hasMore) {
+    return null
+  }
+
+  return (
+    <div className="flex justify-center">
+      <Button variant="outline" onClick={onClick} disabled={loading}>
+        {loading && <Loader2 className="h-4 w-4 animate-spin mr-2" />}
+        Load more
+      </Button>
+    </div>
+  )
+}
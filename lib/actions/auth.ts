@@ -6,7 +6,7 @@ import { createClient } from '@/lib/supabase/server'
 import type { LoginFormData, RegisterFormData } from '@/types'
 
 export async function login(formData: LoginFormData) {
-  const supabase = await createClient()
+  const supabase = await createClient('auth.login')
 
   const { error } = await supabase.auth.signInWithPassword({
     email: formData.email,
@@ -44,7 +44,7 @@ export async function login(formData: LoginFormData) {
 }
 
 export async function register(formData: RegisterFormData) {
-  const supabase = await createClient()
+  const supabase = await createClient('auth.register')
 
   // Sign up the user
   const { data, error } = await supabase.auth.signUp({
@@ -80,14 +80,14 @@ export async function register(formData: RegisterFormData) {
 }
 
 export async function logout() {
-  const supabase = await createClient()
+  const supabase = await createClient('auth.logout')
   await supabase.auth.signOut()
   revalidatePath('/', 'layout')
   redirect('/login')
 }
 
 export async function getCurrentUser() {
-  const supabase = await createClient()
+  const supabase = await createClient('auth.getCurrentUser')
   
   const { data: { user }, error } = await supabase.auth.getUser()
   
@@ -105,7 +105,7 @@ export async function getCurrentUser() {
 }
 
 export async function updateProfile(userId: string, data: Partial<RegisterFormData>) {
-  const supabase = await createClient()
+  const supabase = await createClient('auth.updateProfile')
 
   const { error } = await supabase
     .from('profiles')
@@ -2,11 +2,15 @@
 
 import { revalidatePath } from 'next/cache'
 import { createClient } from '@/lib/supabase/server'
-import type { BookFormData, Book, BookFilters, PaginatedResponse } from '@/types'
+import type { BookFormData, Book, BookFilters, PaginatedResponse, PaginationParams, Transaction } from '@/types'
 import { getBookCoverUrl } from '@/lib/helpers'
+import { decodeCursor, emptyPage, keysetFilter, toPage } from '@/lib/pagination'
+import { CATALOGUE_TAG, GENRES_TAG, cacheKey, cached, invalidateTags } from '@/lib/cache'
+
+const BOOKS_PAGE_SIZE = 12
 
 export async function createBook(formData: BookFormData) {
-  const supabase = await createClient()
+  const supabase = await createClient('books.createBook')
 
   const bookData = {
     ...formData,
@@ -22,13 +26,14 @@ export async function createBook(formData: BookFormData) {
     return { success: false, error: error.message }
   }
 
+  invalidateTags(CATALOGUE_TAG, GENRES_TAG)
   revalidatePath('/admin/books')
   revalidatePath('/librarian/books')
   return { success: true, message: 'Book added successfully' }
 }
 
 export async function updateBook(id: string, formData: Partial<BookFormData>) {
-  const supabase = await createClient()
+  const supabase = await createClient('books.updateBook')
 
   const updateData: Record<string, unknown> = { ...formData }
   
@@ -45,13 +50,14 @@ export async function updateBook(id: string, formData: Partial<BookFormData>) {
     return { success: false, error: error.message }
   }
 
+  invalidateTags(CATALOGUE_TAG, GENRES_TAG)
   revalidatePath('/admin/books')
   revalidatePath('/librarian/books')
   return { success: true, message: 'Book updated successfully' }
 }
 
 export async function deleteBook(id: string) {
-  const supabase = await createClient()
+  const supabase = await createClient('books.deleteBook')
 
   const { error } = await supabase
     .from('books')
@@ -62,12 +68,13 @@ export async function deleteBook(id: string) {
     return { success: false, error: error.message }
   }
 
+  invalidateTags(CATALOGUE_TAG, GENRES_TAG)
   revalidatePath('/admin/books')
   return { success: true, message: 'Book deleted successfully' }
 }
 
 export async function getBook(id: string): Promise<Book | null> {
-  const supabase = await createClient()
+  const supabase = await createClient('books.getBook')
 
   const { data, error } = await supabase
     .from('books')
@@ -82,16 +89,34 @@ export async function getBook(id: string): Promise<Book | null> {
   return data
 }
 
+// Books are readable by everyone, so one cached page serves every user asking for the same filters
 export async function getAllBooks(
   filters?: BookFilters,
-  page: number = 1,
-  limit: number = 12
+  params: PaginationParams = {}
 ): Promise<PaginatedResponse<Book>> {
-  const supabase = await createClient()
+  const page = await cached(
+    cacheKey('getAllBooks', filters ?? {}, params),
+    [CATALOGUE_TAG],
+    () => loadBooks(filters, params),
+    { isCacheable: (result) => result !== null }
+  )
+  return page ?? emptyPage()
+}
 
-  let query = supabase
-    .from('books')
-    .select('*', { count: 'exact' })
+// null on error, so failed reads are not cached
+async function loadBooks(filters: BookFilters | undefined, params: PaginationParams): Promise<PaginatedResponse<Book> | null> {
+  const supabase = await createClient('books.getAllBooks')
+  const limit = params.limit ?? BOOKS_PAGE_SIZE
+  const after = decodeCursor(params.cursor)
+  const count = after ? undefined : params.count
+
+  const selectBooks = () => supabase.from('books').select('*', { count })
+
+  // Searches go through the ranked, index-backed search_books function (supabase-book-search.sql).
+  // It returns books rows, so the same filters and range apply to it.
+  let query = filters?.search
+    ? (supabase.rpc('search_books', { p_query: filters.search }, { count }) as unknown as ReturnType<typeof selectBooks>)
+    : selectBooks()
 
   // Apply filters
   if (filters?.genre) {
@@ -109,43 +134,40 @@ export async function getAllBooks(
   }
 
   if (filters?.search) {
-    query = query.or(`title.ilike.%${filters.search}%,author.ilike.%${filters.search}%,isbn.ilike.%${filters.search}%`)
+    // Relevance order has no key to seek on, so search cursors carry an offset.
+    // Searches are read a few pages deep at most.
+    const offset = Number(after?.[0] ?? 0)
+    const { data, error, count: total } = await query.range(offset, offset + limit)
+
+    if (error || !data) {
+      return null
+    }
+
+    return toPage(data as Book[], limit, () => [offset + limit], total ?? null)
   }
 
-  // Apply pagination
-  const from = (page - 1) * limit
-  const to = from + limit - 1
+  if (after) {
+    const [title, id] = after
+    query = query.gte('title', title).or(keysetFilter('title', title, id, true))
+  }
 
-  const { data, error, count } = await query
+  const { data, error, count: total } = await query
     .order('title', { ascending: true })
-    .range(from, to)
+    .order('id', { ascending: true })
+    .limit(limit + 1)
 
-  if (error) {
-    return {
-      data: [],
-      total: 0,
-      page,
-      limit,
-      totalPages: 0,
-    }
+  if (error || !data) {
+    return null
   }
 
-  return {
-    data: data || [],
-    total: count || 0,
-    page,
-    limit,
-    totalPages: Math.ceil((count || 0) / limit),
-  }
+  return toPage(data as Book[], limit, (book) => [book.title, book.id], total ?? null)
 }
 
 export async function searchBooks(query: string): Promise<Book[]> {
-  const supabase = await createClient()
+  const supabase = await createClient('books.searchBooks')
 
   const { data, error } = await supabase
-    .from('books')
-    .select('*')
-    .or(`title.ilike.%${query}%,author.ilike.%${query}%,isbn.ilike.%${query}%,genre.ilike.%${query}%`)
+    .rpc('search_books', { p_query: query })
     .limit(20)
 
   if (error || !data) {
@@ -156,40 +178,36 @@ export async function searchBooks(query: string): Promise<Book[]> {
 }
 
 export async function getAvailableBooks(): Promise<Book[]> {
-  const supabase = await createClient()
+  const books = await cached(cacheKey('getAvailableBooks'), [CATALOGUE_TAG], async () => {
+    const supabase = await createClient('books.getAvailableBooks')
 
-  const { data, error } = await supabase
-    .from('books')
-    .select('*')
-    .gt('available_copies', 0)
-    .order('title', { ascending: true })
+    const { data, error } = await supabase
+      .from('books')
+      .select('*')
+      .gt('available_copies', 0)
+      .order('title', { ascending: true })
 
-  if (error || !data) {
-    return []
-  }
+    return error || !data ? null : (data as Book[])
+  }, { isCacheable: (result) => result !== null })
 
-  return data
+  return books ?? []
 }
 
 export async function getGenres(): Promise<string[]> {
-  const supabase = await createClient()
+  const genres = await cached(cacheKey('getGenres'), [GENRES_TAG], async () => {
+    const supabase = await createClient('books.getGenres')
 
-  const { data, error } = await supabase
-    .from('books')
-    .select('genre')
-    .order('genre', { ascending: true })
+    // One index probe per genre instead of every book's genre (supabase-book-genres.sql)
+    const { data, error } = await supabase.rpc('book_genres')
 
-  if (error || !data) {
-    return []
-  }
+    return error || !data ? null : (data as { genre: string }[]).map(row => row.genre)
+  }, { isCacheable: (result) => result !== null })
 
-  // Get unique genres
-  const genres = [...new Set(data.map(book => book.genre))]
-  return genres
+  return genres ?? []
 }
 
 export async function issueBook(bookId: string, userId: string) {
-  const supabase = await createClient()
+  const supabase = await createClient('books.issueBook')
 
   // Get current user (librarian)
   const { data: { user } } = await supabase.auth.getUser()
@@ -198,62 +216,29 @@ export async function issueBook(bookId: string, userId: string) {
     return { success: false, error: 'Not authenticated' }
   }
 
-  // Check if book is available
-  const { data: book } = await supabase
-    .from('books')
-    .select('available_copies, title')
-    .eq('id', bookId)
-    .single()
-
-  if (!book || book.available_copies <= 0) {
-    return { success: false, error: 'Book is not available' }
-  }
-
-  // Check if user already has this book issued
-  const { data: existingTransaction } = await supabase
-    .from('transactions')
-    .select('*')
-    .eq('book_id', bookId)
-    .eq('user_id', userId)
-    .eq('status', 'issued')
-    .maybeSingle()
-
-  if (existingTransaction) {
-    return { success: false, error: 'User already has this book issued' }
-  }
-
   // Calculate due date (14 days from now)
   const dueDate = new Date()
   dueDate.setDate(dueDate.getDate() + 14)
 
-  // Create transaction
-  const { error: transactionError } = await supabase
-    .from('transactions')
-    .insert([{
-      book_id: bookId,
-      user_id: userId,
-      issued_by: user.id,
-      due_date: dueDate.toISOString(),
-      status: 'issued',
-    }])
-
-  if (transactionError) {
-    return { success: false, error: transactionError.message }
-  }
-
-  // Update book availability
-  const { error: updateError } = await supabase
-    .from('books')
-    .update({ available_copies: book.available_copies - 1 })
-    .eq('id', bookId)
+  // Takes a copy and creates the loan in one database transaction (supabase-circulation.sql)
+  const { data: transaction, error } = await supabase
+    .rpc('issue_book', {
+      p_book_id: bookId,
+      p_user_id: userId,
+      p_due_date: dueDate.toISOString(),
+      p_issued_by: user.id,
+    })
+    .select('*, book:books(title)')
+    .single<Transaction>()
 
-  if (updateError) {
-    return { success: false, error: updateError.message }
+  if (error || !transaction) {
+    return { success: false, error: error?.message || 'Book is not available' }
   }
 
+  invalidateTags(CATALOGUE_TAG)
   revalidatePath('/librarian/issue')
   revalidatePath('/admin/books')
   revalidatePath('/admin/transactions')
   
-  return { success: true, message: `Book "${book.title}" issued successfully` }
+  return { success: true, message: `Book "${transaction.book?.title}" issued successfully` }
 }
@@ -2,11 +2,13 @@
 
 import { revalidatePath } from 'next/cache'
 import { createClient } from '@/lib/supabase/server'
-import type { BorrowRequest } from '@/types'
+import type { BorrowRequest, MemberRequest, PaginatedResponse, PaginationParams, Transaction } from '@/types'
+import { DEFAULT_PAGE_SIZE, decodeCursor, emptyPage, keysetFilter, toPage } from '@/lib/pagination'
 import { calculateDueDate } from '@/lib/helpers'
+import { CATALOGUE_TAG, invalidateTags } from '@/lib/cache'
 
 export async function createBorrowRequest(bookId: string, notes?: string) {
-  const supabase = await createClient()
+  const supabase = await createClient('borrow-requests.createBorrowRequest')
 
   // Get current user
   const { data: { user }, error: authError } = await supabase.auth.getUser()
@@ -79,7 +81,7 @@ export async function createBorrowRequest(bookId: string, notes?: string) {
 }
 
 export async function cancelBorrowRequest(requestId: string) {
-  const supabase = await createClient()
+  const supabase = await createClient('borrow-requests.cancelBorrowRequest')
 
   // Get current user
   const { data: { user }, error: authError } = await supabase.auth.getUser()
@@ -119,8 +121,20 @@ export async function cancelBorrowRequest(requestId: string) {
   return { success: true, message: 'Borrow request cancelled' }
 }
 
+// Columns of member_requests, the per-member read model behind /member/requests
+const MEMBER_REQUEST_COLUMNS = 'id, user_id, book_id, title, author, request_date, requested_due_date, status, reviewed_by, reviewer_name, reviewed_at, rejection_reason'
+
+// Shape a member_requests row like a borrow request with its book and reviewer embedded, as the page expects
+function toBorrowRequest({ title, author, reviewer_name, ...request }: MemberRequest): BorrowRequest {
+  return {
+    ...request,
+    book: { id: request.book_id, title, author },
+    reviewed_by_profile: request.reviewed_by ? { id: request.reviewed_by, full_name: reviewer_name } : undefined,
+  } as unknown as BorrowRequest
+}
+
 export async function getUserBorrowRequests(userId?: string): Promise<BorrowRequest[]> {
-  const supabase = await createClient()
+  const supabase = await createClient('borrow-requests.getUserBorrowRequests')
 
   // Get current user if userId not provided
   if (!userId) {
@@ -132,25 +146,21 @@ export async function getUserBorrowRequests(userId?: string): Promise<BorrowRequ
   }
 
   const { data, error } = await supabase
-    .from('borrow_requests')
-    .select(`
-      *,
-      book:books(*),
-      user:profiles!borrow_requests_user_id_fkey(*),
-      reviewed_by_profile:profiles!borrow_requests_reviewed_by_fkey(*)
-    `)
+    .from('member_requests')
+    .select(MEMBER_REQUEST_COLUMNS)
     .eq('user_id', userId)
     .order('request_date', { ascending: false })
+    .order('id', { ascending: false })
 
   if (error || !data) {
     return []
   }
 
-  return data as unknown as BorrowRequest[]
+  return (data as unknown as MemberRequest[]).map(toBorrowRequest)
 }
 
 export async function getPendingBorrowRequests(): Promise<BorrowRequest[]> {
-  const supabase = await createClient()
+  const supabase = await createClient('borrow-requests.getPendingBorrowRequests')
 
   const { data, error } = await supabase
     .from('borrow_requests')
@@ -169,29 +179,43 @@ export async function getPendingBorrowRequests(): Promise<BorrowRequest[]> {
   return data as unknown as BorrowRequest[]
 }
 
-export async function getAllBorrowRequests(): Promise<BorrowRequest[]> {
-  const supabase = await createClient()
+export async function getAllBorrowRequests(params: PaginationParams = {}): Promise<PaginatedResponse<BorrowRequest>> {
+  const supabase = await createClient('borrow-requests.getAllBorrowRequests')
+  const limit = params.limit ?? DEFAULT_PAGE_SIZE
+  const after = decodeCursor(params.cursor)
 
-  const { data, error } = await supabase
+  // Only the first page is counted; deeper pages stay as cheap as the first
+  let query = supabase
     .from('borrow_requests')
     .select(`
       *,
       book:books(*),
       user:profiles!borrow_requests_user_id_fkey(*),
       reviewed_by_profile:profiles!borrow_requests_reviewed_by_fkey(*)
-    `)
+    `, { count: after ? undefined : params.count })
+
+  if (after) {
+    const [requestDate, id] = after
+    query = query
+      .lte('request_date', requestDate)
+      .or(keysetFilter('request_date', requestDate, id, false))
+  }
+
+  const { data, error, count } = await query
     .order('request_date', { ascending: false })
-    .limit(100)
+    .order('id', { ascending: false })
+    .limit(limit + 1)
 
   if (error || !data) {
-    return []
+    return emptyPage()
   }
 
-  return data as unknown as BorrowRequest[]
+  const rows = data as unknown as BorrowRequest[]
+  return toPage(rows, limit, (row) => [row.request_date, row.id], count ?? null)
 }
 
 export async function approveBorrowRequest(requestId: string) {
-  const supabase = await createClient()
+  const supabase = await createClient('borrow-requests.approveBorrowRequest')
 
   // Get current user (librarian)
   const { data: { user }, error: authError } = await supabase.auth.getUser()
@@ -200,79 +224,37 @@ export async function approveBorrowRequest(requestId: string) {
     return { success: false, error: 'Authentication required' }
   }
 
-  // Get request details
-  const { data: request, error: fetchError } = await supabase
-    .from('borrow_requests')
-    .select('*, book:books(*)')
-    .eq('id', requestId)
-    .single()
-
-  if (fetchError || !request) {
-    return { success: false, error: 'Request not found' }
-  }
-
-  if (request.status !== 'pending') {
-    return { success: false, error: 'Only pending requests can be approved' }
-  }
-
-  // Check if book is still available
-  if (request.book.available_copies <= 0) {
-    return { success: false, error: 'Book is no longer available' }
-  }
-
-  // Start a transaction-like operation
-  // 1. Create transaction (issue book)
-  const { error: transactionError } = await supabase
-    .from('transactions')
-    .insert([{
-      book_id: request.book_id,
-      user_id: request.user_id,
-      issued_by: user.id,
-      due_date: request.requested_due_date,
-      status: 'issued',
-      notes: `Approved from borrow request`,
-    }])
-
-  if (transactionError) {
-    return { success: false, error: transactionError.message }
-  }
-
-  // 2. Update book available copies
-  const { error: updateBookError } = await supabase
-    .from('books')
-    .update({ available_copies: request.book.available_copies - 1 })
-    .eq('id', request.book_id)
-
-  if (updateBookError) {
-    return { success: false, error: updateBookError.message }
-  }
-
-  // 3. Update request status
-  const { error: updateRequestError } = await supabase
-    .from('borrow_requests')
-    .update({ 
-      status: 'approved',
-      reviewed_by: user.id,
-      reviewed_at: new Date().toISOString(),
-    })
-    .eq('id', requestId)
-
-  if (updateRequestError) {
-    return { success: false, error: updateRequestError.message }
+  // Marks the request approved and issues the book in one database transaction
+  // (supabase-circulation.sql). If the book can't be issued the request stays pending.
+  const { data: transaction, error } = await supabase
+    .rpc('approve_borrow_request', { p_request_id: requestId, p_reviewed_by: user.id })
+    .select('*, book:books(title)')
+    .single<Transaction>()
+
+  // 'Request not found' and 'Only pending requests can be approved' already read the way they
+  // did before; the issue_book ones are worded for the librarian reviewing the request
+  if (error || !transaction) {
+    const message = error?.message === 'Book is not available'
+      ? 'Book is no longer available'
+      : error?.message === 'User already has this book issued'
+        ? 'Member already has this book borrowed'
+        : error?.message || 'Request not found'
+    return { success: false, error: message }
   }
 
+  invalidateTags(CATALOGUE_TAG)
   revalidatePath('/librarian/requests')
   revalidatePath('/librarian/transactions')
   revalidatePath('/member/books')
   
   return { 
     success: true, 
-    message: `Borrow request approved. Book "${request.book.title}" issued to member.` 
+    message: `Borrow request approved. Book "${transaction.book?.title}" issued to member.` 
   }
 }
 
 export async function rejectBorrowRequest(requestId: string, reason?: string) {
-  const supabase = await createClient()
+  const supabase = await createClient('borrow-requests.rejectBorrowRequest')
 
   // Get current user (librarian)
   const { data: { user }, error: authError } = await supabase.auth.getUser()
@@ -2,10 +2,11 @@
 
 import { revalidatePath } from 'next/cache'
 import { createClient } from '@/lib/supabase/server'
-import type { Fine } from '@/types'
+import type { Fine, PaginatedResponse, PaginationParams } from '@/types'
+import { DEFAULT_PAGE_SIZE, decodeCursor, emptyPage, keysetFilter, toPage } from '@/lib/pagination'
 
 export async function getUserFines(userId?: string): Promise<Fine[]> {
-  const supabase = await createClient()
+  const supabase = await createClient('fines.getUserFines')
 
   // Get current user if userId not provided
   if (!userId) {
@@ -33,28 +34,42 @@ export async function getUserFines(userId?: string): Promise<Fine[]> {
   return data as unknown as Fine[]
 }
 
-export async function getAllFines(): Promise<Fine[]> {
-  const supabase = await createClient()
+export async function getAllFines(params: PaginationParams = {}): Promise<PaginatedResponse<Fine>> {
+  const supabase = await createClient('fines.getAllFines')
+  const limit = params.limit ?? DEFAULT_PAGE_SIZE
+  const after = decodeCursor(params.cursor)
 
-  const { data, error } = await supabase
+  // Only the first page is counted; deeper pages stay as cheap as the first
+  let query = supabase
     .from('fines')
     .select(`
       *,
       transaction:transactions(*),
       user:profiles(*)
-    `)
+    `, { count: after ? undefined : params.count })
+
+  if (after) {
+    const [createdAt, id] = after
+    query = query
+      .lte('created_at', createdAt)
+      .or(keysetFilter('created_at', createdAt, id, false))
+  }
+
+  const { data, error, count } = await query
     .order('created_at', { ascending: false })
-    .limit(100)
+    .order('id', { ascending: false })
+    .limit(limit + 1)
 
   if (error || !data) {
-    return []
+    return emptyPage()
   }
 
-  return data as unknown as Fine[]
+  const rows = data as unknown as Fine[]
+  return toPage(rows, limit, (row) => [row.created_at, row.id], count ?? null)
 }
 
 export async function getUnpaidFines(userId?: string): Promise<Fine[]> {
-  const supabase = await createClient()
+  const supabase = await createClient('fines.getUnpaidFines')
 
   let query = supabase
     .from('fines')
@@ -79,7 +94,7 @@ export async function getUnpaidFines(userId?: string): Promise<Fine[]> {
 }
 
 export async function payFine(fineId: string, paymentMethod: string = 'cash') {
-  const supabase = await createClient()
+  const supabase = await createClient('fines.payFine')
 
   const { error } = await supabase
     .from('fines')
@@ -116,7 +131,7 @@ export async function payFine(fineId: string, paymentMethod: string = 'cash') {
 }
 
 export async function getTotalUnpaidFines(userId?: string): Promise<number> {
-  const supabase = await createClient()
+  const supabase = await createClient('fines.getTotalUnpaidFines')
 
   let query = supabase
     .from('fines')
@@ -137,78 +152,17 @@ export async function getTotalUnpaidFines(userId?: string): Promise<number> {
 }
 
 export async function syncOverdueFines(userId?: string) {
-  const supabase = await createClient()
-  const { calculateFine, isOverdue } = await import('@/lib/helpers')
-
-  // Get all active (issued) transactions
-  let query = supabase
-    .from('transactions')
-    .select('*, books(*)')
-    .eq('status', 'issued')
+  const supabase = await createClient('fines.syncOverdueFines')
 
-  if (userId) {
-    query = query.eq('user_id', userId)
-  }
-
-  const { data: transactions, error } = await query
+  // Creates or updates every overdue fine in one statement (sql_scripts/supabase-overdue-fines.sql)
+  const { data, error } = await supabase
+    .rpc('sync_overdue_fines', { p_user_id: userId ?? null })
 
-  if (error || !transactions) {
-    return { success: false, error: error?.message || 'Failed to fetch transactions' }
+  if (error || !data || data.length === 0) {
+    return { success: false, error: error?.message || 'Failed to sync fines' }
   }
 
-  let finesCreated = 0
-  let finesUpdated = 0
-
-  for (const transaction of transactions) {
-    // Skip if not overdue
-    if (!isOverdue(transaction.due_date)) {
-      continue
-    }
-
-    const currentFine = calculateFine(transaction.due_date)
-
-    // Check if a fine already exists for this transaction
-    const { data: existingFines } = await supabase
-      .from('fines')
-      .select('*')
-      .eq('transaction_id', transaction.id)
-      .eq('paid', false)
-
-    if (existingFines && existingFines.length > 0) {
-      // Update existing fine amount
-      const existingFine = existingFines[0]
-      if (existingFine.amount !== currentFine) {
-        await supabase
-          .from('fines')
-          .update({ 
-            amount: currentFine,
-            reason: `Overdue fine for "${transaction.books.title}" (${Math.floor((Date.now() - new Date(transaction.due_date).getTime()) / (1000 * 60 * 60 * 24))} days overdue)`,
-          })
-          .eq('id', existingFine.id)
-        finesUpdated++
-      }
-    } else {
-      // Create new fine
-      await supabase
-        .from('fines')
-        .insert([{
-          transaction_id: transaction.id,
-          user_id: transaction.user_id,
-          amount: currentFine,
-          reason: `Overdue fine for "${transaction.books.title}" (${Math.floor((Date.now() - new Date(transaction.due_date).getTime()) / (1000 * 60 * 60 * 24))} days overdue)`,
-        }])
-      finesCreated++
-    }
-
-    // Update transaction fine_amount
-    await supabase
-      .from('transactions')
-      .update({ 
-        fine_amount: currentFine,
-        status: 'overdue'
-      })
-      .eq('id', transaction.id)
-  }
+  const { fines_created: finesCreated, fines_updated: finesUpdated } = data[0]
 
   revalidatePath('/member/fines')
   revalidatePath('/admin/fines')
@@ -2,11 +2,12 @@
 
 import { revalidatePath } from 'next/cache'
 import { createClient } from '@/lib/supabase/server'
-import type { Reservation } from '@/types'
+import type { Reservation, PaginatedResponse, PaginationParams } from '@/types'
+import { DEFAULT_PAGE_SIZE, decodeCursor, emptyPage, keysetFilter, toPage } from '@/lib/pagination'
 import { RESERVATION_EXPIRY_DAYS } from '@/lib/constants'
 
 export async function createReservation(bookId: string, userId?: string) {
-  const supabase = await createClient()
+  const supabase = await createClient('reservations.createReservation')
 
   // Get current user if userId not provided
   if (!userId) {
@@ -17,66 +18,33 @@ export async function createReservation(bookId: string, userId?: string) {
     userId = user.id
   }
 
-  // Check if book is available
-  const { data: book } = await supabase
-    .from('books')
-    .select('available_copies')
-    .eq('id', bookId)
-    .single()
-
-  if (book && book.available_copies > 0) {
-    return { success: false, error: 'Book is currently available. Please borrow it directly.' }
-  }
-
-  // Check if user already has a pending reservation for this book
-  const { data: existingReservation } = await supabase
-    .from('reservations')
-    .select('*')
-    .eq('book_id', bookId)
-    .eq('user_id', userId)
-    .eq('status', 'pending')
-    .single()
-
-  if (existingReservation) {
-    return { success: false, error: 'You already have a pending reservation for this book' }
-  }
-
-  // Get current queue position
-  const { count } = await supabase
-    .from('reservations')
-    .select('*', { count: 'exact', head: true })
-    .eq('book_id', bookId)
-    .eq('status', 'pending')
-
-  const queuePosition = (count || 0) + 1
-
   // Calculate expiry date
   const expiryDate = new Date()
   expiryDate.setDate(expiryDate.getDate() + RESERVATION_EXPIRY_DAYS)
 
-  // Create reservation
-  const { error } = await supabase
-    .from('reservations')
-    .insert([{
-      book_id: bookId,
-      user_id: userId,
-      queue_position: queuePosition,
-      expiry_date: expiryDate.toISOString(),
-    }])
+  // Checks the book and takes the next ticket in its queue in one database transaction
+  // (supabase-reservation-queue.sql), so concurrent reservations never share a position
+  const { data: reservation, error } = await supabase
+    .rpc('reserve_book', {
+      p_book_id: bookId,
+      p_user_id: userId,
+      p_expiry_date: expiryDate.toISOString(),
+    })
+    .single<Reservation>()
 
-  if (error) {
-    return { success: false, error: error.message }
+  if (error || !reservation) {
+    return { success: false, error: error?.message || 'Failed to reserve book' }
   }
 
   revalidatePath('/member/books')
   revalidatePath('/member/reservations')
   revalidatePath('/librarian/reservations')
   
-  return { success: true, message: `Book reserved successfully. Queue position: ${queuePosition}` }
+  return { success: true, message: `Book reserved successfully. Queue position: ${reservation.queue_position}` }
 }
 
 export async function cancelReservation(reservationId: string) {
-  const supabase = await createClient()
+  const supabase = await createClient('reservations.cancelReservation')
 
   const { error } = await supabase
     .from('reservations')
@@ -94,7 +62,7 @@ export async function cancelReservation(reservationId: string) {
 }
 
 export async function fulfillReservation(reservationId: string) {
-  const supabase = await createClient()
+  const supabase = await createClient('reservations.fulfillReservation')
 
   const { error } = await supabase
     .from('reservations')
@@ -114,7 +82,7 @@ export async function fulfillReservation(reservationId: string) {
 }
 
 export async function getUserReservations(userId: string): Promise<Reservation[]> {
-  const supabase = await createClient()
+  const supabase = await createClient('reservations.getUserReservations')
 
   const { data, error } = await supabase
     .from('reservations')
@@ -133,28 +101,42 @@ export async function getUserReservations(userId: string): Promise<Reservation[]
   return data as unknown as Reservation[]
 }
 
-export async function getAllReservations(): Promise<Reservation[]> {
-  const supabase = await createClient()
+export async function getAllReservations(params: PaginationParams = {}): Promise<PaginatedResponse<Reservation>> {
+  const supabase = await createClient('reservations.getAllReservations')
+  const limit = params.limit ?? DEFAULT_PAGE_SIZE
+  const after = decodeCursor(params.cursor)
 
-  const { data, error } = await supabase
+  // Only the first page is counted; deeper pages stay as cheap as the first
+  let query = supabase
     .from('reservations')
     .select(`
       *,
       book:books(*),
       user:profiles(*)
-    `)
+    `, { count: after ? undefined : params.count })
+
+  if (after) {
+    const [reservationDate, id] = after
+    query = query
+      .lte('reservation_date', reservationDate)
+      .or(keysetFilter('reservation_date', reservationDate, id, false))
+  }
+
+  const { data, error, count } = await query
     .order('reservation_date', { ascending: false })
-    .limit(100)
+    .order('id', { ascending: false })
+    .limit(limit + 1)
 
   if (error || !data) {
-    return []
+    return emptyPage()
   }
 
-  return data as unknown as Reservation[]
+  const rows = data as unknown as Reservation[]
+  return toPage(rows, limit, (row) => [row.reservation_date, row.id], count ?? null)
 }
 
 export async function getPendingReservations(bookId?: string): Promise<Reservation[]> {
-  const supabase = await createClient()
+  const supabase = await createClient('reservations.getPendingReservations')
 
   let query = supabase
     .from('reservations')
@@ -179,7 +161,7 @@ export async function getPendingReservations(bookId?: string): Promise<Reservati
 }
 
 export async function updateExpiredReservations() {
-  const supabase = await createClient()
+  const supabase = await createClient('reservations.updateExpiredReservations')
 
   const { error } = await supabase
     .from('reservations')
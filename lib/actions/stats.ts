@@ -3,55 +3,37 @@
 import { createClient } from '@/lib/supabase/server'
 import type { DashboardStats } from '@/types'
 
+// The counters are kept current by triggers (sql_scripts/supabase-library-stats.sql), so this is
+// one small read per dashboard load. Members get the catalogue totals; the other counters are
+// staff-only and come back null for them.
 export async function getDashboardStats(): Promise<DashboardStats> {
-  const supabase = await createClient()
+  const supabase = await createClient('stats.getDashboardStats')
 
-  const [
-    { data: books },
-    { count: totalMembers },
-    { count: activeTransactions },
-    { count: overdueTransactions },
-    { data: fines },
-    { count: totalReservations }
-  ] = await Promise.all([
-    supabase.from('books').select('total_copies, available_copies'),
-    
-    supabase
-      .from('profiles')
-      .select('*', { count: 'exact', head: true })
-      .eq('role', 'member'),
-    
-    supabase
-      .from('transactions')
-      .select('*', { count: 'exact', head: true })
-      .eq('status', 'issued'),
-    
-    supabase
-      .from('transactions')
-      .select('*', { count: 'exact', head: true })
-      .eq('status', 'overdue'),
-    
-    supabase.from('fines').select('amount, paid'),
-    
-    supabase
-      .from('reservations')
-      .select('*', { count: 'exact', head: true })
-      .eq('status', 'pending')
-  ])
+  const { data, error } = await supabase
+    .rpc('dashboard_stats')
+    .single()
 
-  const totalBooks = books?.reduce((sum, book) => sum + book.total_copies, 0) || 0
-  const availableBooks = books?.reduce((sum, book) => sum + book.available_copies, 0) || 0
-  const totalFines = fines?.reduce((sum, fine) => sum + fine.amount, 0) || 0
-  const unpaidFines = fines?.filter(f => !f.paid).reduce((sum, fine) => sum + fine.amount, 0) || 0
+  if (error || !data) {
+    return {
+      totalBooks: 0,
+      availableBooks: 0,
+      totalMembers: 0,
+      activeTransactions: 0,
+      overdueTransactions: 0,
+      totalFines: 0,
+      unpaidFines: 0,
+      totalReservations: 0,
+    }
+  }
 
   return {
-    totalBooks,
-    availableBooks,
-    totalMembers: totalMembers || 0,
-    activeTransactions: activeTransactions || 0,
-    overdueTransactions: overdueTransactions || 0,
-    totalFines,
-    unpaidFines,
-    totalReservations: totalReservations || 0,
+    totalBooks: data.total_copies ?? 0,
+    availableBooks: data.available_copies ?? 0,
+    totalMembers: data.total_members ?? 0,
+    activeTransactions: data.active_transactions ?? 0,
+    overdueTransactions: data.overdue_transactions ?? 0,
+    totalFines: data.total_fines ?? 0,
+    unpaidFines: data.unpaid_fines ?? 0,
+    totalReservations: data.pending_reservations ?? 0,
   }
 }
@@ -2,64 +2,28 @@
 
 import { revalidatePath } from 'next/cache'
 import { createClient } from '@/lib/supabase/server'
-import type { Transaction, IssueBookFormData } from '@/types'
-import { calculateDueDate, calculateFine, isOverdue } from '@/lib/helpers'
+import type { Transaction, IssueBookFormData, MemberLoan, PaginatedResponse, PaginationParams } from '@/types'
+import { calculateDueDate } from '@/lib/helpers'
+import { DEFAULT_PAGE_SIZE, decodeCursor, emptyPage, keysetFilter, toPage } from '@/lib/pagination'
+import { CATALOGUE_TAG, invalidateTags } from '@/lib/cache'
 
 export async function issueBook(formData: IssueBookFormData, issuedBy: string) {
-  const supabase = await createClient()
+  const supabase = await createClient('transactions.issueBook')
 
-  // Check if book is available
-  const { data: book } = await supabase
-    .from('books')
-    .select('available_copies')
-    .eq('id', formData.book_id)
-    .single()
+  // Takes a copy and creates the loan in one database transaction (supabase-circulation.sql)
+  const { error } = await supabase.rpc('issue_book', {
+    p_book_id: formData.book_id,
+    p_user_id: formData.user_id,
+    p_due_date: formData.due_date || calculateDueDate(),
+    p_issued_by: issuedBy,
+    p_notes: formData.notes ?? null,
+  })
 
-  if (!book || book.available_copies <= 0) {
-    return { success: false, error: 'Book is not available' }
-  }
-
-  // Check if user already has this book issued
-  const { data: existingTransaction } = await supabase
-    .from('transactions')
-    .select('*')
-    .eq('book_id', formData.book_id)
-    .eq('user_id', formData.user_id)
-    .eq('status', 'issued')
-    .single()
-
-  if (existingTransaction) {
-    return { success: false, error: 'User already has this book issued' }
-  }
-
-  const dueDate = formData.due_date || calculateDueDate()
-
-  // Create transaction
-  const { error: transactionError } = await supabase
-    .from('transactions')
-    .insert([{
-      book_id: formData.book_id,
-      user_id: formData.user_id,
-      issued_by: issuedBy,
-      due_date: dueDate,
-      status: 'issued',
-      notes: formData.notes,
-    }])
-
-  if (transactionError) {
-    return { success: false, error: transactionError.message }
-  }
-
-  // Update book available copies
-  const { error: updateError } = await supabase
-    .from('books')
-    .update({ available_copies: book.available_copies - 1 })
-    .eq('id', formData.book_id)
-
-  if (updateError) {
-    return { success: false, error: updateError.message }
+  if (error) {
+    return { success: false, error: error.message }
   }
 
+  invalidateTags(CATALOGUE_TAG)
   revalidatePath('/librarian/transactions')
   revalidatePath('/librarian/books')
   revalidatePath('/member/books')
@@ -67,64 +31,36 @@ export async function issueBook(formData: IssueBookFormData, issuedBy: string) {
   return { success: true, message: 'Book issued successfully' }
 }
 
-export async function returnBook(transactionId: string, returnedBy: string) {
-  const supabase = await createClient()
-
-  // Get transaction details
-  const { data: transaction, error: fetchError } = await supabase
-    .from('transactions')
-    .select('*, books(*)')
-    .eq('id', transactionId)
-    .single()
+export async function returnBook(transactionId: string, returnedBy?: string) {
+  const supabase = await createClient('transactions.returnBook')
 
-  if (fetchError || !transaction) {
-    return { success: false, error: 'Transaction not found' }
+  // Recorded as returned by the signed-in librarian unless returnedBy is given
+  if (!returnedBy) {
+    const { data: { user }, error: authError } = await supabase.auth.getUser()
+    if (authError || !user) {
+      return { success: false, error: 'Authentication required' }
+    }
+    returnedBy = user.id
   }
 
-  const returnDate = new Date().toISOString()
-  const fineAmount = calculateFine(transaction.due_date, returnDate)
-  const status = isOverdue(transaction.due_date) ? 'overdue' : 'returned'
+  // Closes the loan, returns the copy and records any fine in one database transaction
+  const { data: transaction, error } = await supabase
+    .rpc('return_book', { p_transaction_id: transactionId, p_returned_by: returnedBy })
+    .single<Transaction>()
 
-  // Update transaction
-  const { error: updateError } = await supabase
-    .from('transactions')
-    .update({
-      return_date: returnDate,
-      returned_by: returnedBy,
-      status: status,
-      fine_amount: fineAmount,
-    })
-    .eq('id', transactionId)
-
-  if (updateError) {
-    return { success: false, error: updateError.message }
+  if (error || !transaction) {
+    return { success: false, error: error?.message || 'Transaction not found' }
   }
 
-  // Update book available copies
-  const { error: bookError } = await supabase
-    .from('books')
-    .update({ available_copies: transaction.books.available_copies + 1 })
-    .eq('id', transaction.book_id)
-
-  if (bookError) {
-    return { success: false, error: bookError.message }
-  }
-
-  // Create fine record if applicable
-  if (fineAmount > 0) {
-    await supabase
-      .from('fines')
-      .insert([{
-        transaction_id: transactionId,
-        user_id: transaction.user_id,
-        amount: fineAmount,
-        reason: `Overdue fine for "${transaction.books.title}"`,
-      }])
-  }
+  const fineAmount = transaction.fine_amount
 
+  invalidateTags(CATALOGUE_TAG)
   revalidatePath('/librarian/transactions')
   revalidatePath('/librarian/books')
   revalidatePath('/member/books')
+  // return_book may have handed the copy to the next reservation in the queue
+  revalidatePath('/librarian/reservations')
+  revalidatePath('/member/reservations')
   
   return { 
     success: true, 
@@ -134,30 +70,74 @@ export async function returnBook(transactionId: string, returnedBy: string) {
   }
 }
 
-export async function getUserTransactions(userId: string): Promise<Transaction[]> {
-  const supabase = await createClient()
+// Columns of member_loans, the per-member read model behind the member pages
+const MEMBER_LOAN_COLUMNS = 'id, user_id, book_id, title, author, genre, isbn, location, issue_date, due_date, return_date, status, fine_amount, fine_paid'
 
-  const { data, error } = await supabase
-    .from('transactions')
-    .select(`
-      *,
-      book:books(*),
-      user:profiles!transactions_user_id_fkey(*),
-      issued_by_profile:profiles!transactions_issued_by_fkey(*),
-      returned_by_profile:profiles!transactions_returned_by_fkey(*)
-    `)
+// Shape a member_loans row like a transaction with its book embedded, as the pages expect
+function toTransaction({ title, author, genre, isbn, location, ...loan }: MemberLoan): Transaction {
+  return {
+    ...loan,
+    book: { id: loan.book_id, title, author, genre, isbn, location },
+  } as unknown as Transaction
+}
+
+async function getMemberLoans(userId: string | undefined, activeOnly: boolean): Promise<Transaction[]> {
+  const supabase = await createClient(activeOnly ? 'transactions.getUserActiveTransactions' : 'transactions.getUserTransactions')
+
+  // Get current user if userId not provided
+  if (!userId) {
+    const { data: { user }, error: authError } = await supabase.auth.getUser()
+    if (authError || !user) {
+      return []
+    }
+    userId = user.id
+  }
+
+  let query = supabase
+    .from('member_loans')
+    .select(MEMBER_LOAN_COLUMNS)
     .eq('user_id', userId)
+
+  if (activeOnly) {
+    query = query.eq('status', 'issued')
+  }
+
+  const { data, error } = await query
     .order('issue_date', { ascending: false })
+    .order('id', { ascending: false })
 
   if (error || !data) {
     return []
   }
 
-  return data as unknown as Transaction[]
+  return (data as unknown as MemberLoan[]).map(toTransaction)
+}
+
+export async function getUserTransactions(userId?: string): Promise<Transaction[]> {
+  return getMemberLoans(userId, false)
+}
+
+export async function getUserActiveTransactions(userId?: string): Promise<Transaction[]> {
+  return getMemberLoans(userId, true)
+}
+
+export async function getUserTransactionCount(userId: string): Promise<number> {
+  const supabase = await createClient('transactions.getUserTransactionCount')
+
+  const { count, error } = await supabase
+    .from('member_loans')
+    .select('id', { count: 'exact', head: true })
+    .eq('user_id', userId)
+
+  if (error) {
+    return 0
+  }
+
+  return count ?? 0
 }
 
 export async function getActiveTransactions(userId?: string): Promise<Transaction[]> {
-  const supabase = await createClient()
+  const supabase = await createClient('transactions.getActiveTransactions')
 
   let query = supabase
     .from('transactions')
@@ -182,10 +162,13 @@ export async function getActiveTransactions(userId?: string): Promise<Transactio
   return data as unknown as Transaction[]
 }
 
-export async function getAllTransactions(): Promise<Transaction[]> {
-  const supabase = await createClient()
+export async function getAllTransactions(params: PaginationParams = {}): Promise<PaginatedResponse<Transaction>> {
+  const supabase = await createClient('transactions.getAllTransactions')
+  const limit = params.limit ?? DEFAULT_PAGE_SIZE
+  const after = decodeCursor(params.cursor)
 
-  const { data, error } = await supabase
+  // Only the first page is counted; deeper pages stay as cheap as the first
+  let query = supabase
     .from('transactions')
     .select(`
       *,
@@ -193,19 +176,30 @@ export async function getAllTransactions(): Promise<Transaction[]> {
       user:profiles!transactions_user_id_fkey(*),
       issued_by_profile:profiles!transactions_issued_by_fkey(*),
       returned_by_profile:profiles!transactions_returned_by_fkey(*)
-    `)
+    `, { count: after ? undefined : params.count })
+
+  if (after) {
+    const [issueDate, id] = after
+    query = query
+      .lte('issue_date', issueDate)
+      .or(keysetFilter('issue_date', issueDate, id, false))
+  }
+
+  const { data, error, count } = await query
     .order('issue_date', { ascending: false })
-    .limit(100)
+    .order('id', { ascending: false })
+    .limit(limit + 1)
 
   if (error || !data) {
-    return []
+    return emptyPage()
   }
 
-  return data as unknown as Transaction[]
+  const rows = data as unknown as Transaction[]
+  return toPage(rows, limit, (row) => [row.issue_date, row.id], count ?? null)
 }
 
 export async function getOverdueTransactions(): Promise<Transaction[]> {
-  const supabase = await createClient()
+  const supabase = await createClient('transactions.getOverdueTransactions')
 
   const { data, error } = await supabase
     .from('transactions')
@@ -226,7 +220,7 @@ export async function getOverdueTransactions(): Promise<Transaction[]> {
 }
 
 export async function updateOverdueStatus() {
-  const supabase = await createClient()
+  const supabase = await createClient('transactions.updateOverdueStatus')
 
   const { error } = await supabase
     .from('transactions')
@@ -245,7 +239,7 @@ export async function updateOverdueStatus() {
 }
 
 export async function borrowBook(bookId: string) {
-  const supabase = await createClient()
+  const supabase = await createClient('transactions.borrowBook')
 
   // Get current user
   const { data: { user }, error: authError } = await supabase.auth.getUser()
@@ -254,74 +248,40 @@ export async function borrowBook(bookId: string) {
     return { success: false, error: 'Authentication required' }
   }
 
-  // Check if book is available
-  const { data: book, error: bookError } = await supabase
-    .from('books')
-    .select('available_copies, title')
-    .eq('id', bookId)
-    .single()
-
-  if (bookError || !book) {
-    return { success: false, error: 'Book not found' }
-  }
-
-  if (book.available_copies <= 0) {
-    return { success: false, error: 'Book is not available' }
-  }
-
-  // Check if user already has this book issued
-  const { data: existingTransaction } = await supabase
-    .from('transactions')
-    .select('*')
-    .eq('book_id', bookId)
-    .eq('user_id', user.id)
-    .eq('status', 'issued')
-    .single()
-
-  if (existingTransaction) {
-    return { success: false, error: 'You already have this book borrowed' }
-  }
-
   const dueDate = calculateDueDate()
 
-  // Create transaction
-  const { error: transactionError } = await supabase
-    .from('transactions')
-    .insert([{
-      book_id: bookId,
-      user_id: user.id,
-      issued_by: user.id, // Self-issue
-      due_date: dueDate,
-      status: 'issued',
-      notes: 'Self-borrowed online',
-    }])
-
-  if (transactionError) {
-    return { success: false, error: transactionError.message }
-  }
-
-  // Update book available copies
-  const { error: updateError } = await supabase
-    .from('books')
-    .update({ available_copies: book.available_copies - 1 })
-    .eq('id', bookId)
-
-  if (updateError) {
-    return { success: false, error: updateError.message }
+  // Self-issue: takes a copy and creates the loan in one database transaction
+  const { data: transaction, error } = await supabase
+    .rpc('issue_book', {
+      p_book_id: bookId,
+      p_user_id: user.id,
+      p_due_date: dueDate,
+      p_issued_by: user.id,
+      p_notes: 'Self-borrowed online',
+    })
+    .select('*, book:books(title)')
+    .single<Transaction>()
+
+  if (error || !transaction) {
+    const message = error?.message === 'User already has this book issued'
+      ? 'You already have this book borrowed'
+      : error?.message || 'Book not found'
+    return { success: false, error: message }
   }
 
+  invalidateTags(CATALOGUE_TAG)
   revalidatePath('/member/books')
   revalidatePath('/member/my-books')
   revalidatePath('/member')
   
   return { 
     success: true, 
-    message: `Successfully borrowed "${book.title}". Due date: ${new Date(dueDate).toLocaleDateString()}` 
+    message: `Successfully borrowed "${transaction.book?.title}". Due date: ${new Date(dueDate).toLocaleDateString()}` 
   }
 }
 
 export async function memberReturnBook(transactionId: string) {
-  const supabase = await createClient()
+  const supabase = await createClient('transactions.memberReturnBook')
 
   // Get current user
   const { data: { user }, error: authError } = await supabase.auth.getUser()
@@ -330,64 +290,23 @@ export async function memberReturnBook(transactionId: string) {
     return { success: false, error: 'Authentication required' }
   }
 
-  // Get transaction details and verify it belongs to the user
-  const { data: transaction, error: fetchError } = await supabase
-    .from('transactions')
-    .select('*, books(*)')
-    .eq('id', transactionId)
-    .eq('user_id', user.id)
-    .eq('status', 'issued')
-    .single()
+  // Member returns it themselves; p_user_id limits this to their own loans
+  const { data: transaction, error } = await supabase
+    .rpc('return_book', { p_transaction_id: transactionId, p_returned_by: user.id, p_user_id: user.id })
+    .single<Transaction>()
 
-  if (fetchError || !transaction) {
+  if (error || !transaction) {
     return { success: false, error: 'Transaction not found or already returned' }
   }
 
-  const returnDate = new Date().toISOString()
-  const fineAmount = calculateFine(transaction.due_date, returnDate)
-  const status = isOverdue(transaction.due_date) ? 'overdue' : 'returned'
-
-  // Update transaction
-  const { error: updateError } = await supabase
-    .from('transactions')
-    .update({
-      return_date: returnDate,
-      returned_by: user.id, // Member returns it themselves
-      status: status,
-      fine_amount: fineAmount,
-    })
-    .eq('id', transactionId)
-
-  if (updateError) {
-    return { success: false, error: updateError.message }
-  }
-
-  // Update book available copies
-  const { error: bookError } = await supabase
-    .from('books')
-    .update({ available_copies: transaction.books.available_copies + 1 })
-    .eq('id', transaction.book_id)
-
-  if (bookError) {
-    return { success: false, error: bookError.message }
-  }
-
-  // Create fine record if applicable
-  if (fineAmount > 0) {
-    await supabase
-      .from('fines')
-      .insert([{
-        transaction_id: transactionId,
-        user_id: user.id,
-        amount: fineAmount,
-        reason: `Overdue fine for "${transaction.books.title}"`,
-      }])
-  }
+  const fineAmount = transaction.fine_amount
 
+  invalidateTags(CATALOGUE_TAG)
   revalidatePath('/member/my-books')
   revalidatePath('/member/history')
   revalidatePath('/member/fines')
   revalidatePath('/member')
+  revalidatePath('/librarian/reservations')
   
   return { 
     success: true, 
@@ -5,7 +5,7 @@ import { createClient } from '@/lib/supabase/server'
 import type { Profile, UserRole } from '@/types'
 
 export async function getAllUsers(role?: UserRole): Promise<Profile[]> {
-  const supabase = await createClient()
+  const supabase = await createClient('users.getAllUsers')
 
   let query = supabase
     .from('profiles')
@@ -26,7 +26,7 @@ export async function getAllUsers(role?: UserRole): Promise<Profile[]> {
 }
 
 export async function getUser(userId: string): Promise<Profile | null> {
-  const supabase = await createClient()
+  const supabase = await createClient('users.getUser')
 
   const { data, error } = await supabase
     .from('profiles')
@@ -42,7 +42,7 @@ export async function getUser(userId: string): Promise<Profile | null> {
 }
 
 export async function updateUserRole(userId: string, role: UserRole) {
-  const supabase = await createClient()
+  const supabase = await createClient('users.updateUserRole')
 
   const { error } = await supabase
     .from('profiles')
@@ -58,7 +58,7 @@ export async function updateUserRole(userId: string, role: UserRole) {
 }
 
 export async function deleteUser(userId: string) {
-  const supabase = await createClient()
+  const supabase = await createClient('users.deleteUser')
 
   // Note: This will cascade delete related records due to foreign key constraints
   const { error } = await supabase.auth.admin.deleteUser(userId)
@@ -72,7 +72,7 @@ export async function deleteUser(userId: string) {
 }
 
 export async function searchUsers(query: string): Promise<Profile[]> {
-  const supabase = await createClient()
+  const supabase = await createClient('users.searchUsers')
 
   const { data, error } = await supabase
     .from('profiles')
@@ -88,7 +88,7 @@ export async function searchUsers(query: string): Promise<Profile[]> {
 }
 
 export async function getUserStats(userId: string) {
-  const supabase = await createClient()
+  const supabase = await createClient('users.getUserStats')
 
   const [
     { count: totalBorrowed },
@@ -132,7 +132,7 @@ export async function getUserStats(userId: string) {
 }
 
 export async function getUserByMemberId(search: string): Promise<Profile | null> {
-  const supabase = await createClient()
+  const supabase = await createClient('users.getUserByMemberId')
 
   const { data, error } = await supabase
     .from('profiles')
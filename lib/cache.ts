@@ -0,0 +1,111 @@
+import type { CacheStats } from '@/types';
+
+/**
+ * In-process cache for read actions whose results are the same for every user.
+ * Entries are grouped by tags; the actions that change the data invalidate their tags
+ * next to their revalidatePath calls. The TTL bounds staleness from writes made by
+ * other server instances or straight to the database.
+ */
+
+export const CATALOGUE_TAG = 'catalogue';
+export const GENRES_TAG = 'genres';
+export const CATALOGUE_TTL_MS = 60 * 1000;
+
+// Oldest entries are dropped beyond this, so one-off searches can't grow the cache without bound
+const MAX_ENTRIES = 500;
+
+interface Entry {
+  value: Promise<unknown>;
+  tags: string[];
+  expiresAt: number;
+}
+
+// Kept on globalThis: Next.js may load this module once for server actions and again for
+// route handlers, and both must see the same entries and counters
+const store = globalThis as typeof globalThis & {
+  lmsCache?: { entries: Map<string, Entry>; counters: { hits: number; misses: number; invalidations: number } };
+};
+store.lmsCache ??= { entries: new Map(), counters: { hits: 0, misses: 0, invalidations: 0 } };
+const { entries, counters } = store.lmsCache;
+
+/**
+ * Cache key for an action and its arguments
+ */
+export function cacheKey(name: string, ...args: unknown[]): string {
+  return `${name}:${JSON.stringify(args)}`;
+}
+
+/**
+ * Return the cached value for key, or load, cache and return it.
+ * Concurrent misses share one load. Loads that throw, or whose result
+ * isCacheable rejects (error fallbacks), are not kept.
+ */
+export async function cached<T>(
+  key: string,
+  tags: string[],
+  load: () => Promise<T>,
+  options: { ttlMs?: number; isCacheable?: (value: T) => boolean } = {}
+): Promise<T> {
+  const entry = entries.get(key);
+  if (entry && entry.expiresAt > Date.now()) {
+    counters.hits++;
+    // Move to the end so eviction drops the least recently used entry
+    entries.delete(key);
+    entries.set(key, entry);
+    return entry.value as Promise<T>;
+  }
+
+  counters.misses++;
+  const value = load();
+  const created: Entry = { value, tags, expiresAt: Date.now() + (options.ttlMs ?? CATALOGUE_TTL_MS) };
+  entries.delete(key);
+  entries.set(key, created);
+  if (entries.size > MAX_ENTRIES) {
+    entries.delete(entries.keys().next().value as string);
+  }
+
+  const drop = () => {
+    if (entries.get(key) === created) {
+      entries.delete(key);
+    }
+  };
+  value.then((result) => {
+    if (options.isCacheable && !options.isCacheable(result)) {
+      drop();
+    }
+  }, drop);
+
+  return value;
+}
+
+/**
+ * Drop every entry carrying any of the tags
+ */
+export function invalidateTags(...tags: string[]): void {
+  for (const [key, entry] of entries) {
+    if (entry.tags.some((tag) => tags.includes(tag))) {
+      entries.delete(key);
+      counters.invalidations++;
+    }
+  }
+}
+
+export function clearCache(): void {
+  counters.invalidations += entries.size;
+  entries.clear();
+}
+
+export function getCacheStats(): CacheStats {
+  const lookups = counters.hits + counters.misses;
+  return {
+    ...counters,
+    entries: entries.size,
+    hitRate: lookups > 0 ? counters.hits / lookups : 0,
+  };
+}
+
+export function resetCacheStats(): void {
+  counters.hits = 0;
+  counters.misses = 0;
+  counters.invalidations = 0;
+}
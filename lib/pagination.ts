@@ -0,0 +1,62 @@
+import type { PaginatedResponse } from '@/types';
+
+export const DEFAULT_PAGE_SIZE = 50;
+
+/**
+ * Opaque cursor for the last row of a page: its sort key values, ending with the id
+ */
+export function encodeCursor(values: (string | number)[]): string {
+  return Buffer.from(JSON.stringify(values)).toString('base64url');
+}
+
+export function decodeCursor(cursor?: string | null): (string | number)[] | null {
+  if (!cursor) {
+    return null;
+  }
+  try {
+    const values = JSON.parse(Buffer.from(cursor, 'base64url').toString());
+    return Array.isArray(values) ? values : null;
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * Quote a value for a PostgREST logic filter, where commas, dots and parentheses are reserved
+ */
+function quoteFilterValue(value: string | number): string {
+  return `"${String(value).replace(/\\/g, '\\\\').replace(/"/g, '\\"')}"`;
+}
+
+/**
+ * PostgREST `or` filter for the rows after (value, id) in (column, id) order.
+ * Pair it with a lte/gte bound on column so the index scan starts at the cursor
+ * instead of filtering every row before it.
+ */
+export function keysetFilter(column: string, value: string | number, id: string | number, ascending: boolean): string {
+  const op = ascending ? 'gt' : 'lt';
+  const quoted = quoteFilterValue(value);
+  return `${column}.${op}.${quoted},and(${column}.eq.${quoted},id.${op}.${quoteFilterValue(id)})`;
+}
+
+/**
+ * Build a page from rows fetched with limit + 1: the extra row only says there is a next page
+ */
+export function toPage<T>(
+  rows: T[] | null,
+  limit: number,
+  cursorValues: (row: T) => (string | number)[],
+  total: number | null = null
+): PaginatedResponse<T> {
+  const data = (rows || []).slice(0, limit);
+  const hasMore = (rows || []).length > limit;
+  return {
+    data,
+    nextCursor: hasMore && data.length > 0 ? encodeCursor(cursorValues(data[data.length - 1])) : null,
+    total,
+  };
+}
+
+export function emptyPage<T>(): PaginatedResponse<T> {
+  return { data: [], nextCursor: null, total: null };
+}
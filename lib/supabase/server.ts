@@ -1,7 +1,9 @@
 import { createServerClient } from '@supabase/ssr'
 import { cookies } from 'next/headers'
+import { telemetryEnabled, tracedFetch } from '@/lib/telemetry'
 
-export async function createClient() {
+// action names the caller (e.g. 'transactions.returnBook') in request timings; see lib/telemetry.ts
+export async function createClient(action?: string) {
   const cookieStore = await cookies()
 
   return createServerClient(
@@ -24,6 +26,7 @@ export async function createClient() {
           }
         },
       },
+      ...(action && telemetryEnabled() ? { global: { fetch: tracedFetch(action) } } : {}),
     }
   )
 }
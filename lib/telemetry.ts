@@ -0,0 +1,110 @@
+/**
+ * Opt-in timing of the Supabase requests made by server actions and server components.
+ * With LMS_TELEMETRY_URL set, createClient(name) gives its client a fetch that records one span
+ * per request, tagged with the action name and an id shared by every request of that call.
+ * Spans are posted in batches to the URL (tests/telemetry_collector.py), or written to stdout
+ * as JSON lines when it is "console". Unset, clients use the plain fetch.
+ */
+
+const TELEMETRY_URL = process.env.LMS_TELEMETRY_URL;
+const FLUSH_INTERVAL_MS = 1000;
+const MAX_BATCH = 200;
+
+export interface QuerySpan {
+  action: string;
+  // Shared by every request of one createClient() call, i.e. one action invocation
+  invocation: string;
+  // Epoch ms at which createClient() was called, so the collector can time the whole action
+  action_start: number;
+  // 'GET books', 'POST rpc/return_book', 'GET auth/user'
+  name: string;
+  status: number;
+  start: number;
+  duration_ms: number;
+}
+
+// Kept on globalThis for the same reason as lib/cache.ts: one buffer per server process
+const store = globalThis as typeof globalThis & {
+  lmsTelemetry?: { buffer: QuerySpan[]; timer: ReturnType<typeof setTimeout> | null };
+};
+store.lmsTelemetry ??= { buffer: [], timer: null };
+const state = store.lmsTelemetry;
+
+export function telemetryEnabled(): boolean {
+  return Boolean(TELEMETRY_URL);
+}
+
+/**
+ * Short name for a Supabase request: the PostgREST table or RPC, or the GoTrue endpoint
+ */
+export function requestName(url: string, method: string): string {
+  const { pathname } = new URL(url);
+  const rest = pathname.match(/\/rest\/v1\/(.+)$/);
+  if (rest) {
+    return `${method} ${rest[1]}`;
+  }
+  const auth = pathname.match(/\/auth\/v1\/(.+)$/);
+  return auth ? `${method} auth/${auth[1]}` : `${method} ${pathname}`;
+}
+
+function flush(): void {
+  state.timer = null;
+  const spans = state.buffer.splice(0);
+  if (spans.length === 0 || !TELEMETRY_URL) {
+    return;
+  }
+  // Best effort: a collector that is not running must not slow down or fail the action
+  fetch(TELEMETRY_URL, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ spans }),
+    cache: 'no-store',
+  }).catch(() => {});
+}
+
+function record(span: QuerySpan): void {
+  if (TELEMETRY_URL === 'console') {
+    console.log(JSON.stringify({ type: 'lms.query', ...span }));
+    return;
+  }
+  state.buffer.push(span);
+  if (state.buffer.length >= MAX_BATCH) {
+    flush();
+  } else if (!state.timer) {
+    state.timer = setTimeout(flush, FLUSH_INTERVAL_MS);
+  }
+}
+
+/**
+ * fetch for one action invocation's Supabase client. The span ends when the response headers
+ * arrive, which for PostgREST's small JSON bodies is nearly the whole request.
+ */
+export function tracedFetch(action: string): typeof fetch {
+  const invocation = crypto.randomUUID();
+  const actionStart = Date.now();
+
+  return async (input, init) => {
+    const request = input instanceof Request ? input : null;
+    const url = request ? request.url : input.toString();
+    const method = (init?.method ?? request?.method ?? 'GET').toUpperCase();
+    const start = Date.now();
+    const startedAt = performance.now();
+    let status = 0;
+
+    try {
+      const response = await fetch(input, init);
+      status = response.status;
+      return response;
+    } finally {
+      record({
+        action,
+        invocation,
+        action_start: actionStart,
+        name: requestName(url, method),
+        status,
+        start,
+        duration_ms: Math.round((performance.now() - startedAt) * 10) / 10,
+      });
+    }
+  };
+}
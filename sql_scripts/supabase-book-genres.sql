@@ -0,0 +1,19 @@
+-- Distinct Genres
+-- Run this after supabase-schema.sql
+-- getGenres used to download the genre of every book and de-duplicate it in JS. book_genres()
+-- walks idx_books_genre one genre at a time (a loose index scan), so it reads one index entry
+-- per genre however many books there are.
+
+CREATE OR REPLACE FUNCTION book_genres()
+RETURNS TABLE (genre TEXT) AS $$
+  WITH RECURSIVE genres AS (
+    (SELECT b.genre FROM books b ORDER BY b.genre LIMIT 1)
+    UNION ALL
+    SELECT (SELECT b.genre FROM books b WHERE b.genre > g.genre ORDER BY b.genre LIMIT 1)
+    FROM genres g
+    WHERE g.genre IS NOT NULL
+  )
+  SELECT g.genre FROM genres g WHERE g.genre IS NOT NULL;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION book_genres() IS 'Distinct book genres in order, read with a loose index scan; called by getGenres';
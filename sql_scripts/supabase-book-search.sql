@@ -0,0 +1,49 @@
+-- Indexed Catalogue Search
+-- Run this after supabase-schema.sql
+-- Leading-wildcard ILIKE can't use the B-tree indexes on books, so searchBooks and getAllBooks
+-- scanned the whole catalogue. Trigram indexes serve both substring matches and fuzzy matches.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_books_title_trgm ON books USING GIN (title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_books_author_trgm ON books USING GIN (author gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_books_isbn_trgm ON books USING GIN (isbn gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_books_genre_trgm ON books USING GIN (genre gin_trgm_ops);
+
+-- The query as a literal ILIKE pattern: %, _ and \ typed by the user match themselves
+CREATE OR REPLACE FUNCTION book_search_pattern(p_query TEXT)
+RETURNS TEXT AS $$
+  SELECT '%' || regexp_replace(btrim(p_query), '([\\%_])', '\\\1', 'g') || '%';
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Books matching a search box query, best matches first:
+--   1. title starts with the query
+--   2. title, author, ISBN or genre contains the query
+--   3. a word in the title or author is close to the query (typos, e.g. "pythn" finds "Python")
+-- Within each group books are ordered by trigram word similarity, then title.
+-- Plain SQL and STABLE so PostgREST filters, counts and ranges are planned together with it.
+CREATE OR REPLACE FUNCTION search_books(p_query TEXT)
+RETURNS SETOF books AS $$
+  SELECT b.*
+  FROM books b
+  WHERE b.title ILIKE book_search_pattern(p_query)
+     OR b.author ILIKE book_search_pattern(p_query)
+     OR b.isbn ILIKE book_search_pattern(p_query)
+     OR b.genre ILIKE book_search_pattern(p_query)
+     OR btrim(p_query) <% b.title
+     OR btrim(p_query) <% b.author
+  ORDER BY
+    CASE
+      WHEN b.title ILIKE ltrim(book_search_pattern(p_query), '%') THEN 0
+      WHEN b.title ILIKE book_search_pattern(p_query)
+        OR b.author ILIKE book_search_pattern(p_query)
+        OR b.isbn ILIKE book_search_pattern(p_query)
+        OR b.genre ILIKE book_search_pattern(p_query) THEN 1
+      ELSE 2
+    END,
+    GREATEST(word_similarity(btrim(p_query), b.title), word_similarity(btrim(p_query), b.author)) DESC,
+    b.title,
+    b.id;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION search_books(TEXT) IS 'Ranked, typo-tolerant catalogue search backed by trigram indexes; called by searchBooks and getAllBooks';
@@ -0,0 +1,141 @@
+-- Atomic Issue and Return
+-- Run this after supabase-schema.sql and supabase-borrow-requests.sql, then run
+-- supabase-reservation-queue.sql: return_book hands returned copies to the reservation queue
+-- through reservation_hand_off, which that script defines, and fails until it exists.
+-- issueBook, borrowBook, approveBorrowRequest, returnBook and memberReturnBook used to read
+-- available_copies, write a transaction and then write available_copies back. Two concurrent
+-- issues could both read the last copy. Each function below is one database transaction: the
+-- conditional decrement locks the book row, so concurrent issues of a book queue behind each other
+-- and a book can never be issued past total_copies.
+
+-- Issues a book, or raises 'Book is not available' / 'User already has this book issued'
+CREATE OR REPLACE FUNCTION issue_book(
+  p_book_id UUID,
+  p_user_id UUID,
+  p_due_date TIMESTAMP WITH TIME ZONE,
+  p_issued_by UUID,
+  p_notes TEXT DEFAULT NULL
+)
+RETURNS transactions AS $$
+DECLARE
+  v_transaction transactions;
+BEGIN
+  UPDATE books
+  SET available_copies = available_copies - 1
+  WHERE id = p_book_id AND available_copies > 0;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Book is not available';
+  END IF;
+
+  -- Safe without a unique index: other issues of this book wait on the row lock taken above
+  IF EXISTS (
+    SELECT 1 FROM transactions
+    WHERE book_id = p_book_id AND user_id = p_user_id AND status = 'issued'
+  ) THEN
+    RAISE EXCEPTION 'User already has this book issued';
+  END IF;
+
+  INSERT INTO transactions (book_id, user_id, issued_by, due_date, status, notes)
+  VALUES (p_book_id, p_user_id, p_issued_by, p_due_date, 'issued', p_notes)
+  RETURNING * INTO v_transaction;
+
+  RETURN v_transaction;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Approves a pending borrow request and issues its book in the same transaction.
+-- If the book can't be issued the request stays pending.
+CREATE OR REPLACE FUNCTION approve_borrow_request(p_request_id UUID, p_reviewed_by UUID)
+RETURNS transactions AS $$
+DECLARE
+  v_request borrow_requests;
+BEGIN
+  -- Claims the request, so two librarians approving it at once issue the book only once
+  UPDATE borrow_requests
+  SET status = 'approved', reviewed_by = p_reviewed_by, reviewed_at = TIMEZONE('utc'::TEXT, NOW())
+  WHERE id = p_request_id AND status = 'pending'
+  RETURNING * INTO v_request;
+
+  IF NOT FOUND THEN
+    IF EXISTS (SELECT 1 FROM borrow_requests WHERE id = p_request_id) THEN
+      RAISE EXCEPTION 'Only pending requests can be approved';
+    END IF;
+    RAISE EXCEPTION 'Request not found';
+  END IF;
+
+  RETURN issue_book(
+    v_request.book_id, v_request.user_id, v_request.requested_due_date, p_reviewed_by,
+    'Approved from borrow request'
+  );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Returns a book: closes the loan, gives the copy back and records any fine.
+-- Pass p_user_id to only allow returning that member's own loan.
+-- Fines follow calculateFine in lib/helpers.ts, like sync_overdue_fines.
+-- Runs as the owner so it can hand the copy to the reservation queue, so it checks the caller
+-- itself: a member may only return their own loan, as themselves. Direct connections and the
+-- service role have no auth.uid() and may return any loan.
+CREATE OR REPLACE FUNCTION return_book(p_transaction_id UUID, p_returned_by UUID, p_user_id UUID DEFAULT NULL)
+RETURNS transactions AS $$
+DECLARE
+  v_now TIMESTAMP WITH TIME ZONE := NOW();
+  v_transaction transactions;
+  v_title TEXT;
+BEGIN
+  IF auth.uid() IS NOT NULL
+    AND (p_user_id IS DISTINCT FROM auth.uid() OR p_returned_by IS DISTINCT FROM auth.uid())
+    AND NOT EXISTS (SELECT 1 FROM profiles WHERE id = auth.uid() AND role IN ('admin', 'librarian'))
+  THEN
+    RAISE EXCEPTION 'Only staff can return other members'' loans';
+  END IF;
+
+  -- return_date IS NULL makes a second return of the same loan a no-op instead of an extra copy
+  UPDATE transactions t
+  SET
+    return_date = v_now,
+    returned_by = p_returned_by,
+    status = CASE WHEN t.due_date < v_now THEN 'overdue' ELSE 'returned' END,
+    fine_amount = GREATEST(FLOOR(EXTRACT(EPOCH FROM (v_now - t.due_date)) / 86400)::INTEGER, 0) * 10
+  WHERE t.id = p_transaction_id
+    AND t.return_date IS NULL
+    AND (p_user_id IS NULL OR t.user_id = p_user_id)
+  RETURNING t.* INTO v_transaction;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Transaction not found or already returned';
+  END IF;
+
+  UPDATE books
+  SET available_copies = LEAST(available_copies + 1, total_copies)
+  WHERE id = v_transaction.book_id
+  RETURNING title INTO v_title;
+
+  IF v_transaction.fine_amount > 0 THEN
+    -- syncOverdueFines may already have opened a fine for this loan; settle its amount instead of adding another
+    UPDATE fines
+    SET amount = v_transaction.fine_amount
+    WHERE transaction_id = v_transaction.id AND paid = FALSE;
+
+    IF NOT FOUND THEN
+      INSERT INTO fines (transaction_id, user_id, amount, reason)
+      VALUES (v_transaction.id, v_transaction.user_id, v_transaction.fine_amount, format('Overdue fine for "%s"', v_title));
+    END IF;
+  END IF;
+
+  -- The copy goes straight to the head of the reservation queue, if anyone is waiting
+  -- (supabase-reservation-queue.sql)
+  PERFORM reservation_hand_off(v_transaction.book_id);
+
+  RETURN v_transaction;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Signed-in users only: return_book trusts a caller without auth.uid(), and anon has none
+REVOKE EXECUTE ON FUNCTION return_book(UUID, UUID, UUID) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION return_book(UUID, UUID, UUID) TO authenticated;
+
+COMMENT ON FUNCTION issue_book(UUID, UUID, TIMESTAMP WITH TIME ZONE, UUID, TEXT) IS 'Atomically takes a copy and creates the loan; called by issueBook and borrowBook';
+COMMENT ON FUNCTION approve_borrow_request(UUID, UUID) IS 'Atomically approves a pending request and issues the book; called by approveBorrowRequest';
+COMMENT ON FUNCTION return_book(UUID, UUID, UUID) IS 'Atomically closes a loan, returns the copy, records the fine and hands the copy to the reservation queue; called by returnBook and memberReturnBook';
@@ -0,0 +1,55 @@
+-- Normalised ISBN Key
+-- Run this after supabase-schema.sql
+-- books.isbn holds ISBNs as they were typed: with or without hyphens, ISBN-10 or ISBN-13.
+-- tests/catalogue_io.py imports them as hyphen-free ISBN-13s, so it upserts on this key
+-- instead of the raw column, and "0-13-468599-7" and "9780134685991" are the same book.
+
+-- Hyphen-free ISBN-13 of an ISBN-10 or ISBN-13; anything else comes back with only its
+-- hyphens and spaces removed. Must agree with normalize_isbn() in tests/catalogue_io.py.
+CREATE OR REPLACE FUNCTION isbn13(p_isbn TEXT)
+RETURNS TEXT AS $$
+DECLARE
+  v_isbn TEXT := upper(regexp_replace(p_isbn, '[[:space:]-]', '', 'g'));
+  v_sum INTEGER := 0;
+BEGIN
+  IF v_isbn !~ '^[0-9]{9}[0-9X]$' THEN
+    RETURN v_isbn;
+  END IF;
+
+  -- An ISBN-10 with a wrong check digit is left alone rather than mapped onto a real book
+  FOR i IN 1..10 LOOP
+    v_sum := v_sum + (11 - i) * CASE WHEN substr(v_isbn, i, 1) = 'X' THEN 10 ELSE substr(v_isbn, i, 1)::INTEGER END;
+  END LOOP;
+  IF v_sum % 11 <> 0 THEN
+    RETURN v_isbn;
+  END IF;
+
+  v_isbn := '978' || left(v_isbn, 9);
+  v_sum := 0;
+  FOR i IN 1..12 LOOP
+    v_sum := v_sum + substr(v_isbn, i, 1)::INTEGER * CASE WHEN i % 2 = 0 THEN 3 ELSE 1 END;
+  END LOOP;
+  RETURN v_isbn || ((10 - v_sum % 10) % 10)::TEXT;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE STRICT;
+
+-- The unique index can't be built while one book is catalogued under two forms of its ISBN
+DO $$
+DECLARE
+  v_duplicates TEXT;
+BEGIN
+  SELECT string_agg(isbns, '; ') INTO v_duplicates
+  FROM (
+    SELECT string_agg(isbn, ', ' ORDER BY isbn) AS isbns
+    FROM books
+    GROUP BY isbn13(isbn)
+    HAVING COUNT(*) > 1
+  ) d;
+
+  IF v_duplicates IS NOT NULL THEN
+    RAISE EXCEPTION 'Books catalogued twice under different forms of one ISBN, merge them first: %', v_duplicates;
+  END IF;
+END $$;
+
+-- Arbiter of INSERT ... ON CONFLICT (isbn13(isbn)) in catalogue imports
+CREATE UNIQUE INDEX IF NOT EXISTS idx_books_isbn13 ON books (isbn13(isbn));
@@ -0,0 +1,13 @@
+-- Keyset Pagination Indexes
+-- Run this after supabase-schema.sql and supabase-borrow-requests.sql
+-- The getAll* listings page by (sort column, id) instead of OFFSET. Each index matches a
+-- listing's ORDER BY, so any page is read by seeking to the cursor and scanning one page of entries.
+
+CREATE INDEX IF NOT EXISTS idx_books_title_id ON books(title, id);
+CREATE INDEX IF NOT EXISTS idx_transactions_issue_date_id ON transactions(issue_date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_fines_created_at_id ON fines(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_borrow_requests_request_date_id ON borrow_requests(request_date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_reservations_reservation_date_id ON reservations(reservation_date DESC, id DESC);
+
+-- idx_books_title_id covers every query idx_books_title served
+DROP INDEX IF EXISTS idx_books_title;
@@ -0,0 +1,285 @@
+-- Precomputed Dashboard Stats
+-- Run this after supabase-schema.sql
+-- getDashboardStats sums a few library_stats rows instead of scanning books and fines
+
+-- The counters are spread over LIBRARY_STATS_SHARDS rows and summed on read. Each trigger adds
+-- its change to the row of its backend's shard, so concurrent issues, returns and payments
+-- lock different rows instead of queueing on one. A backend always uses the same shard, so a
+-- transaction holds at most one stats row and two transactions can't deadlock over them.
+-- Earlier versions kept a single row keyed by id; the counters are derived, so it is rebuilt.
+DO $$
+BEGIN
+  IF EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_schema = 'public' AND table_name = 'library_stats' AND column_name = 'id'
+  ) THEN
+    DROP TABLE library_stats;
+  END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS library_stats (
+  shard INTEGER PRIMARY KEY CHECK (shard >= 0 AND shard < 16),
+  total_copies BIGINT NOT NULL DEFAULT 0,
+  available_copies BIGINT NOT NULL DEFAULT 0,
+  total_members BIGINT NOT NULL DEFAULT 0,
+  active_transactions BIGINT NOT NULL DEFAULT 0,
+  overdue_transactions BIGINT NOT NULL DEFAULT 0,
+  total_fines DECIMAL(14, 2) NOT NULL DEFAULT 0,
+  unpaid_fines DECIMAL(14, 2) NOT NULL DEFAULT 0,
+  pending_reservations BIGINT NOT NULL DEFAULT 0,
+  refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc'::TEXT, NOW()) NOT NULL
+);
+
+-- Must match the CHECK on library_stats.shard
+CREATE OR REPLACE FUNCTION library_stats_shard()
+RETURNS INTEGER AS $$
+  SELECT pg_backend_pid() % 16;
+$$ LANGUAGE sql STABLE;
+
+-- Recount everything from scratch into shard 0 and zero the others. Run after bulk loads that
+-- bypass triggers (session_replication_role = replica) or whenever the counters are in doubt.
+CREATE OR REPLACE FUNCTION refresh_library_stats()
+RETURNS VOID AS $$
+BEGIN
+  INSERT INTO library_stats (shard) SELECT generate_series(0, 15) ON CONFLICT (shard) DO NOTHING;
+  -- Writers wait while the recount runs, so no trigger adds a change the recount already saw
+  LOCK TABLE library_stats IN EXCLUSIVE MODE;
+
+  UPDATE library_stats SET
+    total_copies = 0,
+    available_copies = 0,
+    total_members = 0,
+    active_transactions = 0,
+    overdue_transactions = 0,
+    total_fines = 0,
+    unpaid_fines = 0,
+    pending_reservations = 0,
+    refreshed_at = TIMEZONE('utc'::TEXT, NOW())
+  WHERE shard <> 0;
+
+  UPDATE library_stats SET
+    total_copies = (SELECT COALESCE(SUM(total_copies), 0) FROM books),
+    available_copies = (SELECT COALESCE(SUM(available_copies), 0) FROM books),
+    total_members = (SELECT COUNT(*) FROM profiles WHERE role = 'member'),
+    active_transactions = (SELECT COUNT(*) FROM transactions WHERE status = 'issued'),
+    overdue_transactions = (SELECT COUNT(*) FROM transactions WHERE status = 'overdue'),
+    total_fines = (SELECT COALESCE(SUM(amount), 0) FROM fines),
+    unpaid_fines = (SELECT COALESCE(SUM(amount), 0) FROM fines WHERE paid = FALSE),
+    pending_reservations = (SELECT COUNT(*) FROM reservations WHERE status = 'pending'),
+    refreshed_at = TIMEZONE('utc'::TEXT, NOW())
+  WHERE shard = 0;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- The dashboard counters. The catalogue totals are public, like books itself; the circulation
+-- and fine counters are NULL unless the caller is an admin or librarian.
+CREATE OR REPLACE FUNCTION dashboard_stats()
+RETURNS TABLE (
+  total_copies BIGINT,
+  available_copies BIGINT,
+  total_members BIGINT,
+  active_transactions BIGINT,
+  overdue_transactions BIGINT,
+  total_fines DECIMAL(14, 2),
+  unpaid_fines DECIMAL(14, 2),
+  pending_reservations BIGINT
+) AS $$
+  WITH totals AS (
+    SELECT
+      SUM(s.total_copies)::BIGINT AS total_copies,
+      SUM(s.available_copies)::BIGINT AS available_copies,
+      SUM(s.total_members)::BIGINT AS total_members,
+      SUM(s.active_transactions)::BIGINT AS active_transactions,
+      SUM(s.overdue_transactions)::BIGINT AS overdue_transactions,
+      SUM(s.total_fines) AS total_fines,
+      SUM(s.unpaid_fines) AS unpaid_fines,
+      SUM(s.pending_reservations)::BIGINT AS pending_reservations
+    FROM library_stats s
+  ),
+  caller AS (
+    SELECT EXISTS (
+      SELECT 1 FROM profiles WHERE id = auth.uid() AND role IN ('admin', 'librarian')
+    ) AS is_staff
+  )
+  SELECT
+    t.total_copies,
+    t.available_copies,
+    CASE WHEN c.is_staff THEN t.total_members END,
+    CASE WHEN c.is_staff THEN t.active_transactions END,
+    CASE WHEN c.is_staff THEN t.overdue_transactions END,
+    CASE WHEN c.is_staff THEN t.total_fines END,
+    CASE WHEN c.is_staff THEN t.unpaid_fines END,
+    CASE WHEN c.is_staff THEN t.pending_reservations END
+  FROM totals t, caller c;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- Statement-level triggers: a bulk insert or update adjusts the counters once, using the
+-- transition tables. The shard row is only touched when a counter actually changes.
+
+CREATE OR REPLACE FUNCTION library_stats_books_changed()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_total BIGINT := 0;
+  v_available BIGINT := 0;
+BEGIN
+  IF TG_OP <> 'DELETE' THEN
+    SELECT v_total + COALESCE(SUM(total_copies), 0), v_available + COALESCE(SUM(available_copies), 0)
+    INTO v_total, v_available FROM new_rows;
+  END IF;
+  IF TG_OP <> 'INSERT' THEN
+    SELECT v_total - COALESCE(SUM(total_copies), 0), v_available - COALESCE(SUM(available_copies), 0)
+    INTO v_total, v_available FROM old_rows;
+  END IF;
+
+  IF v_total <> 0 OR v_available <> 0 THEN
+    UPDATE library_stats SET
+      total_copies = total_copies + v_total,
+      available_copies = available_copies + v_available
+    WHERE shard = library_stats_shard();
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION library_stats_profiles_changed()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_members BIGINT := 0;
+BEGIN
+  IF TG_OP <> 'DELETE' THEN
+    SELECT v_members + COUNT(*) FILTER (WHERE role = 'member') INTO v_members FROM new_rows;
+  END IF;
+  IF TG_OP <> 'INSERT' THEN
+    SELECT v_members - COUNT(*) FILTER (WHERE role = 'member') INTO v_members FROM old_rows;
+  END IF;
+
+  IF v_members <> 0 THEN
+    UPDATE library_stats SET total_members = total_members + v_members WHERE shard = library_stats_shard();
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION library_stats_transactions_changed()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_active BIGINT := 0;
+  v_overdue BIGINT := 0;
+BEGIN
+  IF TG_OP <> 'DELETE' THEN
+    SELECT
+      v_active + COUNT(*) FILTER (WHERE status = 'issued'),
+      v_overdue + COUNT(*) FILTER (WHERE status = 'overdue')
+    INTO v_active, v_overdue FROM new_rows;
+  END IF;
+  IF TG_OP <> 'INSERT' THEN
+    SELECT
+      v_active - COUNT(*) FILTER (WHERE status = 'issued'),
+      v_overdue - COUNT(*) FILTER (WHERE status = 'overdue')
+    INTO v_active, v_overdue FROM old_rows;
+  END IF;
+
+  IF v_active <> 0 OR v_overdue <> 0 THEN
+    UPDATE library_stats SET
+      active_transactions = active_transactions + v_active,
+      overdue_transactions = overdue_transactions + v_overdue
+    WHERE shard = library_stats_shard();
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION library_stats_fines_changed()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_total DECIMAL(14, 2) := 0;
+  v_unpaid DECIMAL(14, 2) := 0;
+BEGIN
+  IF TG_OP <> 'DELETE' THEN
+    SELECT
+      v_total + COALESCE(SUM(amount), 0),
+      v_unpaid + COALESCE(SUM(amount) FILTER (WHERE paid = FALSE), 0)
+    INTO v_total, v_unpaid FROM new_rows;
+  END IF;
+  IF TG_OP <> 'INSERT' THEN
+    SELECT
+      v_total - COALESCE(SUM(amount), 0),
+      v_unpaid - COALESCE(SUM(amount) FILTER (WHERE paid = FALSE), 0)
+    INTO v_total, v_unpaid FROM old_rows;
+  END IF;
+
+  IF v_total <> 0 OR v_unpaid <> 0 THEN
+    UPDATE library_stats SET
+      total_fines = total_fines + v_total,
+      unpaid_fines = unpaid_fines + v_unpaid
+    WHERE shard = library_stats_shard();
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION library_stats_reservations_changed()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_pending BIGINT := 0;
+BEGIN
+  IF TG_OP <> 'DELETE' THEN
+    SELECT v_pending + COUNT(*) FILTER (WHERE status = 'pending') INTO v_pending FROM new_rows;
+  END IF;
+  IF TG_OP <> 'INSERT' THEN
+    SELECT v_pending - COUNT(*) FILTER (WHERE status = 'pending') INTO v_pending FROM old_rows;
+  END IF;
+
+  IF v_pending <> 0 THEN
+    UPDATE library_stats SET pending_reservations = pending_reservations + v_pending WHERE shard = library_stats_shard();
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Transition tables need one trigger per event
+DO $$
+DECLARE
+  v_table TEXT;
+BEGIN
+  FOREACH v_table IN ARRAY ARRAY['books', 'profiles', 'transactions', 'fines', 'reservations'] LOOP
+    EXECUTE format('DROP TRIGGER IF EXISTS library_stats_%1$s_insert ON %1$I', v_table);
+    EXECUTE format('DROP TRIGGER IF EXISTS library_stats_%1$s_update ON %1$I', v_table);
+    EXECUTE format('DROP TRIGGER IF EXISTS library_stats_%1$s_delete ON %1$I', v_table);
+
+    EXECUTE format(
+      'CREATE TRIGGER library_stats_%1$s_insert AFTER INSERT ON %1$I '
+      'REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION library_stats_%1$s_changed()',
+      v_table);
+    EXECUTE format(
+      'CREATE TRIGGER library_stats_%1$s_update AFTER UPDATE ON %1$I '
+      'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION library_stats_%1$s_changed()',
+      v_table);
+    EXECUTE format(
+      'CREATE TRIGGER library_stats_%1$s_delete AFTER DELETE ON %1$I '
+      'REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION library_stats_%1$s_changed()',
+      v_table);
+  END LOOP;
+END $$;
+
+-- Initial counts
+SELECT refresh_library_stats();
+
+-- Staff read the counters directly; everyone else goes through dashboard_stats(). Only the
+-- SECURITY DEFINER triggers and refresh_library_stats() write.
+ALTER TABLE library_stats ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Admins and librarians can view library stats" ON library_stats;
+
+CREATE POLICY "Admins and librarians can view library stats" ON library_stats
+  FOR SELECT USING (
+    EXISTS (
+      SELECT 1 FROM profiles WHERE id = auth.uid() AND role IN ('admin', 'librarian')
+    )
+  );
+
+-- Runs as the owner and locks the whole table; only tests/generate_dataset.py calls it, over a
+-- direct database connection. Supabase grants EXECUTE to anon and authenticated by name.
+REVOKE EXECUTE ON FUNCTION refresh_library_stats() FROM PUBLIC, anon, authenticated;
+
+COMMENT ON TABLE library_stats IS 'Dashboard counters sharded over 16 rows and summed by dashboard_stats(), kept current by statement-level triggers; see refresh_library_stats()';
@@ -0,0 +1,55 @@
+-- Background Maintenance
+-- Run this after supabase-schema.sql and supabase-overdue-fines.sql
+-- State and batch functions for tests/maintenance_worker.py, which marks loans overdue, syncs
+-- overdue fines and expires reservations on a schedule instead of on page loads. Each task
+-- remembers how far it got, so a run only visits rows whose due date or expiry date (or, for
+-- fines, a whole day past the due date) was crossed since the previous run.
+
+CREATE TABLE IF NOT EXISTS maintenance_state (
+  task TEXT PRIMARY KEY,
+  processed_until TIMESTAMP WITH TIME ZONE NOT NULL,
+  last_run_at TIMESTAMP WITH TIME ZONE NOT NULL,
+  last_run_rows INTEGER NOT NULL DEFAULT 0
+);
+
+-- Pending reservations by expiry, for the expiry sweep
+CREATE INDEX IF NOT EXISTS idx_reservations_pending_expiry_date ON reservations(expiry_date) WHERE status = 'pending';
+
+-- Open loans whose overdue fine changes in (p_from, p_to]: those that fall due, or pass another
+-- whole day overdue, inside the window. A short window takes one index range on
+-- idx_transactions_open_due_date per day back to the oldest open loan, so the cost follows the
+-- loans found rather than all open loans. A NULL p_from (first run) or a window of a day or
+-- more takes every open loan due by p_to.
+CREATE OR REPLACE FUNCTION overdue_fine_candidates(p_from TIMESTAMP WITH TIME ZONE, p_to TIMESTAMP WITH TIME ZONE)
+RETURNS TABLE (id UUID) AS $$
+  WITH params AS (
+    SELECT p_from IS NULL OR p_to - p_from >= INTERVAL '1 day' AS whole
+  )
+  SELECT DISTINCT t.id
+  FROM params
+  CROSS JOIN LATERAL generate_series(
+    0,
+    CASE WHEN params.whole THEN 0 ELSE COALESCE(CEIL(EXTRACT(EPOCH FROM (p_to - (
+      SELECT MIN(o.due_date) FROM transactions o WHERE o.return_date IS NULL
+    ))) / 86400)::INTEGER, 0) END
+  ) AS k
+  JOIN LATERAL (
+    SELECT t.id
+    FROM transactions t
+    WHERE t.return_date IS NULL
+      AND (params.whole OR t.due_date > p_from - k * INTERVAL '1 day')
+      AND t.due_date <= p_to - k * INTERVAL '1 day'
+      AND t.status IN ('issued', 'overdue')
+  ) t ON TRUE;
+$$ LANGUAGE sql STABLE;
+
+-- sync_overdue_fines for the given loans only, as of p_now. It takes the same advisory lock,
+-- so it can run alongside request-time syncs without duplicating fines.
+CREATE OR REPLACE FUNCTION sync_overdue_fines_batch(p_transaction_ids UUID[], p_now TIMESTAMP WITH TIME ZONE DEFAULT NOW())
+RETURNS TABLE (fines_created INTEGER, fines_updated INTEGER) AS $$
+  SELECT * FROM sync_overdue_fines(p_transaction_ids => p_transaction_ids, p_now => p_now);
+$$ LANGUAGE sql;
+
+COMMENT ON TABLE maintenance_state IS 'How far each maintenance_worker.py task has processed; processed_until is the end of its last completed window';
+COMMENT ON FUNCTION overdue_fine_candidates(TIMESTAMP WITH TIME ZONE, TIMESTAMP WITH TIME ZONE) IS 'Open loans whose overdue fine changes between two times';
+COMMENT ON FUNCTION sync_overdue_fines_batch(UUID[], TIMESTAMP WITH TIME ZONE) IS 'sync_overdue_fines restricted to a batch of loans; called by maintenance_worker.py';
@@ -0,0 +1,242 @@
+-- Member Page Read Models
+-- Run this after supabase-schema.sql and supabase-borrow-requests.sql
+-- /member, /member/my-books, /member/history and /member/requests used to embed whole book and
+-- profile rows into every loan and request. member_loans and member_requests hold one row per
+-- loan / request with only the columns those pages render, so a member's pages read one index
+-- range of one table. Statement-level triggers keep both tables current on issue, return,
+-- fine payment, request review, book edits and reviewer renames.
+
+CREATE TABLE IF NOT EXISTS member_loans (
+  id UUID PRIMARY KEY REFERENCES transactions(id) ON DELETE CASCADE,
+  user_id UUID NOT NULL,
+  book_id UUID NOT NULL,
+  title TEXT NOT NULL,
+  author TEXT NOT NULL,
+  genre TEXT NOT NULL,
+  isbn TEXT NOT NULL,
+  location TEXT,
+  issue_date TIMESTAMP WITH TIME ZONE NOT NULL,
+  due_date TIMESTAMP WITH TIME ZONE NOT NULL,
+  return_date TIMESTAMP WITH TIME ZONE,
+  status TEXT NOT NULL,
+  fine_amount DECIMAL(10, 2) NOT NULL DEFAULT 0,
+  fine_paid BOOLEAN NOT NULL DEFAULT FALSE
+);
+
+CREATE TABLE IF NOT EXISTS member_requests (
+  id UUID PRIMARY KEY REFERENCES borrow_requests(id) ON DELETE CASCADE,
+  user_id UUID NOT NULL,
+  book_id UUID NOT NULL,
+  title TEXT NOT NULL,
+  author TEXT NOT NULL,
+  request_date TIMESTAMP WITH TIME ZONE NOT NULL,
+  requested_due_date TIMESTAMP WITH TIME ZONE NOT NULL,
+  status TEXT NOT NULL,
+  reviewed_by UUID,
+  reviewer_name TEXT,
+  reviewed_at TIMESTAMP WITH TIME ZONE,
+  rejection_reason TEXT
+);
+
+-- getUserTransactions and getUserBorrowRequests: newest first for one member
+CREATE INDEX IF NOT EXISTS idx_member_loans_user_issue_date ON member_loans(user_id, issue_date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_member_requests_user_request_date ON member_requests(user_id, request_date DESC, id DESC);
+-- getUserActiveTransactions: the few open loans, without walking the member's whole history
+CREATE INDEX IF NOT EXISTS idx_member_loans_user_active ON member_loans(user_id, issue_date DESC) WHERE status = 'issued';
+-- Book edits and reviewer renames find the rows to rewrite
+CREATE INDEX IF NOT EXISTS idx_member_loans_book_id ON member_loans(book_id);
+CREATE INDEX IF NOT EXISTS idx_member_requests_book_id ON member_requests(book_id);
+CREATE INDEX IF NOT EXISTS idx_member_requests_reviewed_by ON member_requests(reviewed_by);
+
+-- Rebuild both tables from scratch. Run after bulk loads that bypass triggers
+-- (session_replication_role = replica) or whenever the read models are in doubt.
+CREATE OR REPLACE FUNCTION refresh_member_read_models()
+RETURNS VOID AS $$
+BEGIN
+  TRUNCATE member_loans, member_requests;
+
+  INSERT INTO member_loans (
+    id, user_id, book_id, title, author, genre, isbn, location,
+    issue_date, due_date, return_date, status, fine_amount, fine_paid
+  )
+  SELECT
+    t.id, t.user_id, t.book_id, b.title, b.author, b.genre, b.isbn, b.location,
+    t.issue_date, t.due_date, t.return_date, t.status, COALESCE(t.fine_amount, 0), COALESCE(t.fine_paid, FALSE)
+  FROM transactions t
+  JOIN books b ON b.id = t.book_id;
+
+  INSERT INTO member_requests (
+    id, user_id, book_id, title, author, request_date, requested_due_date,
+    status, reviewed_by, reviewer_name, reviewed_at, rejection_reason
+  )
+  SELECT
+    r.id, r.user_id, r.book_id, b.title, b.author, r.request_date, r.requested_due_date,
+    r.status, r.reviewed_by, p.full_name, r.reviewed_at, r.rejection_reason
+  FROM borrow_requests r
+  JOIN books b ON b.id = r.book_id
+  LEFT JOIN profiles p ON p.id = r.reviewed_by;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Upserts the inserted or updated loans. Updates that change none of the copied columns
+-- (notes, updated_at) are skipped by the WHERE on the conflict action.
+CREATE OR REPLACE FUNCTION member_loans_transactions_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO member_loans (
+    id, user_id, book_id, title, author, genre, isbn, location,
+    issue_date, due_date, return_date, status, fine_amount, fine_paid
+  )
+  SELECT
+    t.id, t.user_id, t.book_id, b.title, b.author, b.genre, b.isbn, b.location,
+    t.issue_date, t.due_date, t.return_date, t.status, COALESCE(t.fine_amount, 0), COALESCE(t.fine_paid, FALSE)
+  FROM new_rows t
+  JOIN books b ON b.id = t.book_id
+  ON CONFLICT (id) DO UPDATE SET
+    user_id = EXCLUDED.user_id,
+    book_id = EXCLUDED.book_id,
+    title = EXCLUDED.title,
+    author = EXCLUDED.author,
+    genre = EXCLUDED.genre,
+    isbn = EXCLUDED.isbn,
+    location = EXCLUDED.location,
+    issue_date = EXCLUDED.issue_date,
+    due_date = EXCLUDED.due_date,
+    return_date = EXCLUDED.return_date,
+    status = EXCLUDED.status,
+    fine_amount = EXCLUDED.fine_amount,
+    fine_paid = EXCLUDED.fine_paid
+  WHERE (member_loans.*) IS DISTINCT FROM (EXCLUDED.*);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION member_requests_borrow_requests_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO member_requests (
+    id, user_id, book_id, title, author, request_date, requested_due_date,
+    status, reviewed_by, reviewer_name, reviewed_at, rejection_reason
+  )
+  SELECT
+    r.id, r.user_id, r.book_id, b.title, b.author, r.request_date, r.requested_due_date,
+    r.status, r.reviewed_by, p.full_name, r.reviewed_at, r.rejection_reason
+  FROM new_rows r
+  JOIN books b ON b.id = r.book_id
+  LEFT JOIN profiles p ON p.id = r.reviewed_by
+  ON CONFLICT (id) DO UPDATE SET
+    user_id = EXCLUDED.user_id,
+    book_id = EXCLUDED.book_id,
+    title = EXCLUDED.title,
+    author = EXCLUDED.author,
+    request_date = EXCLUDED.request_date,
+    requested_due_date = EXCLUDED.requested_due_date,
+    status = EXCLUDED.status,
+    reviewed_by = EXCLUDED.reviewed_by,
+    reviewer_name = EXCLUDED.reviewer_name,
+    reviewed_at = EXCLUDED.reviewed_at,
+    rejection_reason = EXCLUDED.rejection_reason
+  WHERE (member_requests.*) IS DISTINCT FROM (EXCLUDED.*);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Copies edited book details into existing loans and requests. Copy-count changes on every
+-- issue and return touch none of these columns, so they rewrite nothing.
+CREATE OR REPLACE FUNCTION member_read_models_books_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM new_rows n JOIN old_rows o ON o.id = n.id
+    WHERE (n.title, n.author, n.genre, n.isbn, n.location) IS DISTINCT FROM (o.title, o.author, o.genre, o.isbn, o.location)
+  ) THEN
+    RETURN NULL;
+  END IF;
+
+  UPDATE member_loans l
+  SET title = n.title, author = n.author, genre = n.genre, isbn = n.isbn, location = n.location
+  FROM new_rows n
+  WHERE l.book_id = n.id
+    AND (l.title, l.author, l.genre, l.isbn, l.location) IS DISTINCT FROM (n.title, n.author, n.genre, n.isbn, n.location);
+
+  UPDATE member_requests r
+  SET title = n.title, author = n.author
+  FROM new_rows n
+  WHERE r.book_id = n.id
+    AND (r.title, r.author) IS DISTINCT FROM (n.title, n.author);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Keeps the reviewer's name on reviewed requests current when a librarian renames themselves
+CREATE OR REPLACE FUNCTION member_requests_profiles_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+  UPDATE member_requests r
+  SET reviewer_name = n.full_name
+  FROM new_rows n
+  WHERE r.reviewed_by = n.id
+    AND r.reviewer_name IS DISTINCT FROM n.full_name;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Deletes cascade through the foreign keys, so only inserts and updates need triggers
+DROP TRIGGER IF EXISTS member_loans_transactions_insert ON transactions;
+DROP TRIGGER IF EXISTS member_loans_transactions_update ON transactions;
+DROP TRIGGER IF EXISTS member_requests_borrow_requests_insert ON borrow_requests;
+DROP TRIGGER IF EXISTS member_requests_borrow_requests_update ON borrow_requests;
+DROP TRIGGER IF EXISTS member_read_models_books_update ON books;
+DROP TRIGGER IF EXISTS member_requests_profiles_update ON profiles;
+
+CREATE TRIGGER member_loans_transactions_insert AFTER INSERT ON transactions
+REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION member_loans_transactions_changed();
+CREATE TRIGGER member_loans_transactions_update AFTER UPDATE ON transactions
+REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION member_loans_transactions_changed();
+CREATE TRIGGER member_requests_borrow_requests_insert AFTER INSERT ON borrow_requests
+REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION member_requests_borrow_requests_changed();
+CREATE TRIGGER member_requests_borrow_requests_update AFTER UPDATE ON borrow_requests
+REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION member_requests_borrow_requests_changed();
+CREATE TRIGGER member_read_models_books_update AFTER UPDATE ON books
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION member_read_models_books_changed();
+CREATE TRIGGER member_requests_profiles_update AFTER UPDATE ON profiles
+REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION member_requests_profiles_changed();
+
+-- Members read only their own rows, staff read everything, and only the triggers write
+ALTER TABLE member_loans ENABLE ROW LEVEL SECURITY;
+ALTER TABLE member_requests ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view their own loans" ON member_loans;
+DROP POLICY IF EXISTS "Admins and librarians can view all loans" ON member_loans;
+DROP POLICY IF EXISTS "Users can view their own requests" ON member_requests;
+DROP POLICY IF EXISTS "Admins and librarians can view all requests" ON member_requests;
+
+CREATE POLICY "Users can view their own loans" ON member_loans
+  FOR SELECT USING (user_id = auth.uid());
+
+CREATE POLICY "Admins and librarians can view all loans" ON member_loans
+  FOR SELECT USING (
+    EXISTS (
+      SELECT 1 FROM profiles WHERE id = auth.uid() AND role IN ('admin', 'librarian')
+    )
+  );
+
+CREATE POLICY "Users can view their own requests" ON member_requests
+  FOR SELECT USING (user_id = auth.uid());
+
+CREATE POLICY "Admins and librarians can view all requests" ON member_requests
+  FOR SELECT USING (
+    EXISTS (
+      SELECT 1 FROM profiles WHERE id = auth.uid() AND role IN ('admin', 'librarian')
+    )
+  );
+
+-- Initial contents
+SELECT refresh_member_read_models();
+
+-- Runs as the owner and rewrites both tables; only tests/generate_dataset.py calls it, over a
+-- direct database connection. Supabase grants EXECUTE to anon and authenticated by name.
+REVOKE EXECUTE ON FUNCTION refresh_member_read_models() FROM PUBLIC, anon, authenticated;
+
+COMMENT ON TABLE member_loans IS 'One row per loan with the book columns the member pages render; kept current by triggers, see refresh_member_read_models()';
+COMMENT ON TABLE member_requests IS 'One row per borrow request with the book columns /member/requests renders; kept current by triggers';
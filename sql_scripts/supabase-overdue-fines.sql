@@ -0,0 +1,92 @@
+-- Set-Based Overdue Fine Sync
+-- Run this after supabase-schema.sql
+-- Replaces the per-transaction loop in syncOverdueFines (lib/actions/fines.ts) with one statement
+
+-- Indexes for finding open overdue loans and their unpaid fines
+CREATE INDEX IF NOT EXISTS idx_transactions_open_due_date ON transactions(due_date) WHERE return_date IS NULL;
+CREATE INDEX IF NOT EXISTS idx_fines_unpaid_transaction_id ON fines(transaction_id) WHERE paid = FALSE;
+
+-- Creates or updates the unpaid fine of every overdue loan and marks the loan overdue.
+-- Amounts follow calculateFine in lib/helpers.ts: whole days past the due date times 10.
+-- Pass loan ids to sync only those (the maintenance worker's batches), a user id to sync one
+-- member, or neither for everyone. p_now is the time fines are worked out at; it may be in the
+-- past, for a worker catching up on a window, but never in the future.
+-- The one-argument version took only p_user_id; drop it so named-argument calls aren't ambiguous.
+DROP FUNCTION IF EXISTS sync_overdue_fines(UUID);
+
+CREATE OR REPLACE FUNCTION sync_overdue_fines(
+  p_transaction_ids UUID[] DEFAULT NULL,
+  p_user_id UUID DEFAULT NULL,
+  p_now TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+)
+RETURNS TABLE (fines_created INTEGER, fines_updated INTEGER) AS $$
+BEGIN
+  IF p_now > NOW() THEN
+    RAISE EXCEPTION 'Cannot charge fines as of %, which is in the future', p_now;
+  END IF;
+
+  -- Concurrent syncs would both see "no fine yet" and insert duplicates
+  PERFORM pg_advisory_xact_lock(hashtext('sync_overdue_fines'));
+
+  RETURN QUERY
+  WITH overdue AS (
+    SELECT
+      t.id,
+      t.user_id,
+      t.fine_amount,
+      t.status,
+      b.title,
+      FLOOR(EXTRACT(EPOCH FROM (p_now - t.due_date)) / 86400)::INTEGER AS days_overdue
+    FROM transactions t
+    JOIN books b ON b.id = t.book_id
+    WHERE t.return_date IS NULL
+      AND t.status IN ('issued', 'overdue')
+      AND t.due_date < p_now
+      AND (p_transaction_ids IS NULL OR t.id = ANY(p_transaction_ids))
+      AND (p_user_id IS NULL OR t.user_id = p_user_id)
+  ),
+  computed AS (
+    SELECT
+      o.*,
+      GREATEST(o.days_overdue, 0) * 10 AS amount,
+      format('Overdue fine for "%s" (%s days overdue)', o.title, o.days_overdue) AS reason
+    FROM overdue o
+  ),
+  open_fines AS (
+    SELECT DISTINCT ON (f.transaction_id) f.id, f.transaction_id, f.amount
+    FROM fines f
+    JOIN computed c ON c.id = f.transaction_id
+    WHERE f.paid = FALSE
+    ORDER BY f.transaction_id, f.created_at
+  ),
+  updated AS (
+    UPDATE fines f
+    SET amount = c.amount, reason = c.reason
+    FROM open_fines o
+    JOIN computed c ON c.id = o.transaction_id
+    WHERE f.id = o.id AND o.amount <> c.amount
+    RETURNING f.id
+  ),
+  inserted AS (
+    INSERT INTO fines (transaction_id, user_id, amount, reason)
+    SELECT c.id, c.user_id, c.amount, c.reason
+    FROM computed c
+    WHERE NOT EXISTS (SELECT 1 FROM open_fines o WHERE o.transaction_id = c.id)
+    RETURNING id
+  ),
+  marked AS (
+    UPDATE transactions t
+    SET fine_amount = c.amount, status = 'overdue'
+    FROM computed c
+    WHERE t.id = c.id
+      AND (c.fine_amount IS DISTINCT FROM c.amount OR c.status <> 'overdue')
+    RETURNING t.id
+  )
+  -- Postgres runs every data-modifying CTE, including marked, whether or not it is read
+  SELECT
+    (SELECT COUNT(*) FROM inserted)::INTEGER,
+    (SELECT COUNT(*) FROM updated)::INTEGER;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION sync_overdue_fines(UUID[], UUID, TIMESTAMP WITH TIME ZONE) IS 'Creates or updates unpaid fines for overdue loans in bulk; called by syncOverdueFines and sync_overdue_fines_batch';
@@ -0,0 +1,264 @@
+-- Reservation Queues
+-- Run this after supabase-schema.sql and supabase-circulation.sql
+-- createReservation used to count the pending reservations of a book to pick a queue position,
+-- so two members reserving at once could get the same position, and fulfilling or cancelling a
+-- reservation left a gap. Each book now has a reservation_queues row. Joining the queue takes a
+-- ticket from it under its row lock, and every pending reservation keeps its ticket and a
+-- position with no gaps. The member at the head of the queue is one index probe away, and
+-- return_book hands the returned copy straight to them.
+
+CREATE TABLE IF NOT EXISTS reservation_queues (
+  book_id UUID PRIMARY KEY REFERENCES books(id) ON DELETE CASCADE,
+  length INTEGER NOT NULL DEFAULT 0,
+  last_ticket BIGINT NOT NULL DEFAULT 0
+);
+
+-- Order of joining the queue; never reused, so FIFO order survives compaction
+ALTER TABLE reservations ADD COLUMN IF NOT EXISTS queue_ticket BIGINT;
+
+-- Head of a book's queue, and the queue in order
+CREATE UNIQUE INDEX IF NOT EXISTS idx_reservations_queue ON reservations(book_id, queue_ticket) WHERE status = 'pending';
+
+-- Joins the queue: takes the next ticket and the last position
+CREATE OR REPLACE FUNCTION reservation_queue_enqueue()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF NEW.status = 'pending' THEN
+    INSERT INTO reservation_queues (book_id, length, last_ticket)
+    VALUES (NEW.book_id, 1, 1)
+    ON CONFLICT (book_id) DO UPDATE SET
+      length = reservation_queues.length + 1,
+      last_ticket = reservation_queues.last_ticket + 1
+    RETURNING length, last_ticket INTO NEW.queue_position, NEW.queue_ticket;
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Renumbers the pending reservations of the given books 1..n in ticket order
+CREATE OR REPLACE FUNCTION compact_reservation_queues(p_book_ids UUID[])
+RETURNS VOID AS $$
+BEGIN
+  -- Same lock as joining the queue, so a new reservation can't take a position being renumbered
+  PERFORM 1 FROM reservation_queues WHERE book_id = ANY(p_book_ids) ORDER BY book_id FOR UPDATE;
+
+  -- A reservation locked by another transaction is leaving the queue too, and that transaction
+  -- renumbers the queue again once it gets the queue lock. Waiting for it here instead would
+  -- deadlock: it holds its reservation and waits for the queue lock held by this one.
+  WITH movable AS (
+    SELECT id FROM reservations
+    WHERE book_id = ANY(p_book_ids) AND status = 'pending'
+    FOR UPDATE SKIP LOCKED
+  )
+  UPDATE reservations r
+  SET queue_position = q.position
+  FROM (
+    SELECT id, row_number() OVER (PARTITION BY book_id ORDER BY queue_ticket)::INTEGER AS position
+    FROM reservations
+    WHERE book_id = ANY(p_book_ids) AND status = 'pending'
+  ) q
+  WHERE r.id = q.id
+    AND r.id IN (SELECT id FROM movable)
+    AND r.queue_position IS DISTINCT FROM q.position;
+
+  UPDATE reservation_queues q
+  SET length = (SELECT COUNT(*) FROM reservations r WHERE r.book_id = q.book_id AND r.status = 'pending')
+  WHERE q.book_id = ANY(p_book_ids);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Leaving the queue in any way (fulfilled, cancelled, expired, deleted) closes the gap.
+-- Statement-level, so expiring a batch of reservations renumbers each book once.
+CREATE OR REPLACE FUNCTION reservation_queue_left()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_book_ids UUID[];
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    SELECT array_agg(DISTINCT book_id) INTO v_book_ids FROM old_rows WHERE status = 'pending';
+  ELSE
+    SELECT array_agg(DISTINCT o.book_id) INTO v_book_ids
+    FROM old_rows o
+    JOIN new_rows n ON n.id = o.id
+    WHERE o.status = 'pending' AND n.status <> 'pending';
+  END IF;
+
+  IF v_book_ids IS NOT NULL THEN
+    PERFORM compact_reservation_queues(v_book_ids);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS reservation_queue_enqueue ON reservations;
+DROP TRIGGER IF EXISTS reservation_queue_update ON reservations;
+DROP TRIGGER IF EXISTS reservation_queue_delete ON reservations;
+
+CREATE TRIGGER reservation_queue_enqueue BEFORE INSERT ON reservations
+FOR EACH ROW EXECUTE FUNCTION reservation_queue_enqueue();
+CREATE TRIGGER reservation_queue_update AFTER UPDATE ON reservations
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION reservation_queue_left();
+CREATE TRIGGER reservation_queue_delete AFTER DELETE ON reservations
+REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION reservation_queue_left();
+
+-- Creates the book's queue row if it has none and locks it until the calling transaction ends.
+-- Runs as the owner, because clients can't write reservation_queues (see the policy below).
+-- Only reserve_book calls it; clients can't execute it (see the grants below).
+CREATE OR REPLACE FUNCTION lock_reservation_queue(p_book_id UUID)
+RETURNS VOID AS $$
+BEGIN
+  INSERT INTO reservation_queues (book_id) VALUES (p_book_id) ON CONFLICT (book_id) DO NOTHING;
+  PERFORM 1 FROM reservation_queues WHERE book_id = p_book_id FOR UPDATE;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Reserves a book that has no copy on the shelf, or raises 'Book is currently available...' /
+-- 'You already have a pending reservation for this book'. Runs as the owner so it can lock the
+-- queue, so it checks the caller itself: members may only reserve for themselves. Direct
+-- connections and the service role have no auth.uid() and may reserve for anyone.
+CREATE OR REPLACE FUNCTION reserve_book(p_book_id UUID, p_user_id UUID, p_expiry_date TIMESTAMP WITH TIME ZONE DEFAULT NULL)
+RETURNS reservations AS $$
+DECLARE
+  v_available INTEGER;
+  v_reservation reservations;
+BEGIN
+  IF auth.uid() IS NOT NULL
+    AND p_user_id IS DISTINCT FROM auth.uid()
+    AND NOT EXISTS (SELECT 1 FROM profiles WHERE id = auth.uid() AND role IN ('admin', 'librarian'))
+  THEN
+    RAISE EXCEPTION 'Only staff can reserve books for other members';
+  END IF;
+
+  -- Holding the book row keeps a return from slipping in between this check and joining the
+  -- queue, which would leave the copy on the shelf while the member waits for it
+  SELECT available_copies INTO v_available FROM books WHERE id = p_book_id FOR SHARE;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Book not found';
+  END IF;
+  IF v_available > 0 THEN
+    RAISE EXCEPTION 'Book is currently available. Please borrow it directly.';
+  END IF;
+
+  PERFORM lock_reservation_queue(p_book_id);
+
+  IF EXISTS (
+    SELECT 1 FROM reservations
+    WHERE book_id = p_book_id AND user_id = p_user_id AND status = 'pending'
+  ) THEN
+    RAISE EXCEPTION 'You already have a pending reservation for this book';
+  END IF;
+
+  INSERT INTO reservations (book_id, user_id, expiry_date)
+  VALUES (p_book_id, p_user_id, p_expiry_date)
+  RETURNING * INTO v_reservation;
+
+  RETURN v_reservation;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Issues a copy that just came back to the first member in the queue who can take it (no
+-- expired hold, no copy already on loan) and fulfils their reservation. Returns the new loan,
+-- or NULL if nobody is waiting. Called by return_book with the book row already locked; runs as
+-- the owner because a member returning their own loan issues this one to someone else.
+CREATE OR REPLACE FUNCTION reservation_hand_off(p_book_id UUID)
+RETURNS transactions AS $$
+DECLARE
+  v_next reservations;
+  v_transaction transactions;
+BEGIN
+  PERFORM 1 FROM reservation_queues WHERE book_id = p_book_id FOR UPDATE;
+
+  SELECT r.* INTO v_next
+  FROM reservations r
+  WHERE r.book_id = p_book_id
+    AND r.status = 'pending'
+    AND (r.expiry_date IS NULL OR r.expiry_date > NOW())
+    AND NOT EXISTS (
+      SELECT 1 FROM transactions t
+      WHERE t.book_id = r.book_id AND t.user_id = r.user_id AND t.status = 'issued'
+    )
+  ORDER BY r.queue_ticket
+  LIMIT 1
+  -- Skips a head that is being cancelled or expired right now rather than deadlocking with it
+  -- (see compact_reservation_queues)
+  FOR UPDATE OF r SKIP LOCKED;
+
+  IF NOT FOUND THEN
+    RETURN NULL;
+  END IF;
+
+  v_transaction := issue_book(
+    p_book_id, v_next.user_id, NOW() + INTERVAL '14 days', NULL, 'Issued from reservation queue'
+  );
+
+  -- clock_timestamp, not NOW(): hand-offs queue on the book lock, so this records their real order
+  UPDATE reservations
+  SET status = 'fulfilled', fulfilled_date = clock_timestamp()
+  WHERE id = v_next.id;
+
+  RETURN v_transaction;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Rebuild tickets, positions and queue rows from scratch. Run after bulk loads that bypass
+-- triggers (session_replication_role = replica). Tickets follow the existing positions.
+CREATE OR REPLACE FUNCTION refresh_reservation_queues()
+RETURNS VOID AS $$
+BEGIN
+  UPDATE reservations r
+  SET queue_ticket = q.ticket
+  FROM (
+    SELECT id, row_number() OVER (
+      PARTITION BY book_id ORDER BY queue_position NULLS LAST, reservation_date, id
+    ) AS ticket
+    FROM reservations
+    WHERE status = 'pending'
+  ) q
+  WHERE r.id = q.id AND r.queue_ticket IS DISTINCT FROM q.ticket;
+
+  INSERT INTO reservation_queues (book_id, length, last_ticket)
+  SELECT book_id, COUNT(*), MAX(queue_ticket)
+  FROM reservations
+  WHERE status = 'pending'
+  GROUP BY book_id
+  ON CONFLICT (book_id) DO UPDATE SET length = EXCLUDED.length, last_ticket = EXCLUDED.last_ticket;
+
+  UPDATE reservation_queues q
+  SET length = 0
+  WHERE NOT EXISTS (SELECT 1 FROM reservations r WHERE r.book_id = q.book_id AND r.status = 'pending');
+
+  PERFORM compact_reservation_queues(ARRAY(SELECT book_id FROM reservation_queues WHERE length > 0));
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Number the reservations that already exist
+SELECT refresh_reservation_queues();
+
+-- Only the SECURITY DEFINER functions above write the queues; a client that could rewrite
+-- length or last_ticket would break every position behind it. Staff may read them.
+ALTER TABLE reservation_queues ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Admins and librarians can view reservation queues" ON reservation_queues;
+
+CREATE POLICY "Admins and librarians can view reservation queues" ON reservation_queues
+  FOR SELECT USING (
+    EXISTS (
+      SELECT 1 FROM profiles WHERE id = auth.uid() AND role IN ('admin', 'librarian')
+    )
+  );
+
+-- The queue internals run as the owner and trust their arguments, so clients must not call them
+-- directly. Supabase grants EXECUTE to anon and authenticated by name, not only through PUBLIC.
+REVOKE EXECUTE ON FUNCTION compact_reservation_queues(UUID[]) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION lock_reservation_queue(UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION reservation_hand_off(UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION refresh_reservation_queues() FROM PUBLIC, anon, authenticated;
+
+-- Signed-in users only: reserve_book trusts a caller without auth.uid(), and anon has none
+REVOKE EXECUTE ON FUNCTION reserve_book(UUID, UUID, TIMESTAMP WITH TIME ZONE) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION reserve_book(UUID, UUID, TIMESTAMP WITH TIME ZONE) TO authenticated;
+
+COMMENT ON TABLE reservation_queues IS 'Per-book reservation queue: its length and the last ticket handed out; see reserve_book()';
+COMMENT ON FUNCTION reserve_book(UUID, UUID, TIMESTAMP WITH TIME ZONE) IS 'Atomically joins a book''s reservation queue; called by createReservation';
+COMMENT ON FUNCTION reservation_hand_off(UUID) IS 'Issues a returned copy to the head of the book''s reservation queue; called by return_book';
@@ -11,7 +11,7 @@ INSERT INTO books (isbn, title, author, publisher, publication_year, genre, desc
 ('9781491950296', 'Building Microservices', 'Sam Newman', 'O''Reilly', 2015, 'Programming', 'Designing fine-grained systems with microservices architecture.', 2, 2, 'Section B - Shelf 2'),
 ('9780134757599', 'Refactoring', 'Martin Fowler', 'Addison-Wesley', 2018, 'Programming', 'Improving the design of existing code through refactoring techniques.', 3, 3, 'Section A - Shelf 5'),
 ('9781449355739', 'Designing Data-Intensive Applications', 'Martin Kleppmann', 'O''Reilly', 2017, 'Database', 'The big ideas behind reliable, scalable, and maintainable systems.', 4, 4, 'Section C - Shelf 1'),
-('9780132350884', 'The Pragmatic Programmer', 'Andrew Hunt', 'Addison-Wesley', 2019, 'Programming', 'Your journey to mastery in software development.', 5, 5, 'Section A - Shelf 6'),
+('9780135957059', 'The Pragmatic Programmer', 'Andrew Hunt', 'Addison-Wesley', 2019, 'Programming', 'Your journey to mastery in software development.', 5, 5, 'Section A - Shelf 6'),
 ('9780321125215', 'Domain-Driven Design', 'Eric Evans', 'Addison-Wesley', 2003, 'Software Architecture', 'Tackling complexity in the heart of software.', 2, 2, 'Section D - Shelf 1'),
 
 ('9780262033848', 'Introduction to Algorithms', 'Thomas H. Cormen', 'MIT Press', 2009, 'Computer Science', 'Comprehensive introduction to algorithms and data structures.', 6, 6, 'Section E - Shelf 1'),
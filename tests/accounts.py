@@ -0,0 +1,17 @@
+"""
+Test Accounts
+Credentials of the seeded test users, shared by the browser tests and the HTTP load tools
+"""
+
+import csv
+
+CREDENTIALS = {
+    "admin": ("admin@lms.com", "admin123"),
+    "librarian": ("librarian@lms.com", "lib123"),
+    "member": ("m1@lms.com", "mem1123"),
+}
+
+def load_accounts(path):
+    """Read (email, password) pairs from a CSV file with email,password columns"""
+    with open(path, newline="") as f:
+        return [(row["email"], row["password"]) for row in csv.DictReader(f)]
@@ -0,0 +1,98 @@
+"""
+Catalogue Cache Benchmark
+Loads /member/books and /admin/books with the read cache emptied before each load (cold) and kept (warm), and compares them
+"""
+
+import argparse
+import statistics
+import sys
+
+import driver_pool
+import page_timing
+import session_cache
+
+ROUTES = [("/member/books", "member"), ("/admin/books", "admin")]
+FIELDS = ["ttfb_ms", "ready_ms"]
+
+CACHE_SCRIPT = """
+const done = arguments[arguments.length - 1];
+fetch('/api/cache', { method: arguments[0] })
+  .then(response => response.ok ? response.json() : { error: response.status })
+  .then(done, error => done({ error: String(error) }));
+"""
+
+def cache_request(driver, method="GET"):
+    """Call /api/cache from a staff browser: GET reads the counters, DELETE empties the cache"""
+    stats = driver.execute_async_script(CACHE_SCRIPT, method)
+    if "error" in stats:
+        raise RuntimeError(f"{method} /api/cache failed: {stats['error']}")
+    return stats
+
+def median(records, field):
+    values = [record[field] for record in records if record.get(field) is not None]
+    return statistics.median(values) if values else None
+
+def bench_route(staff, driver, route, loads):
+    """Alternate cold and warm loads of route. Returns (cold records, warm records, hits, misses)."""
+    cold, warm = [], []
+    hits = misses = 0
+    for _ in range(loads):
+        cache_request(staff, "DELETE")
+        cold.append(page_timing.navigate(driver, route))
+        # The cold load filled the cache, so this one reads the same keys from it
+        warm.append(page_timing.navigate(driver, route))
+        stats = cache_request(staff)
+        hits += stats["hits"]
+        misses += stats["misses"]
+    if None in cold + warm:
+        raise AssertionError(f"{route} redirected to {driver.current_url}")
+    return cold, warm, hits, misses
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cold and warm loads of the cached catalogue pages")
+    parser.add_argument("--loads", type=int, default=5, help="cold/warm load pairs per route")
+    args = parser.parse_args()
+
+    # The admin browser empties the cache and reads the counters between loads
+    staff = driver_pool.acquire()
+    drivers = [staff]
+    failed = []
+    try:
+        session_cache.login_as(staff, "admin")
+        print(f"\n  {'Route':<16}{'':<6}" + "".join(f"{field:>12}" for field in FIELDS) + f"{'Hits':>8}{'Misses':>8}")
+        for route, role in ROUTES:
+            driver = staff
+            if role != "admin":
+                driver = driver_pool.acquire()
+                drivers.append(driver)
+            session_cache.login_as(driver, role, route)
+
+            cold, warm, hits, misses = bench_route(staff, driver, route, args.loads)
+            for label, records in (("cold", cold), ("warm", warm)):
+                cells = "".join(
+                    f"{value:>10.0f}ms" if value is not None else f"{'-':>12}"
+                    for value in (median(records, field) for field in FIELDS)
+                )
+                counts = f"{hits:>8}{misses:>8}" if label == "warm" else ""
+                print(f"  {route if label == 'cold' else '':<16}{label:<6}{cells}{counts}")
+
+            cold_ready, warm_ready = median(cold, "ready_ms"), median(warm, "ready_ms")
+            if cold_ready and warm_ready:
+                print(f"  {'':<16}{'':<6}{cold_ready / warm_ready:>11.1f}x faster when warm")
+            # Every warm load should be served from the entries its cold load created
+            if hits < args.loads:
+                failed.append(f"{route}: {hits} cache hits over {args.loads} warm loads")
+    finally:
+        for driver in drivers:
+            driver_pool.release(driver)
+        driver_pool.shutdown()
+
+    for problem in failed:
+        print(f"  {problem}")
+    if failed:
+        print("\n❌ Warm loads are not served from the cache")
+        sys.exit(1)
+    print(f"\n✅ Warm loads served from the cache over {args.loads} load pairs per route")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Overdue Fine Sync Benchmark
+Seeds N overdue loans, times the per-loan syncOverdueFines loop against the set-based RPC and checks the fines
+"""
+
+from datetime import datetime, timezone
+import argparse
+import sys
+import time
+
+import db
+import lms_actions
+from accounts import CREDENTIALS
+from supabase_rest import SupabaseClient
+
+BENCH_USER_ID = "bf000000-0000-4000-8000-000000000001"
+BENCH_EMAIL = "bench-fines@bench.lms"
+BENCH_ISBN_PREFIX = "BENCH-FINES-"
+
+class CountingClient(SupabaseClient):
+    """Counts HTTP round-trips"""
+
+    requests = 0
+
+    def request(self, *args, **kwargs):
+        self.requests += 1
+        return super().request(*args, **kwargs)
+
+def cleanup(conn):
+    with conn.cursor() as cur:
+        # Deleting the user cascades to its profile, transactions and fines
+        cur.execute("DELETE FROM auth.users WHERE id = %s", (BENCH_USER_ID,))
+        cur.execute("DELETE FROM books WHERE isbn LIKE %s", (f"{BENCH_ISBN_PREFIX}%",))
+    conn.commit()
+
+def seed(conn, loans, books, synced_share, seed_value):
+    """A member with `loans` loans 1-60 days overdue; synced_share of them already have a stale unpaid fine"""
+    cleanup(conn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT setseed(%s)", (seed_value / 1000 % 1,))
+        # The on_auth_user_created trigger creates the profile
+        cur.execute(
+            "INSERT INTO auth.users (instance_id, id, aud, role, email, raw_user_meta_data, created_at, updated_at) "
+            "VALUES ('00000000-0000-0000-0000-000000000000', %s, 'authenticated', 'authenticated', %s, "
+            "'{\"full_name\": \"Fine Benchmark\", \"role\": \"member\"}', NOW(), NOW())",
+            (BENCH_USER_ID, BENCH_EMAIL),
+        )
+        cur.execute(
+            "INSERT INTO books (isbn, title, author, genre, total_copies, available_copies) "
+            "SELECT %s || n, 'Benchmark Book ' || n, 'Bench Author', 'Other', %s, 0 "
+            "FROM generate_series(1, %s) AS n",
+            (BENCH_ISBN_PREFIX, loans, books),
+        )
+        cur.execute(
+            """
+            INSERT INTO transactions (book_id, user_id, issue_date, due_date, status)
+            SELECT b.id, %s, l.due_date - INTERVAL '14 days', l.due_date, 'issued'
+            FROM (
+              SELECT n, NOW() - (1 + random() * 59) * INTERVAL '1 day' AS due_date
+              FROM generate_series(0, %s - 1) AS n
+            ) l
+            JOIN (
+              SELECT id, row_number() OVER (ORDER BY isbn) - 1 AS k FROM books WHERE isbn LIKE %s
+            ) b ON b.k = l.n %% %s
+            """,
+            (BENCH_USER_ID, loans, f"{BENCH_ISBN_PREFIX}%", books),
+        )
+        cur.execute(
+            """
+            INSERT INTO fines (transaction_id, user_id, amount, reason)
+            SELECT id, user_id, 10, 'Overdue fine (stale)'
+            FROM transactions
+            WHERE user_id = %s AND random() < %s
+            """,
+            (BENCH_USER_ID, synced_share),
+        )
+    conn.commit()
+
+def verify(conn, started, finished):
+    """Every overdue loan must have exactly one unpaid fine that matches calculateFine"""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT t.id, t.due_date, t.status, t.fine_amount, b.title,
+                   array_agg(f.amount) FILTER (WHERE f.id IS NOT NULL),
+                   array_agg(f.reason) FILTER (WHERE f.id IS NOT NULL)
+            FROM transactions t
+            JOIN books b ON b.id = t.book_id
+            LEFT JOIN fines f ON f.transaction_id = t.id AND f.paid = FALSE
+            WHERE t.user_id = %s
+            GROUP BY t.id, b.title
+            """,
+            (BENCH_USER_ID,),
+        )
+        rows = cur.fetchall()
+
+    problems = []
+    for transaction_id, due_date, status, fine_amount, title, amounts, reasons in rows:
+        # A loan can cross a day boundary while the sync runs
+        expected = {lms_actions.calculate_fine(due_date, started), lms_actions.calculate_fine(due_date, finished)}
+        expected_reasons = {
+            lms_actions.overdue_fine_reason(title, due_date, started),
+            lms_actions.overdue_fine_reason(title, due_date, finished),
+        }
+        if not amounts or len(amounts) != 1:
+            problems.append(f"{transaction_id}: expected one unpaid fine, found {len(amounts or [])}")
+        elif int(amounts[0]) not in expected:
+            problems.append(f"{transaction_id}: fine {amounts[0]}, calculateFine gives {sorted(expected)}")
+        elif reasons[0] not in expected_reasons:
+            problems.append(f"{transaction_id}: unexpected reason {reasons[0]!r}")
+        elif status != "overdue" or int(fine_amount or 0) != int(amounts[0]):
+            problems.append(f"{transaction_id}: transaction is {status} with fine_amount {fine_amount}")
+    return problems, len(rows)
+
+def timed_sync(label, sync, client):
+    client.requests = 0
+    started = datetime.now(timezone.utc)
+    start = time.perf_counter()
+    created, updated = sync(client, BENCH_USER_ID)
+    elapsed = time.perf_counter() - start
+    finished = datetime.now(timezone.utc)
+    print(f"  {label:<22}{elapsed * 1000:>10.0f}ms{client.requests:>10}{created:>10}{updated:>10}")
+    return started, finished, elapsed, created + updated
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and verify the overdue fine sync")
+    parser.add_argument("--loans", type=int, default=1000, help="overdue loans to seed")
+    parser.add_argument("--books", type=int, default=50)
+    parser.add_argument("--synced-share", type=float, default=0.3, help="share of loans that already have a stale fine")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--skip-loop", action="store_true", help="only run the set-based sync (the loop is slow at 10k+)")
+    parser.add_argument("--keep", action="store_true", help="leave the benchmark rows in the database")
+    args = parser.parse_args()
+
+    conn = db.connect()
+    client = CountingClient()
+    client.sign_in(*CREDENTIALS["librarian"])
+
+    variants = [] if args.skip_loop else [("per-loan loop", lms_actions.sync_overdue_fines_loop)]
+    variants.append(("set-based RPC", lms_actions.sync_overdue_fines))
+
+    print(f"\n  {'Sync':<22}{'Time':>12}{'Requests':>10}{'Created':>10}{'Updated':>10}")
+    failures = []
+    timings = {}
+    try:
+        for label, sync in variants:
+            seed(conn, args.loans, args.books, args.synced_share, args.seed)
+            started, finished, timings[label], _ = timed_sync(label, sync, client)
+            problems, checked = verify(conn, started, finished)
+            failures += [f"{label}: {problem}" for problem in problems]
+
+        # Running again with nothing changed must not create or rewrite fines
+        started, finished, _, changed = timed_sync("set-based RPC (rerun)", lms_actions.sync_overdue_fines, client)
+        problems, checked = verify(conn, started, finished)
+        failures += [f"rerun: {problem}" for problem in problems]
+        if changed:
+            failures.append(f"rerun: {changed} fines were written again with nothing overdue having changed")
+    finally:
+        if not args.keep:
+            cleanup(conn)
+        conn.close()
+
+    if len(timings) == 2:
+        print(f"\n  Set-based sync is {timings['per-loan loop'] / timings['set-based RPC']:.1f}x faster for {args.loans} loans")
+
+    if failures:
+        print(f"\n❌ {len(failures)} fines do not match calculateFine:")
+        for failure in failures[:20]:
+            print(f"  {failure}")
+        sys.exit(1)
+    print(f"\n✅ Fines for all {checked} overdue loans match calculateFine")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""
+Catalogue Import and Export
+Streams books in from CSV or MARC-in-JSON lines with chunked validation, ISBN de-duplication and checkpoints, and streams the catalogue and loan history back out
+"""
+
+from datetime import date, datetime, timezone
+from itertools import islice
+import argparse
+import csv
+import gzip
+import json
+import os
+import re
+import sys
+import time
+
+import db
+from generate_dataset import GENRES
+
+IMPORT_COLUMNS = [
+    "isbn", "title", "author", "publisher", "publication_year", "genre", "description", "total_copies", "location",
+]
+VALID_GENRES = {genre.lower(): genre for genre, _ in GENRES}
+CHUNK = 5000
+# Same URL as getBookCoverUrl(isbn, 'L') in lib/helpers.ts, which createBook stores
+COVER_URL = "https://covers.openlibrary.org/b/isbn/{isbn}-L.jpg"
+
+STAGING_SQL = (
+    "CREATE TEMP TABLE IF NOT EXISTS book_import ("
+    "isbn TEXT, title TEXT, author TEXT, publisher TEXT, publication_year INTEGER, genre TEXT, "
+    "description TEXT, total_copies INTEGER, location TEXT, cover_url TEXT"
+    ") ON COMMIT DELETE ROWS"
+)
+STAGING_COLUMNS = IMPORT_COLUMNS + ["cover_url"]
+
+# Metadata only: the copy counts of a book already in the catalogue are circulation state
+UPDATED_COLUMNS = ["title", "author", "publisher", "publication_year", "genre", "description", "location", "cover_url"]
+
+UPSERT_SQL = """
+INSERT INTO books (isbn, title, author, publisher, publication_year, genre, description,
+                   total_copies, available_copies, location, cover_url)
+SELECT isbn, title, author, publisher, publication_year, genre, description,
+       total_copies, total_copies, location, cover_url
+FROM book_import
+ON CONFLICT (isbn13(isbn)) DO {action}
+RETURNING (xmax = 0) AS inserted
+"""
+
+EXPORTS = {
+    "books": (
+        "SELECT isbn, title, author, publisher, publication_year, genre, description, total_copies, "
+        "available_copies, location, created_at FROM books ORDER BY isbn"
+    ),
+    "transactions": (
+        "SELECT t.id, b.isbn, b.title, p.member_id, p.email AS member_email, t.issue_date, t.due_date, "
+        "t.return_date, t.status, t.fine_amount, t.fine_paid, t.notes "
+        "FROM transactions t JOIN books b ON b.id = t.book_id JOIN profiles p ON p.id = t.user_id "
+        "{where}ORDER BY t.issue_date, t.id"
+    ),
+}
+
+# Reading
+
+def open_text(path, mode="r"):
+    """Open a text file, gzip-compressed if it ends in .gz"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+def detect_format(path):
+    name = path[:-3] if path.endswith(".gz") else path
+    return "csv" if name.endswith(".csv") else "jsonl"
+
+def read_records(f, fmt):
+    """Yield (record number, dict or None, parse error or None) for every record in the file"""
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(f), start=1):
+            yield number, row, None
+        return
+
+    number = 0
+    for line in f:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield number, None, "not a JSON object"
+            continue
+        yield number, record, None
+
+def marc_subfields(record, tag):
+    """Subfields of every `tag` field of a MARC-in-JSON record, one dict per field (first code wins)"""
+    for field in record.get("fields", []):
+        value = field.get(tag)
+        if isinstance(value, dict):
+            subfields = {}
+            for subfield in value.get("subfields", []):
+                for code, text in subfield.items():
+                    subfields.setdefault(code, text)
+            yield subfields
+
+def marc_value(record, tags, code):
+    """First subfield `code` of the first of `tags` that has it, without ISBD punctuation"""
+    for tag in tags:
+        for subfields in marc_subfields(record, tag):
+            if subfields.get(code):
+                return subfields[code].strip().rstrip(" /:;,.").strip()
+    return None
+
+def from_marc(record):
+    """Map the MARC fields a catalogue record needs onto book columns"""
+    isbn = marc_value(record, ["020"], "a")
+    title = marc_value(record, ["245"], "a")
+    subtitle = marc_value(record, ["245"], "b")
+    # "c2018." or "[2018]" -> "2018"
+    year = re.search(r"\d{4}", marc_value(record, ["264", "260"], "c") or "")
+    subjects = [
+        subfields["a"].strip().rstrip(".")
+        for tag in ("650", "655")
+        for subfields in marc_subfields(record, tag)
+        if subfields.get("a")
+    ]
+    holdings = list(marc_subfields(record, "852"))
+    return {
+        # "0134685997 (pbk.)" -> "0134685997"
+        "isbn": isbn.split()[0] if isbn else None,
+        "title": f"{title}: {subtitle}" if title and subtitle else title,
+        "author": marc_value(record, ["100", "110"], "a"),
+        "publisher": marc_value(record, ["264", "260"], "b"),
+        "publication_year": year.group() if year else None,
+        # First subject heading that is one of the app's genres
+        "genre": next((subject for subject in subjects if subject.lower() in VALID_GENRES), "Other"),
+        "description": marc_value(record, ["520"], "a"),
+        # One 852 holdings field per copy
+        "total_copies": str(len(holdings) or 1),
+        "location": next((subfields.get("h") or subfields.get("b") for subfields in holdings), None),
+    }
+
+# Validation
+
+def isbn13_check_digit(first12):
+    total = sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+def normalize_isbn(value):
+    """ISBN-13 without hyphens, converting ISBN-10s so both forms de-duplicate; None if invalid.
+    The isbn13() SQL function (sql_scripts/supabase-isbn-key.sql) maps existing books the same way."""
+    isbn = re.sub(r"[\s-]", "", str(value or "")).upper()
+    if re.fullmatch(r"\d{9}[\dX]", isbn):
+        total = sum((10 - position) * (10 if char == "X" else int(char)) for position, char in enumerate(isbn))
+        if total % 11:
+            return None
+        isbn = "978" + isbn[:9]
+        return isbn + isbn13_check_digit(isbn)
+    if re.fullmatch(r"\d{13}", isbn) and isbn13_check_digit(isbn[:12]) == isbn[12]:
+        return isbn
+    return None
+
+def _text(value):
+    value = (value or "").strip() if isinstance(value, str) else value
+    return value if value not in ("", None) else None
+
+def validate(record):
+    """Returns (book dict, None) or (None, reasons)"""
+    if "fields" in record:
+        record = from_marc(record)
+
+    errors = []
+    isbn = normalize_isbn(_text(record.get("isbn")))
+    if isbn is None:
+        errors.append(f"invalid ISBN {record.get('isbn')!r}")
+    title, author = _text(record.get("title")), _text(record.get("author"))
+    if not title:
+        errors.append("missing title")
+    if not author:
+        errors.append("missing author")
+
+    genre = VALID_GENRES.get((_text(record.get("genre")) or "").lower())
+    if genre is None:
+        errors.append(f"unknown genre {record.get('genre')!r}")
+
+    year = _text(record.get("publication_year"))
+    if year is not None:
+        try:
+            year = int(year)
+            if not 1000 <= year <= date.today().year + 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            errors.append(f"invalid publication year {record.get('publication_year')!r}")
+
+    copies = _text(record.get("total_copies"))
+    try:
+        copies = int(copies) if copies is not None else 1
+        if copies < 1:
+            raise ValueError
+    except (TypeError, ValueError):
+        errors.append(f"invalid total copies {record.get('total_copies')!r}")
+
+    if errors:
+        return None, errors
+    return {
+        "isbn": isbn,
+        "title": title,
+        "author": author,
+        "publisher": _text(record.get("publisher")),
+        "publication_year": year,
+        "genre": genre,
+        "description": _text(record.get("description")),
+        "total_copies": copies,
+        "location": _text(record.get("location")),
+        "cover_url": COVER_URL.format(isbn=isbn),
+    }, None
+
+# Loading
+
+def load_chunk(conn, books, on_duplicate):
+    """Upsert one chunk of valid books through a temp table. Returns (inserted, updated)."""
+    if on_duplicate == "update":
+        assignments = ", ".join(f"{column} = EXCLUDED.{column}" for column in UPDATED_COLUMNS)
+        current = ", ".join(f"books.{column}" for column in UPDATED_COLUMNS)
+        incoming = ", ".join(f"EXCLUDED.{column}" for column in UPDATED_COLUMNS)
+        # Unchanged rows are left alone, so re-running an import doesn't rewrite the catalogue
+        action = f"UPDATE SET {assignments} WHERE ({current}) IS DISTINCT FROM ({incoming})"
+    else:
+        action = "NOTHING"
+
+    db.copy_rows(conn, "book_import", STAGING_COLUMNS, ([book[column] for column in STAGING_COLUMNS] for book in books))
+    with conn.cursor() as cur:
+        cur.execute(UPSERT_SQL.format(action=action))
+        results = [row[0] for row in cur.fetchall()]
+    inserted = sum(1 for was_inserted in results if was_inserted)
+    return inserted, len(results) - inserted
+
+def checkpoint_path(path):
+    return f"{path}.checkpoint.json"
+
+def load_checkpoint(path, input_path):
+    """Counts of an earlier run of the same input file, or None"""
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return None
+    if checkpoint["input"] != os.path.abspath(input_path) or checkpoint["size"] != os.path.getsize(input_path):
+        raise RuntimeError(f"{path} belongs to a different or changed input file; remove it or pass --restart")
+    return checkpoint
+
+def save_checkpoint(path, input_path, counts):
+    # Write then rename, so a crash mid-write can't leave a half checkpoint behind
+    with open(f"{path}.tmp", "w") as f:
+        json.dump({
+            "input": os.path.abspath(input_path),
+            "size": os.path.getsize(input_path),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+            "counts": counts,
+        }, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+def import_catalogue(conn, path, fmt, chunk_size, on_duplicate, checkpoint, rejects_path):
+    """Validate and upsert the file chunk by chunk, committing and checkpointing after each. Returns the counts."""
+    previous = load_checkpoint(checkpoint, path)
+    counts = previous["counts"] if previous else {
+        "read": 0, "inserted": 0, "updated": 0, "existing": 0, "duplicates": 0, "rejected": 0,
+    }
+    if previous:
+        print(f"  Resuming after record {counts['read']}")
+
+    with conn.cursor() as cur:
+        cur.execute(STAGING_SQL)
+    conn.commit()
+
+    start = time.perf_counter()
+    resumed_at = counts["read"]
+    with open_text(path) as f, open(rejects_path, "a") as rejects:
+        records = islice(read_records(f, fmt), counts["read"], None)
+        while chunk := list(islice(records, chunk_size)):
+            books = {}
+            for number, record, error in chunk:
+                book, errors = validate(record) if record is not None else (None, [error])
+                if errors:
+                    rejects.write(json.dumps({"record": number, "errors": errors, "data": record}) + "\n")
+                    counts["rejected"] += 1
+                elif book["isbn"] in books:
+                    # ON CONFLICT can't touch the same row twice in one statement; the first copy wins
+                    counts["duplicates"] += 1
+                else:
+                    books[book["isbn"]] = book
+
+            inserted, updated = load_chunk(conn, list(books.values()), on_duplicate) if books else (0, 0)
+            conn.commit()
+            rejects.flush()
+            counts["read"] += len(chunk)
+            counts["inserted"] += inserted
+            counts["updated"] += updated
+            counts["existing"] += len(books) - inserted - updated
+            save_checkpoint(checkpoint, path, counts)
+
+            rate = (counts["read"] - resumed_at) / (time.perf_counter() - start)
+            print(
+                f"  {counts['read']:>10} read {counts['inserted']:>10} new {counts['updated']:>8} updated "
+                f"{counts['existing']:>8} existing {counts['rejected']:>7} rejected  {rate:,.0f} records/s"
+            )
+    return counts
+
+# Exporting
+
+def export_query(kind, since=None):
+    where = f"WHERE t.issue_date >= '{since.isoformat()}'::DATE " if since else ""
+    return EXPORTS[kind].format(where=where)
+
+def export(conn, kind, out, fmt, since=None):
+    """Stream a query's rows to out without holding them in memory. Returns rows written for JSONL, bytes for CSV."""
+    query = export_query(kind, since)
+    if fmt == "csv":
+        # COPY TO STDOUT streams straight from the server; gzip compresses as it goes
+        with (gzip.open(out, "wb") if out.endswith(".gz") else open(out, "wb")) as f:
+            return db.copy_out(conn, query, f)
+
+    rows = 0
+    # A named cursor keeps the result set on the server and fetches it CHUNK rows at a time
+    with open_text(out, "w") as f, conn.cursor(name=f"export_{kind}") as cur:
+        cur.itersize = CHUNK
+        cur.execute(f"SELECT row_to_json(e)::TEXT FROM ({query}) e")
+        for (line,) in cur:
+            f.write(line + "\n")
+            rows += 1
+            if rows % (CHUNK * 20) == 0:
+                print(f"  {rows:>10} rows")
+    conn.commit()
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import books and export the catalogue and loan history")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="load books from a CSV or MARC-in-JSON lines file")
+    import_parser.add_argument("path", help=".csv or .jsonl, optionally .gz")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    import_parser.add_argument("--chunk-size", type=int, default=CHUNK, help="records validated and committed together")
+    import_parser.add_argument(
+        "--on-duplicate", choices=["skip", "update"], default="skip",
+        help="what to do with an ISBN already in the catalogue (update changes metadata, never copy counts)",
+    )
+    import_parser.add_argument("--checkpoint", help="default: <path>.checkpoint.json")
+    import_parser.add_argument("--rejects", help="JSON lines of rejected records (default: <path>.rejects.jsonl)")
+    import_parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start from the top")
+
+    export_parser = commands.add_parser("export", help="stream the catalogue or the loan history to a file")
+    export_parser.add_argument("kind", choices=sorted(EXPORTS))
+    export_parser.add_argument("out", help=".csv or .jsonl, optionally .gz")
+    export_parser.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    export_parser.add_argument("--since", type=date.fromisoformat, help="transactions issued on or after YYYY-MM-DD")
+    args = parser.parse_args()
+
+    conn = db.connect()
+    start = time.perf_counter()
+    try:
+        if args.command == "import":
+            checkpoint = args.checkpoint or checkpoint_path(args.path)
+            if args.restart and os.path.exists(checkpoint):
+                os.remove(checkpoint)
+            rejects = args.rejects or f"{args.path}.rejects.jsonl"
+            fmt = args.format or detect_format(args.path)
+            print(f"Importing {args.path} ({fmt}, {args.chunk_size} records per chunk)")
+            counts = import_catalogue(conn, args.path, fmt, args.chunk_size, args.on_duplicate, checkpoint, rejects)
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute("ANALYZE books")
+        else:
+            fmt = args.format or detect_format(args.out)
+            written = export(conn, args.kind, args.out, fmt, args.since)
+    except Exception as e:
+        print(f"❌ {args.command} failed: {e}")
+        if args.command == "import":
+            print(f"  Run the same command again to resume from {checkpoint}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    if args.command == "export":
+        unit = "rows" if fmt == "jsonl" else "bytes"
+        print(f"✅ Exported {args.kind} to {args.out}: {written:,} {unit} in {elapsed:.1f}s")
+        return
+
+    print(
+        f"✅ Imported {counts['read']:,} records in {elapsed:.1f}s: {counts['inserted']:,} new, "
+        f"{counts['updated']:,} updated, {counts['existing']:,} already in the catalogue, "
+        f"{counts['duplicates']:,} repeated in the file, {counts['rejected']:,} rejected"
+    )
+    if counts["rejected"]:
+        print(f"  Rejected records and reasons: {rejects}")
+    # Checkpoints are only for resuming; importing the same file again starts from the top
+    os.remove(checkpoint)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Compare Test Runs
+Diffs two results-<run id>.json reports and flags tests, steps and routes that failed, got slower or run more queries
+"""
+
+import argparse
+import statistics
+import sys
+
+import page_timing
+import perf_budget
+import run_report
+
+def test_key(test):
+    return f"{test['module']}.{test['test']}"
+
+def by_test(report):
+    """Per test: whether every repeat passed, the median duration and the median total of each step kind"""
+    grouped = {}
+    for test in report["tests"]:
+        grouped.setdefault(test_key(test), []).append(test)
+
+    summary = {}
+    for key, repeats in grouped.items():
+        kinds = {kind for test in repeats for kind in test["step_totals_ms"]}
+        summary[key] = {
+            "passed": all(test["status"] == "passed" for test in repeats),
+            "duration_ms": statistics.median(test["duration_ms"] for test in repeats),
+            "steps": {
+                kind: statistics.median(test["step_totals_ms"].get(kind, 0) for test in repeats)
+                for kind in sorted(kinds)
+            },
+        }
+    return summary
+
+def slower(before, after, pct, min_ms):
+    """Percent slowdown if after is more than pct percent and min_ms slower than before, else None"""
+    if before is None or after is None or before <= 0:
+        return None
+    slower_pct = (after - before) / before * 100
+    return slower_pct if slower_pct > pct and after - before > min_ms else None
+
+def compare(base, head, pct, min_ms):
+    """Returns (regressions, improvements), each a list of messages"""
+    regressions, improvements = [], []
+    base_tests, head_tests = by_test(base), by_test(head)
+
+    for key, after in head_tests.items():
+        before = base_tests.get(key)
+        if before is None:
+            if not after["passed"]:
+                regressions.append(f"{key} is new and failing")
+            continue
+        if before["passed"] and not after["passed"]:
+            regressions.append(f"{key} now fails")
+        elif not before["passed"] and after["passed"]:
+            improvements.append(f"{key} now passes")
+
+        measures = [("duration", before["duration_ms"], after["duration_ms"])]
+        measures += [(kind, before["steps"].get(kind), ms) for kind, ms in after["steps"].items()]
+        for name, old, new in measures:
+            slowdown = slower(old, new, pct, min_ms)
+            if slowdown is not None:
+                regressions.append(f"{key} {name} {new:.0f}ms is {slowdown:.0f}% slower ({old:.0f}ms)")
+            speedup = slower(new, old, pct, min_ms)
+            if speedup is not None:
+                improvements.append(f"{key} {name} {new:.0f}ms, was {old:.0f}ms")
+
+    for key in base_tests.keys() - head_tests.keys():
+        regressions.append(f"{key} did not run")
+
+    for route, stats in head.get("routes", {}).items():
+        before = base.get("routes", {}).get(route)
+        if not before:
+            continue
+        for field in page_timing.TIMING_FIELDS:
+            slowdown = slower(before.get(field), stats.get(field), pct, min_ms)
+            if slowdown is not None:
+                regressions.append(
+                    f"{route} {field} {stats[field]:.0f}ms is {slowdown:.0f}% slower ({before[field]:.0f}ms)"
+                )
+        # Any extra query is a regression: it usually means a loop that queries per row
+        if before.get("queries") is not None and stats.get("queries", 0) > before["queries"]:
+            regressions.append(f"{route} runs {stats['queries']} queries, was {before['queries']}")
+
+    return regressions, improvements
+
+def print_totals(base, head):
+    print(f"\n  {'':<10}{'Run':<24}{'Version':<14}{'Passed':>8}{'Failed':>8}{'Time':>10}")
+    for label, report in (("base", base), ("head", head)):
+        totals = report["totals"]
+        print(
+            f"  {label:<10}{report['run_id']:<24}{report.get('app_version') or '-':<14}"
+            f"{totals['passed']:>8}{totals['failed']:>8}{totals['duration_ms'] / 1000:>9.1f}s"
+        )
+
+def main():
+    budgets = perf_budget.load_budgets()
+    parser = argparse.ArgumentParser(description="Compare two test runs and flag regressions")
+    parser.add_argument("base", help="run id or path of the earlier results JSON")
+    parser.add_argument("head", help="run id or path of the later results JSON")
+    parser.add_argument(
+        "--regression-pct", type=float, default=budgets.get("regression_pct", 20),
+        help="allowed slowdown in percent (default from perf_budgets.json)",
+    )
+    parser.add_argument(
+        "--min-regression-ms", type=float, default=budgets.get("min_regression_ms", 0),
+        help="ignore slowdowns smaller than this (default from perf_budgets.json)",
+    )
+    parser.add_argument("--mode", choices=["warn", "fail"], default="fail")
+    args = parser.parse_args()
+
+    base, head = run_report.load(args.base), run_report.load(args.head)
+    regressions, improvements = compare(base, head, args.regression_pct, args.min_regression_ms)
+
+    print_totals(base, head)
+    if improvements:
+        print(f"\n  {len(improvements)} improvement(s):")
+        for message in improvements:
+            print(f"    {message}")
+
+    if regressions:
+        marker = "❌" if args.mode == "fail" else "⚠️"
+        print(f"\n{marker} {len(regressions)} regression(s):")
+        for message in regressions:
+            print(f"  {message}")
+        sys.exit(1 if args.mode == "fail" else 0)
+    print("\n✅ No regressions")
+
+if __name__ == "__main__":
+    main()
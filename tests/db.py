@@ -0,0 +1,79 @@
+"""
+Direct Database Access
+Postgres connection for tools that need more than PostgREST (bulk loads, benchmarks, fixtures)
+"""
+
+import csv
+import io
+import os
+
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+def database_url():
+    """Postgres connection string from LMS_DATABASE_URL or DATABASE_URL"""
+    url = os.environ.get("LMS_DATABASE_URL") or os.environ.get("DATABASE_URL")
+    if not url:
+        raise RuntimeError("Set LMS_DATABASE_URL (or DATABASE_URL) to the project's Postgres connection string")
+    return url
+
+def connect(url=None):
+    """Open a connection with psycopg 3, falling back to psycopg2"""
+    url = url or database_url()
+    if psycopg is not None:
+        return psycopg.connect(url)
+    if psycopg2 is not None:
+        return psycopg2.connect(url)
+    raise RuntimeError("Install psycopg (pip install 'psycopg[binary]') or psycopg2 to connect to Postgres")
+
+def copy_csv(conn, table, columns, path, force_not_null=()):
+    """Bulk load a CSV file with a header row into table using COPY FROM STDIN"""
+    options = "FORMAT csv, HEADER true"
+    if force_not_null:
+        options += f", FORCE_NOT_NULL ({', '.join(force_not_null)})"
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH ({options})"
+
+    with conn.cursor() as cur, open(path, "rb") as f:
+        if psycopg is not None and isinstance(conn, psycopg.Connection):
+            with cur.copy(sql) as copy:
+                while chunk := f.read(1 << 20):
+                    copy.write(chunk)
+        else:
+            cur.copy_expert(sql, f)
+
+def copy_rows(conn, table, columns, rows):
+    """Bulk load an iterable of row tuples into table using COPY FROM STDIN. None loads as NULL."""
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    # Both drivers get the same CSV: psycopg 3's write_row() would send COPY text format instead
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    with conn.cursor() as cur:
+        if psycopg is not None and isinstance(conn, psycopg.Connection):
+            with cur.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+        else:
+            buffer.seek(0)
+            cur.copy_expert(sql, buffer)
+
+def copy_out(conn, query, f):
+    """Stream the CSV output of a query (with a header row) into the binary file f using COPY TO STDOUT.
+    Returns the number of bytes written."""
+    sql = f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)"
+    with conn.cursor() as cur:
+        if psycopg is not None and isinstance(conn, psycopg.Connection):
+            written = 0
+            with cur.copy(sql) as copy:
+                for chunk in copy:
+                    f.write(chunk)
+                    written += len(chunk)
+            return written
+        start = f.tell()
+        cur.copy_expert(sql, f)
+        return f.tell() - start
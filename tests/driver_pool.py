@@ -0,0 +1,120 @@
+"""
+Shared WebDriver Pool
+Hands out warm Chrome instances, resets them between tests and recycles them after N uses
+"""
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import WebDriverException
+import atexit
+import os
+import threading
+
+import driver_profiles
+
+MAX_USES = int(os.environ.get("LMS_DRIVER_MAX_USES", "10"))
+
+def get_driver(profile=None):
+    """Create and return a Chrome driver instance for a driver profile (default LMS_DRIVER_PROFILE)"""
+    profile = profile or driver_profiles.load_profile()
+    service = Service(profile["chromedriver_path"]) if profile.get("chromedriver_path") else Service()
+    driver = webdriver.Chrome(service=service, options=driver_profiles.build_options(profile))
+    driver_profiles.apply_network_blocks(driver, profile)
+    return driver
+
+def reset_driver(driver):
+    """Clear cookies and storage and park the browser on about:blank"""
+    try:
+        driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+    except WebDriverException:
+        # about:blank and error pages have no storage to clear
+        pass
+    driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    driver.get("about:blank")
+
+class DriverPool:
+    """Pool of idle Chrome instances shared by every test in a process"""
+
+    def __init__(self, max_uses=MAX_USES, profile=None):
+        self.max_uses = max_uses
+        self.profile = profile
+        self.launched = 0
+        self._idle = []
+        self._uses = {}
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Return a warm driver, launching a new Chrome only when none is idle"""
+        while True:
+            with self._lock:
+                driver = self._idle.pop() if self._idle else None
+            if driver is None:
+                break
+            try:
+                driver.current_url
+                return driver
+            except WebDriverException:
+                # Browser died while parked, throw it away and try the next one
+                self._discard(driver)
+
+        if self.profile is None:
+            self.profile = driver_profiles.load_profile()
+        driver = get_driver(self.profile)
+        with self._lock:
+            self.launched += 1
+            self._uses[id(driver)] = 0
+        return driver
+
+    def release(self, driver):
+        """Reset a driver and return it to the pool, or quit it once it is worn out"""
+        with self._lock:
+            uses = self._uses.get(id(driver), 0) + 1
+            self._uses[id(driver)] = uses
+
+        if uses >= self.max_uses:
+            self._discard(driver)
+            return
+
+        try:
+            reset_driver(driver)
+        except WebDriverException:
+            self._discard(driver)
+            return
+
+        with self._lock:
+            self._idle.append(driver)
+
+    def shutdown(self):
+        """Quit every idle driver"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._discard(driver)
+
+    def _discard(self, driver):
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+_pool = DriverPool()
+
+def acquire():
+    """Get a driver from the shared pool"""
+    return _pool.acquire()
+
+def release(driver):
+    """Give a driver back to the shared pool"""
+    _pool.release(driver)
+
+def shutdown():
+    """Quit all pooled drivers"""
+    _pool.shutdown()
+
+def launched_count():
+    """Number of Chrome instances started by this process"""
+    return _pool.launched
+
+atexit.register(shutdown)
@@ -0,0 +1,103 @@
+"""
+Driver Profiles
+Builds Chrome options from a named profile in driver_profiles.json plus environment overrides
+"""
+
+from selenium.webdriver.chrome.options import Options
+import json
+import os
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.environ.get("LMS_DRIVER_CONFIG", os.path.join(TESTS_DIR, "driver_profiles.json"))
+DEFAULT_PROFILE = "functional"
+
+# Paths from the original single-machine setup, used when nothing else is configured
+LEGACY_CHROME_BINARY = "/home/srihasrc/Music/lms/chrome-linux64/chrome"
+LEGACY_CHROMEDRIVER_PATH = os.path.join(TESTS_DIR, "drivers", "chromedriver")
+
+FONT_URL_PATTERNS = ["*.woff", "*.woff2", "*.ttf", "*.otf"]
+IMAGE_URL_PATTERNS = ["*covers.openlibrary.org*"]
+
+LEAN_ARGUMENTS = [
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-dev-shm-usage",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+]
+
+def _env_flag(name):
+    value = os.environ.get(name)
+    if value is None:
+        return None
+    return value.lower() in ("1", "true", "yes", "on")
+
+def load_config(path=CONFIG_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+def load_profile(name=None, path=CONFIG_PATH):
+    """Resolve a profile by name (default LMS_DRIVER_PROFILE) and apply env overrides"""
+    config = load_config(path)
+    name = name or os.environ.get("LMS_DRIVER_PROFILE", DEFAULT_PROFILE)
+    if name not in config["profiles"]:
+        raise ValueError(f"Unknown driver profile '{name}', expected one of {sorted(config['profiles'])}")
+
+    profile = dict(config["profiles"][name])
+    profile["name"] = name
+
+    for key, env_name in [("headless", "LMS_HEADLESS"), ("images", "LMS_LOAD_IMAGES"), ("fonts", "LMS_LOAD_FONTS")]:
+        override = _env_flag(env_name)
+        if override is not None:
+            profile[key] = override
+    profile["window_size"] = os.environ.get("LMS_WINDOW_SIZE", profile.get("window_size"))
+    profile["disk_cache_dir"] = os.environ.get("LMS_DISK_CACHE_DIR", profile.get("disk_cache_dir"))
+
+    profile["chrome_binary"] = os.environ.get("LMS_CHROME_BINARY") or config.get("chrome_binary")
+    if not profile["chrome_binary"] and os.path.exists(LEGACY_CHROME_BINARY):
+        profile["chrome_binary"] = LEGACY_CHROME_BINARY
+    profile["chromedriver_path"] = os.environ.get("LMS_CHROMEDRIVER_PATH") or config.get("chromedriver_path")
+    if not profile["chromedriver_path"] and os.path.exists(LEGACY_CHROMEDRIVER_PATH):
+        profile["chromedriver_path"] = LEGACY_CHROMEDRIVER_PATH
+    return profile
+
+def build_options(profile):
+    """Chrome options for a resolved profile"""
+    chrome_options = Options()
+    if profile.get("chrome_binary"):
+        chrome_options.binary_location = profile["chrome_binary"]
+
+    if profile.get("headless"):
+        chrome_options.add_argument("--headless=new")
+    if profile.get("window_size"):
+        chrome_options.add_argument(f"--window-size={profile['window_size']}")
+    if profile.get("disk_cache_dir"):
+        cache_dir = os.path.join(TESTS_DIR, profile["disk_cache_dir"])
+        chrome_options.add_argument(f"--disk-cache-dir={cache_dir}")
+    if not profile.get("images", True):
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    if profile.get("lean"):
+        for argument in LEAN_ARGUMENTS:
+            chrome_options.add_argument(argument)
+    return chrome_options
+
+def blocked_urls(profile):
+    """URL patterns the profile blocks at the network layer"""
+    patterns = []
+    if not profile.get("fonts", True):
+        patterns += FONT_URL_PATTERNS
+    if not profile.get("images", True):
+        patterns += IMAGE_URL_PATTERNS
+    return patterns
+
+def apply_network_blocks(driver, profile):
+    """Block fonts and cover images for the lifetime of the browser tab"""
+    patterns = blocked_urls(profile)
+    if patterns:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
@@ -0,0 +1,172 @@
+"""
+Database Fixtures
+Snapshots the test database into a template once, then restores it from the template in milliseconds
+"""
+
+from urllib.parse import urlparse
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+import db
+import session_cache
+from accounts import CREDENTIALS
+from supabase_rest import SupabaseClient, SupabaseError
+
+TEMPLATE_DB = os.environ.get("LMS_TEMPLATE_DB", "lms_template")
+# A database can't be copied or dropped while anyone is connected to it, so the
+# CREATE/DROP DATABASE statements run from here instead
+MAINTENANCE_DB = "template1"
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+# SQLSTATE for "source database is being accessed by other users"
+OBJECT_IN_USE = "55006"
+
+def admin_url():
+    """Superuser connection string; copying a database means disconnecting every session on it,
+    which only a superuser may do (supabase_admin on the local stack)"""
+    return os.environ.get("LMS_ADMIN_DATABASE_URL") or db.database_url()
+
+def database_name(url=None):
+    return urlparse(url or db.database_url()).path.lstrip("/") or "postgres"
+
+def database_url(name, url=None):
+    """The connection string of another database on the same server"""
+    return urlparse(url or db.database_url())._replace(path=f"/{name}").geturl()
+
+def admin_connect(url=None):
+    """Autocommit connection to the maintenance database; refuses anything but a local server"""
+    url = url or admin_url()
+    host = urlparse(url).hostname or "localhost"
+    if host not in LOCAL_HOSTS and os.environ.get("LMS_FIXTURES_ALLOW_REMOTE") != "1":
+        raise RuntimeError(
+            f"Refusing to drop and recreate databases on {host}; "
+            "fixtures are meant for the local stack (set LMS_FIXTURES_ALLOW_REMOTE=1 to override)"
+        )
+    conn = db.connect(database_url(MAINTENANCE_DB, url))
+    # CREATE DATABASE and DROP DATABASE can't run inside a transaction
+    conn.autocommit = True
+    return conn
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def _sqlstate(error):
+    # psycopg 3 and psycopg2 name it differently
+    return getattr(error, "sqlstate", None) or getattr(error, "pgcode", None)
+
+def exists(cur, name):
+    cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (name,))
+    return cur.fetchone() is not None
+
+def drop_database(cur, name):
+    cur.execute("SELECT datistemplate FROM pg_database WHERE datname = %s", (name,))
+    row = cur.fetchone()
+    if row is None:
+        return
+    if row[0]:
+        cur.execute(f"ALTER DATABASE {_quote(name)} WITH IS_TEMPLATE false")
+    cur.execute(f"DROP DATABASE {_quote(name)} WITH (FORCE)")
+
+def copy_database(cur, source, target, owner=None, attempts=20):
+    """CREATE DATABASE target as a file-level copy of source, disconnecting source's sessions first"""
+    owner_clause = f" OWNER {_quote(owner)}" if owner else ""
+    for attempt in range(attempts):
+        # GoTrue, PostgREST and Postgres' own background workers reconnect on their own,
+        # sometimes before the copy starts; take the next gap when that happens
+        cur.execute(
+            "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+            "WHERE datname = %s AND pid <> pg_backend_pid()",
+            (source,),
+        )
+        try:
+            # FILE_COPY copies the database directory instead of WAL-logging every block,
+            # which is what makes a restore take milliseconds rather than seconds
+            cur.execute(f"CREATE DATABASE {_quote(target)} TEMPLATE {_quote(source)} STRATEGY FILE_COPY{owner_clause}")
+            return
+        except Exception as e:
+            if _sqlstate(e) != OBJECT_IN_USE or attempt == attempts - 1:
+                raise
+            time.sleep(0.05)
+
+def has_snapshot(url=None):
+    with contextlib.closing(admin_connect(url)) as conn, conn.cursor() as cur:
+        return exists(cur, TEMPLATE_DB)
+
+def snapshot(url=None):
+    """Copy the test database into the template. Returns the time taken in ms."""
+    source = database_name(url)
+    start = time.perf_counter()
+    with contextlib.closing(admin_connect(url)) as conn, conn.cursor() as cur:
+        drop_database(cur, TEMPLATE_DB)
+        copy_database(cur, source, TEMPLATE_DB)
+        # Nobody may connect to the template, or the next restore would have to wait for them
+        cur.execute(f"ALTER DATABASE {_quote(TEMPLATE_DB)} WITH IS_TEMPLATE true ALLOW_CONNECTIONS false")
+    return (time.perf_counter() - start) * 1000
+
+def restore(name=None, url=None):
+    """Replace a database (default: the test database) with a fresh copy of the template. Returns ms."""
+    target = name or database_name(url)
+    start = time.perf_counter()
+    with contextlib.closing(admin_connect(url)) as conn, conn.cursor() as cur:
+        if not exists(cur, TEMPLATE_DB):
+            raise RuntimeError(f"No snapshot in {TEMPLATE_DB}; run `python fixtures.py snapshot` first")
+        # Keep the owner the app's roles expect rather than the admin role running this
+        cur.execute("SELECT pg_get_userbyid(datdba) FROM pg_database WHERE datname = %s", (target,))
+        row = cur.fetchone()
+        drop_database(cur, target)
+        copy_database(cur, TEMPLATE_DB, target, owner=row[0] if row else None)
+    return (time.perf_counter() - start) * 1000
+
+def wait_for_api(timeout=30):
+    """Wait until PostgREST has reconnected to the restored database and reloaded its schema"""
+    client = SupabaseClient()
+    deadline = time.time() + timeout
+    while True:
+        try:
+            client.select("books", {"select": "id", "limit": "1"})
+            return
+        except (SupabaseError, OSError):
+            if time.time() > deadline:
+                raise TimeoutError(f"The API did not come back within {timeout}s of restoring the database")
+            time.sleep(0.1)
+
+def reset_app_database(url=None):
+    """Restore the database the app runs against and wait until it serves requests again. Returns ms."""
+    if not has_snapshot(url):
+        print(f"  No snapshot yet, copying {database_name(url)} into {TEMPLATE_DB}")
+        snapshot(url)
+
+    ms = restore(url=url)
+    wait_for_api()
+    # Sessions created after the snapshot no longer exist in auth.sessions
+    for role in CREDENTIALS:
+        session_cache.invalidate(role)
+    return ms
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot and restore the test database through a template database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("snapshot", help=f"copy the test database into {TEMPLATE_DB}")
+    restore_parser = commands.add_parser("restore", help="replace the test database with a copy of the snapshot")
+    restore_parser.add_argument("--database", help="restore this database instead of the one in LMS_DATABASE_URL")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "snapshot":
+            ms = snapshot()
+            print(f"✅ Snapshot of {database_name()} saved as {TEMPLATE_DB} in {ms:.0f}ms")
+        elif args.command == "restore" and args.database:
+            ms = restore(args.database)
+            print(f"✅ {args.database} restored in {ms:.0f}ms")
+        else:
+            ms = reset_app_database()
+            print(f"✅ {database_name()} restored in {ms:.0f}ms")
+    except Exception as e:
+        print(f"❌ {args.command} failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
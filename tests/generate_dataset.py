@@ -0,0 +1,554 @@
+"""
+Synthetic Dataset Generator
+Builds a reproducible large library (books, members, loans, fines, reservations) as CSV and bulk loads it with COPY
+"""
+
+from array import array
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import accumulate
+import argparse
+import csv
+import json
+import os
+import random
+import tempfile
+import uuid
+
+import lms_actions
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT_DIR = os.path.join(TESTS_DIR, "dataset")
+
+# Everything generated is tagged so it can be found and deleted again
+EMAIL_DOMAIN = "synthetic.lms"
+ISBN_PREFIX = "9799"
+ID_NAMESPACE = uuid.UUID("5b0e7c1e-4a52-4d0c-9a7e-6c1f2d3b8a90")
+INSTANCE_ID = "00000000-0000-0000-0000-000000000000"
+
+RESERVATION_EXPIRY_DAYS = 3
+CHUNK = 10000
+
+# Same list as lib/constants.ts, weighted towards what a public library lends most
+GENRES = [
+    ("Fiction", 18), ("Non-Fiction", 10), ("Programming", 6), ("Computer Science", 4), ("Database", 2),
+    ("Software Architecture", 2), ("Business", 5), ("History", 6), ("Psychology", 4), ("Biography", 5),
+    ("Fantasy", 8), ("Science Fiction", 6), ("Mystery", 7), ("Romance", 7), ("Self-Help", 5),
+    ("Education", 4), ("Reference", 2), ("Other", 3),
+]
+
+TITLE_WORDS = [
+    "Code", "Java", "Design", "History", "Data", "Python", "Shadow", "River", "Empire", "Garden", "Night",
+    "Silence", "Mountain", "Machine", "Memory", "Ocean", "Kingdom", "Light", "Secret", "Journey", "Storm",
+    "City", "Mind", "Fire", "Winter", "Star", "Mirror", "Road", "Island", "Clock", "Forest", "Letter",
+]
+TITLE_ADJECTIVES = [
+    "Clean", "Silent", "Lost", "Hidden", "Last", "Modern", "Practical", "Broken", "Golden", "Quiet",
+    "Distant", "Effective", "Forgotten", "Crimson", "Endless", "Little", "Wild", "Complete", "Brief", "Dark",
+]
+TITLE_PATTERNS = [
+    "The {adj} {word}", "{word} and {word2}", "The {word} of {word2}", "{adj} {word}",
+    "A {adj} History of {word}", "Learning {word}", "{word}: A Practical Guide", "The {word} Keeper",
+]
+FIRST_NAMES = [
+    "Aarav", "Priya", "Rahul", "Ananya", "Vikram", "Sneha", "Arjun", "Kavya", "James", "Mary", "Robert",
+    "Linda", "Michael", "Sarah", "David", "Emma", "Daniel", "Olivia", "Wei", "Yuki", "Carlos", "Sofia",
+]
+LAST_NAMES = [
+    "Sharma", "Patel", "Reddy", "Iyer", "Nair", "Gupta", "Singh", "Rao", "Smith", "Johnson", "Brown",
+    "Garcia", "Miller", "Davis", "Martin", "Wilson", "Anderson", "Chen", "Tanaka", "Silva", "Rossi", "Khan",
+]
+PUBLISHERS = [
+    "Penguin", "HarperCollins", "Scholastic", "O'Reilly", "Addison-Wesley", "Manning", "MIT Press",
+    "Random House", "Simon & Schuster", "Macmillan", "Oxford University Press", "No Starch Press",
+]
+STREETS = ["MG Road", "Park Street", "Lake View", "Station Road", "Temple Street", "Hill Road", "Main Street"]
+
+AUTH_USER_COLUMNS = [
+    "instance_id", "id", "aud", "role", "email", "encrypted_password", "email_confirmed_at",
+    "confirmation_token", "recovery_token", "email_change_token_new", "email_change",
+    "raw_app_meta_data", "raw_user_meta_data", "created_at", "updated_at", "is_sso_user",
+]
+PROFILE_COLUMNS = ["id", "email", "full_name", "role", "phone", "address", "member_id", "created_at", "updated_at"]
+BOOK_COLUMNS = [
+    "id", "isbn", "title", "author", "publisher", "publication_year", "genre", "description",
+    "total_copies", "available_copies", "location", "created_at", "updated_at",
+]
+TRANSACTION_COLUMNS = [
+    "id", "book_id", "user_id", "issued_by", "issue_date", "due_date", "return_date", "returned_by",
+    "status", "fine_amount", "fine_paid", "notes", "created_at", "updated_at",
+]
+FINE_COLUMNS = [
+    "id", "transaction_id", "user_id", "amount", "reason", "paid", "paid_date", "payment_method",
+    "created_at", "updated_at",
+]
+RESERVATION_COLUMNS = [
+    "id", "book_id", "user_id", "reservation_date", "status", "expiry_date", "fulfilled_date",
+    "queue_position", "created_at", "updated_at",
+]
+BORROW_REQUEST_COLUMNS = [
+    "id", "book_id", "user_id", "request_date", "requested_due_date", "status", "reviewed_by",
+    "reviewed_at", "rejection_reason", "created_at", "updated_at",
+]
+
+# (table, csv file, columns, columns whose empty values are '' rather than NULL), in foreign key order
+TABLES = [
+    ("auth.users", "auth_users.csv", AUTH_USER_COLUMNS,
+     ["encrypted_password", "confirmation_token", "recovery_token", "email_change_token_new", "email_change"]),
+    ("profiles", "profiles.csv", PROFILE_COLUMNS, []),
+    ("books", "books.csv", BOOK_COLUMNS, []),
+    ("transactions", "transactions.csv", TRANSACTION_COLUMNS, []),
+    ("fines", "fines.csv", FINE_COLUMNS, []),
+    ("reservations", "reservations.csv", RESERVATION_COLUMNS, []),
+    ("borrow_requests", "borrow_requests.csv", BORROW_REQUEST_COLUMNS, []),
+]
+
+CLEANUP_SQL = [
+    # Cascades to the transactions, fines, reservations and requests of synthetic books and users
+    f"DELETE FROM books WHERE isbn LIKE '{ISBN_PREFIX}%'",
+    f"DELETE FROM auth.users WHERE email LIKE '%@{EMAIL_DOMAIN}'",
+]
+
+@lru_cache(maxsize=None)
+def _id_prefix(seed, kind):
+    return str(uuid.uuid5(ID_NAMESPACE, f"{seed}:{kind}"))[:24]
+
+# Counters and summaries maintained by triggers, which the load skips
+POST_LOAD_SQL = [
+    "DO $$ BEGIN IF to_regproc('refresh_library_stats') IS NOT NULL THEN "
+    "PERFORM refresh_library_stats(); END IF; END $$",
+    "DO $$ BEGIN IF to_regproc('refresh_member_read_models') IS NOT NULL THEN "
+    "PERFORM refresh_member_read_models(); END IF; END $$",
+    "DO $$ BEGIN IF to_regproc('refresh_reservation_queues') IS NOT NULL THEN "
+    "PERFORM refresh_reservation_queues(); END IF; END $$",
+]
+
+def entity_id(seed, kind, index):
+    """Stable UUID for the index-th row of a kind: a per-kind uuid5 prefix plus the index in the last group"""
+    return f"{_id_prefix(seed, kind)}{index:012x}"
+
+def isbn13(index):
+    """Valid ISBN-13 in a prefix the real seed data does not use"""
+    body = f"{ISBN_PREFIX}{index:08d}"
+    total = sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(body))
+    return f"{body}{(10 - total % 10) % 10}"
+
+def zipf_cum_weights(n, s):
+    """Cumulative Zipf weights for ranks 1..n, for random.choices(cum_weights=...)"""
+    return list(accumulate(1 / rank ** s for rank in range(1, n + 1)))
+
+def ts(value):
+    return value.isoformat() if value else None
+
+def make_book(seed, index, as_of):
+    """Metadata for one book. Seeded per book so it can be rebuilt without holding the catalogue in memory."""
+    rng = random.Random((seed << 32) | index)
+    word, word2 = rng.sample(TITLE_WORDS, 2)
+    title = rng.choice(TITLE_PATTERNS).format(adj=rng.choice(TITLE_ADJECTIVES), word=word, word2=word2)
+    if rng.random() < 0.1:
+        title += f", Volume {rng.randint(2, 9)}"
+    author = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    genre_index = rng.choices(range(len(GENRES)), [weight for _, weight in GENRES])[0]
+    genre = GENRES[genre_index][0]
+    added = as_of - timedelta(days=rng.uniform(0, 3650))
+    return {
+        "id": entity_id(seed, "book", index),
+        "isbn": isbn13(index),
+        "title": title,
+        "author": author,
+        "publisher": rng.choice(PUBLISHERS),
+        "publication_year": max(1900, as_of.year - int(rng.expovariate(1 / 12))),
+        "genre": genre,
+        "description": f"A {genre.lower()} title by {author}.",
+        "location": f"Section {chr(ord('A') + genre_index)} - Shelf {rng.randint(1, 40)}",
+        "created_at": ts(added),
+    }
+
+class DatasetWriter:
+    def __init__(self, args):
+        self.args = args
+        self.seed = args.seed
+        self.rng = random.Random(args.seed)
+        self.as_of = datetime.fromisoformat(args.as_of).replace(tzinfo=timezone.utc)
+        self.files = {}
+        self.writers = {}
+        self.counts = {}
+
+        # Popularity: a few books and members account for most of the traffic
+        self.book_rank = list(range(args.books))
+        self.rng.shuffle(self.book_rank)
+        self.book_weights = zipf_cum_weights(args.books, args.book_skew)
+        self.member_rank = list(range(args.members))
+        self.rng.shuffle(self.member_rank)
+        self.member_weights = zipf_cum_weights(args.members, args.member_skew)
+
+        self.copies = array("H", [0] * args.books)
+        self.on_loan = array("H", [0] * args.books)
+        self.active_loans = set()
+
+    # Output
+
+    def open(self):
+        os.makedirs(self.args.out, exist_ok=True)
+        for table, filename, columns, _ in TABLES:
+            f = open(os.path.join(self.args.out, filename), "w", newline="")
+            self.files[table] = f
+            self.writers[table] = csv.writer(f)
+            self.writers[table].writerow(columns)
+            self.counts[table] = 0
+
+    def write(self, table, row):
+        self.writers[table].writerow(row)
+        self.counts[table] += 1
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+    # Sampling
+
+    def pick_books(self, k):
+        return [self.book_rank[rank] for rank in self.rng.choices(range(self.args.books), cum_weights=self.book_weights, k=k)]
+
+    def pick_members(self, k):
+        return [self.member_rank[rank] for rank in self.rng.choices(range(self.args.members), cum_weights=self.member_weights, k=k)]
+
+    def past(self, max_days, recent_bias=True):
+        """A moment in the last max_days days, denser towards as_of when recent_bias is set"""
+        u = self.rng.random()
+        fraction = 1 - u ** 0.5 if recent_bias else u
+        return self.as_of - timedelta(days=max_days * fraction)
+
+    def member_id(self, index):
+        return entity_id(self.seed, "member", index)
+
+    def staff_id(self):
+        return entity_id(self.seed, "librarian", self.rng.randrange(self.args.librarians))
+
+    # Tables
+
+    def write_users(self):
+        people = [("librarian", index) for index in range(self.args.librarians)]
+        people += [("member", index) for index in range(self.args.members)]
+        app_meta = json.dumps({"provider": "email", "providers": ["email"]})
+
+        for role, index in people:
+            user_id = entity_id(self.seed, role, index)
+            email = f"{role}{index:06d}@{EMAIL_DOMAIN}"
+            full_name = f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+            created = ts(self.past(self.args.history_days + 365, recent_bias=False))
+            user_meta = json.dumps({"full_name": full_name, "role": role})
+            self.write("auth.users", [
+                INSTANCE_ID, user_id, "authenticated", "authenticated", email, "", created,
+                "", "", "", "", app_meta, user_meta, created, created, False,
+            ])
+            prefix = "SYNL" if role == "librarian" else "SYN"
+            self.write("profiles", [
+                user_id, email, full_name, role,
+                f"+91 9{self.rng.randrange(10 ** 9):09d}",
+                f"{self.rng.randint(1, 999)} {self.rng.choice(STREETS)}",
+                f"{prefix}{index:07d}", created, created,
+            ])
+
+    def assign_copies(self):
+        """Popular books get more copies"""
+        for rank, book in enumerate(self.book_rank, start=1):
+            self.copies[book] = self.rng.randint(1, 3) + int(12 / rank ** 0.35)
+
+    def can_lend(self, book, member):
+        return self.on_loan[book] < self.copies[book] and (member, book) not in self.active_loans
+
+    def lend(self, book, member):
+        self.on_loan[book] += 1
+        self.active_loans.add((member, book))
+
+    def write_transactions(self):
+        args = self.args
+        loan = timedelta(days=lms_actions.LOAN_DURATION_DAYS)
+        number = 0
+
+        while number < args.transactions:
+            k = min(CHUNK, args.transactions - number)
+            for book, member in zip(self.pick_books(k), self.pick_members(k)):
+                issue = self.past(args.history_days)
+                due = issue + loan
+                returned = None
+                fine = 0
+                status = "issued"
+
+                if due > self.as_of:
+                    # Current loan, unless it was already brought back
+                    if self.rng.random() < 0.85 and self.can_lend(book, member):
+                        self.lend(book, member)
+                    else:
+                        returned = issue + (self.as_of - issue) * self.rng.random()
+                elif self.rng.random() < args.unreturned_rate and self.can_lend(book, member):
+                    # Still out past its due date; half have already been through syncOverdueFines
+                    self.lend(book, member)
+                    if self.rng.random() < 0.5:
+                        status = "overdue"
+                        fine = lms_actions.calculate_fine(due, self.as_of)
+                elif self.rng.random() < args.late_rate:
+                    returned = min(self.as_of, due + timedelta(days=self.rng.uniform(1, 30)))
+                else:
+                    returned = issue + loan * self.rng.random()
+
+                if returned:
+                    fine = lms_actions.calculate_fine(due, returned)
+                    status = "overdue" if returned > due else "returned"
+
+                transaction_id = entity_id(self.seed, "transaction", number)
+                fine_paid = bool(returned and fine and self.rng.random() < args.fine_paid_rate)
+                self.write("transactions", [
+                    transaction_id, entity_id(self.seed, "book", book), self.member_id(member), self.staff_id(),
+                    ts(issue), ts(due), ts(returned), self.staff_id() if returned else None,
+                    status, fine, fine_paid, None, ts(issue), ts(returned or issue),
+                ])
+                if fine:
+                    self.write_fine(
+                        number, transaction_id, book, member, fine, returned or self.as_of, fine_paid,
+                        due=None if returned else due,
+                    )
+                number += 1
+
+    def write_fine(self, number, transaction_id, book, member, amount, created, paid, due=None):
+        """Fine for a late return, or for a loan still out when due is given (as syncOverdueFines writes it)"""
+        paid_date = min(self.as_of, created + timedelta(days=self.rng.uniform(0, 20))) if paid else None
+        title = make_book(self.seed, book, self.as_of)["title"]
+        reason = lms_actions.overdue_fine_reason(title, due, self.as_of) if due else f'Overdue fine for "{title}"'
+        self.write("fines", [
+            entity_id(self.seed, "fine", number), transaction_id, self.member_id(member), amount,
+            reason, paid, ts(paid_date), "cash" if paid else None,
+            ts(created), ts(paid_date or created),
+        ])
+
+    def write_reservations(self):
+        args = self.args
+        expiry = timedelta(days=RESERVATION_EXPIRY_DAYS)
+        queue = {}
+        pending = set()
+        number = 0
+
+        while number < args.reservations:
+            k = min(CHUNK, args.reservations - number)
+            for book, member in zip(self.pick_books(k), self.pick_members(k)):
+                reserved = self.past(args.history_days)
+                fulfilled = None
+                queue_position = None
+
+                # Members can only queue for books with no copy on the shelf
+                if (
+                    self.as_of - reserved < expiry
+                    and self.on_loan[book] >= self.copies[book]
+                    and (member, book) not in pending
+                ):
+                    status = "pending"
+                    queue_position = queue[book] = queue.get(book, 0) + 1
+                    pending.add((member, book))
+                else:
+                    status = self.rng.choices(["fulfilled", "cancelled", "expired"], [6, 2, 2])[0]
+                    if status == "fulfilled":
+                        fulfilled = reserved + expiry * self.rng.random()
+
+                self.write("reservations", [
+                    entity_id(self.seed, "reservation", number), entity_id(self.seed, "book", book),
+                    self.member_id(member), ts(reserved), status, ts(reserved + expiry), ts(fulfilled),
+                    queue_position, ts(reserved), ts(fulfilled or reserved),
+                ])
+                number += 1
+
+    def write_borrow_requests(self):
+        args = self.args
+        loan = timedelta(days=lms_actions.LOAN_DURATION_DAYS)
+        books = self.pick_books(args.borrow_requests)
+        members = self.pick_members(args.borrow_requests)
+
+        for number, (book, member) in enumerate(zip(books, members)):
+            requested = self.past(30)
+            reviewer = None
+            reviewed = None
+            reason = None
+            if self.as_of - requested < timedelta(days=2):
+                status = "pending"
+            else:
+                status = self.rng.choices(["approved", "rejected", "cancelled"], [16, 3, 1])[0]
+                if status != "cancelled":
+                    reviewer = self.staff_id()
+                    reviewed = requested + timedelta(hours=self.rng.uniform(0.5, 48))
+                if status == "rejected":
+                    reason = "No copies available"
+
+            self.write("borrow_requests", [
+                entity_id(self.seed, "borrow_request", number), entity_id(self.seed, "book", book),
+                self.member_id(member), ts(requested), ts(requested + loan), status, reviewer, ts(reviewed),
+                reason, ts(requested), ts(reviewed or requested),
+            ])
+
+    def write_books(self):
+        """Written last so available_copies reflects the loans generated above"""
+        for index in range(self.args.books):
+            book = make_book(self.seed, index, self.as_of)
+            self.write("books", [
+                book["id"], book["isbn"], book["title"], book["author"], book["publisher"],
+                book["publication_year"], book["genre"], book["description"], self.copies[index],
+                self.copies[index] - self.on_loan[index], book["location"], book["created_at"], book["created_at"],
+            ])
+
+    def write_accounts(self):
+        """email,password CSV for load_test.py --member-accounts"""
+        with open(os.path.join(self.args.out, "member_accounts.csv"), "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["email", "password"])
+            for index in range(self.args.members):
+                writer.writerow([f"member{index:06d}@{EMAIL_DOMAIN}", self.args.password])
+
+    def generate(self):
+        self.open()
+        try:
+            self.write_users()
+            self.assign_copies()
+            self.write_transactions()
+            self.write_reservations()
+            self.write_borrow_requests()
+            self.write_books()
+        finally:
+            self.close()
+        self.write_accounts()
+
+        manifest = {
+            "seed": self.seed,
+            "as_of": self.as_of.isoformat(),
+            "args": vars(self.args),
+            "rows": self.counts,
+        }
+        with open(os.path.join(self.args.out, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+# Loading
+
+def password_sql(password):
+    """Hash the shared password once with pgcrypto and give it to every synthetic user"""
+    escaped = password.replace("'", "''")
+    return (
+        f"WITH hash AS (SELECT crypt('{escaped}', gen_salt('bf')) AS value) "
+        f"UPDATE auth.users SET encrypted_password = hash.value FROM hash WHERE email LIKE '%@{EMAIL_DOMAIN}'"
+    )
+
+def write_load_script(out_dir, password):
+    """psql script that loads the CSV files with \\copy; run it from the dataset directory"""
+    lines = [
+        "-- Generated by tests/generate_dataset.py",
+        "-- cd tests/dataset && psql \"$DATABASE_URL\" -f load.sql",
+        "\\set ON_ERROR_STOP on",
+        "CREATE EXTENSION IF NOT EXISTS pgcrypto;",
+        "BEGIN;",
+    ]
+    lines += [f"{sql};" for sql in CLEANUP_SQL]
+    lines.append("-- Skip triggers and foreign key checks while copying; the rows are generated consistent")
+    lines.append("SET LOCAL session_replication_role = replica;")
+    for table, filename, columns, force_not_null in TABLES:
+        options = "FORMAT csv, HEADER true"
+        if force_not_null:
+            options += f", FORCE_NOT_NULL ({', '.join(force_not_null)})"
+        lines.append(f"\\copy {table} ({', '.join(columns)}) FROM '{filename}' WITH ({options})")
+    lines.append("SET LOCAL session_replication_role = origin;")
+    lines.append(f"{password_sql(password)};")
+    lines += [f"{sql};" for sql in POST_LOAD_SQL]
+    lines.append("COMMIT;")
+    lines += [f"ANALYZE {table};" for table, _, _, _ in TABLES]
+
+    path = os.path.join(out_dir, "load.sql")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+def load(out_dir, password):
+    """COPY the generated files straight into the database at LMS_DATABASE_URL"""
+    import db
+
+    conn = db.connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pgcrypto")
+            for sql in CLEANUP_SQL:
+                cur.execute(sql)
+            cur.execute("SET LOCAL session_replication_role = replica")
+        for table, filename, columns, force_not_null in TABLES:
+            print(f"  COPY {table}")
+            db.copy_csv(conn, table, columns, os.path.join(out_dir, filename), force_not_null)
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL session_replication_role = origin")
+            cur.execute(password_sql(password))
+            for sql in POST_LOAD_SQL:
+                cur.execute(sql)
+        conn.commit()
+
+        # ANALYZE cannot run inside the load transaction
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            for table, _, _, _ in TABLES:
+                cur.execute(f"ANALYZE {table}")
+    finally:
+        conn.close()
+
+def load_books(conn, first, count, isbn_prefix, seed=1):
+    """COPY synthetic books first..first+count-1 into the database with triggers on, so the dashboard
+    counters follow. Their ISBNs are isbn_prefix plus the number; delete them by that prefix."""
+    import db
+
+    as_of = datetime.now(timezone.utc)
+    columns = BOOK_COLUMNS[1:]
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="", delete=False) as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for index in range(first, first + count):
+            book = make_book(seed, index, as_of)
+            copies = 1 + index % 3
+            writer.writerow([
+                f"{isbn_prefix}{index:08d}", book["title"], book["author"], book["publisher"],
+                book["publication_year"], book["genre"], book["description"], copies, copies,
+                book["location"], book["created_at"], book["created_at"],
+            ])
+    try:
+        db.copy_csv(conn, "books", columns, f.name)
+        conn.commit()
+    finally:
+        os.remove(f.name)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a large synthetic library dataset")
+    parser.add_argument("--books", type=int, default=100000)
+    parser.add_argument("--members", type=int, default=50000)
+    parser.add_argument("--librarians", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=2000000)
+    parser.add_argument("--reservations", type=int, default=200000)
+    parser.add_argument("--borrow-requests", type=int, default=5000)
+    parser.add_argument("--history-days", type=int, default=730, help="how far back loans go")
+    parser.add_argument("--book-skew", type=float, default=1.0, help="Zipf exponent for book popularity")
+    parser.add_argument("--member-skew", type=float, default=0.7, help="Zipf exponent for member activity")
+    parser.add_argument("--late-rate", type=float, default=0.15, help="share of returns made after the due date")
+    parser.add_argument("--unreturned-rate", type=float, default=0.02, help="share of past-due loans still out")
+    parser.add_argument("--fine-paid-rate", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--as-of", default=datetime.now(timezone.utc).date().isoformat(),
+                        help="date the history ends at (YYYY-MM-DD); fix it to reproduce a dataset exactly")
+    parser.add_argument("--password", default="member123", help="password for every synthetic user")
+    parser.add_argument("--out", default=DEFAULT_OUT_DIR)
+    parser.add_argument("--load", action="store_true", help="COPY the files into LMS_DATABASE_URL after generating")
+    args = parser.parse_args()
+
+    print(f"Generating dataset (seed {args.seed}, as of {args.as_of}) in {args.out}...")
+    manifest = DatasetWriter(args).generate()
+    script = write_load_script(args.out, args.password)
+    for table, count in manifest["rows"].items():
+        print(f"  {table:<18}{count:>10}")
+    print(f"\nLoad with psql: {script}")
+
+    if args.load:
+        print("\nLoading into the database...")
+        load(args.out, args.password)
+        print("Done")
+
+if __name__ == "__main__":
+    main()
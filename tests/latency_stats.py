@@ -0,0 +1,14 @@
+"""
+Latency Statistics
+Percentiles shared by the load generator, stress tests, scenarios and telemetry collector
+"""
+
+import math
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list: the smallest value with at least pct% of
+    the values at or below it"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
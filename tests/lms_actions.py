@@ -0,0 +1,309 @@
+"""
+Server Action Replays
+The Supabase calls each server action in lib/actions makes, issued over HTTP in the same order
+"""
+
+from datetime import datetime, timedelta, timezone
+import base64
+import json
+
+from supabase_rest import SupabaseError
+
+LOAN_DURATION_DAYS = 14
+FINE_PER_DAY = 10
+RESERVATION_EXPIRY_DAYS = 3
+
+# lib/pagination.ts and getAllBooks
+DEFAULT_PAGE_SIZE = 50
+BOOKS_PAGE_SIZE = 12
+
+BOOK_LIST_COLUMNS = "*"
+BORROW_REQUEST_EMBED = "*,book:books(*),user:profiles!borrow_requests_user_id_fkey(*)"
+FINE_EMBED = "*,transaction:transactions(*),user:profiles(*)"
+TRANSACTION_EMBED = (
+    "*,book:books(*),user:profiles!transactions_user_id_fkey(*),"
+    "issued_by_profile:profiles!transactions_issued_by_fkey(*),"
+    "returned_by_profile:profiles!transactions_returned_by_fkey(*)"
+)
+RESERVATION_EMBED = "*,book:books(*),user:profiles(*)"
+
+def _now():
+    return datetime.now(timezone.utc)
+
+def calculate_fine(due_date, return_date=None):
+    """Port of calculateFine in lib/helpers.ts"""
+    returned = return_date or _now()
+    days_overdue = int((returned - due_date).total_seconds() // 86400)
+    return days_overdue * FINE_PER_DAY if days_overdue > 0 else 0
+
+def parse_timestamp(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+def _rpc_ok(client, function, args):
+    """Call a database function; False if it refused (a RAISE in the function), True otherwise"""
+    try:
+        client.rpc(function, args)
+    except SupabaseError as e:
+        if e.status != 400:
+            raise
+        return False
+    return True
+
+# Pagination
+
+def encode_cursor(values):
+    """encodeCursor in lib/pagination.ts: base64url JSON of the last row's sort key and id"""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":"), ensure_ascii=False).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+
+def _quote(value):
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def keyset_params(column, cursor, ascending=False):
+    """keysetFilter in lib/pagination.ts plus the bound that lets the index scan start at the cursor"""
+    after = decode_cursor(cursor)
+    if not after:
+        return {}
+    value, row_id = after
+    op = "gt" if ascending else "lt"
+    return {
+        column: f"{'gte' if ascending else 'lte'}.{value}",
+        "or": f"({column}.{op}.{_quote(value)},and({column}.eq.{_quote(value)},id.{op}.{_quote(row_id)}))",
+    }
+
+def list_page(client, table, select, column, cursor=None, limit=DEFAULT_PAGE_SIZE, ascending=False, count=None):
+    """One keyset page of a getAll* listing: (rows, next cursor or None)"""
+    direction = "asc" if ascending else "desc"
+    params = {
+        "select": select,
+        "order": f"{column}.{direction},id.{direction}",
+        "limit": limit + 1,
+        **keyset_params(column, cursor, ascending),
+    }
+    rows = client.select(table, params, count=None if cursor else count)
+    page = rows[:limit]
+    next_cursor = encode_cursor([page[-1][column], page[-1]["id"]]) if len(rows) > limit else None
+    return page, next_cursor
+
+# Books
+
+def get_all_books(client, search=None, cursor=None, limit=BOOKS_PAGE_SIZE):
+    """getAllBooks in lib/actions/books.ts: (rows, next cursor)"""
+    if search:
+        # Relevance order comes from search_books; its cursors carry an offset
+        offset = (decode_cursor(cursor) or [0])[0]
+        params = {"select": BOOK_LIST_COLUMNS, "offset": offset, "limit": limit + 1}
+        rows = client.rpc("search_books", {"p_query": search}, params)
+        return rows[:limit], encode_cursor([offset + limit]) if len(rows) > limit else None
+    return list_page(client, "books", BOOK_LIST_COLUMNS, "title", cursor, limit, ascending=True)
+
+def search_books(client, query):
+    """searchBooks in lib/actions/books.ts"""
+    return client.rpc("search_books", {"p_query": query}, {"select": BOOK_LIST_COLUMNS, "limit": 20})
+
+def get_genres(client):
+    """getGenres in lib/actions/books.ts"""
+    return [row["genre"] for row in client.rpc("book_genres")]
+
+# Borrow requests
+
+def create_borrow_request(client, book_id):
+    """createBorrowRequest in lib/actions/borrow-requests.ts"""
+    user = client.get_user()
+    books = client.select("books", {"select": "id,title,available_copies", "id": f"eq.{book_id}"})
+    if not books:
+        return False
+
+    pending = client.select("borrow_requests", {
+        "select": "*", "book_id": f"eq.{book_id}", "user_id": f"eq.{user['id']}", "status": "eq.pending",
+    })
+    if pending:
+        return False
+
+    issued = client.select("transactions", {
+        "select": "*", "book_id": f"eq.{book_id}", "user_id": f"eq.{user['id']}", "status": "eq.issued",
+    })
+    if issued:
+        return False
+
+    client.insert("borrow_requests", [{
+        "book_id": book_id,
+        "user_id": user["id"],
+        "requested_due_date": (_now() + timedelta(days=LOAN_DURATION_DAYS)).isoformat(),
+        "status": "pending",
+    }], returning=False)
+    return True
+
+def get_pending_borrow_requests(client):
+    """getPendingBorrowRequests in lib/actions/borrow-requests.ts"""
+    return client.select("borrow_requests", {
+        "select": BORROW_REQUEST_EMBED, "status": "eq.pending", "order": "request_date.asc",
+    })
+
+def approve_borrow_request(client, request_id):
+    """approveBorrowRequest in lib/actions/borrow-requests.ts: one approve_borrow_request RPC"""
+    user = client.get_user()
+    return _rpc_ok(client, "approve_borrow_request", {"p_request_id": request_id, "p_reviewed_by": user["id"]})
+
+def approve_borrow_request_loop(client, request_id):
+    """approveBorrowRequest before supabase-circulation.sql: reads available_copies, then writes it back"""
+    user = client.get_user()
+    requests = client.select("borrow_requests", {"select": "*,book:books(*)", "id": f"eq.{request_id}"})
+    if not requests or requests[0]["status"] != "pending":
+        return False
+
+    request = requests[0]
+    if request["book"]["available_copies"] <= 0:
+        return False
+
+    client.insert("transactions", [{
+        "book_id": request["book_id"],
+        "user_id": request["user_id"],
+        "issued_by": user["id"],
+        "due_date": request["requested_due_date"],
+        "status": "issued",
+        "notes": "Approved from borrow request",
+    }], returning=False)
+    client.update(
+        "books", {"id": f"eq.{request['book_id']}"},
+        {"available_copies": request["book"]["available_copies"] - 1},
+    )
+    client.update("borrow_requests", {"id": f"eq.{request_id}"}, {
+        "status": "approved", "reviewed_by": user["id"], "reviewed_at": _now().isoformat(),
+    })
+    return True
+
+# Transactions
+
+def issue_book(client, book_id, user_id):
+    """issueBook in lib/actions/books.ts: one issue_book RPC"""
+    librarian = client.get_user()
+    return _rpc_ok(client, "issue_book", {
+        "p_book_id": book_id,
+        "p_user_id": user_id,
+        "p_due_date": (_now() + timedelta(days=LOAN_DURATION_DAYS)).isoformat(),
+        "p_issued_by": librarian["id"],
+    })
+
+def issue_book_loop(client, book_id, user_id):
+    """issueBook before supabase-circulation.sql: reads available_copies, then writes it back"""
+    librarian = client.get_user()
+    books = client.select("books", {"select": "available_copies,title", "id": f"eq.{book_id}"})
+    if not books or books[0]["available_copies"] <= 0:
+        return False
+
+    issued = client.select("transactions", {
+        "select": "*", "book_id": f"eq.{book_id}", "user_id": f"eq.{user_id}", "status": "eq.issued",
+    })
+    if issued:
+        return False
+
+    client.insert("transactions", [{
+        "book_id": book_id,
+        "user_id": user_id,
+        "issued_by": librarian["id"],
+        "due_date": (_now() + timedelta(days=LOAN_DURATION_DAYS)).isoformat(),
+        "status": "issued",
+    }], returning=False)
+    client.update("books", {"id": f"eq.{book_id}"}, {"available_copies": books[0]["available_copies"] - 1})
+    return True
+
+def return_book(client, transaction_id):
+    """returnBook in lib/actions/transactions.ts: one return_book RPC"""
+    librarian = client.get_user()
+    return _rpc_ok(client, "return_book", {"p_transaction_id": transaction_id, "p_returned_by": librarian["id"]})
+
+# Reservations
+
+def reserve_book(client, book_id, user_id):
+    """createReservation in lib/actions/reservations.ts: one reserve_book RPC. Returns the reservation, or None if refused."""
+    try:
+        return client.rpc("reserve_book", {
+            "p_book_id": book_id,
+            "p_user_id": user_id,
+            "p_expiry_date": (_now() + timedelta(days=RESERVATION_EXPIRY_DAYS)).isoformat(),
+        })
+    except SupabaseError as e:
+        if e.status != 400:
+            raise
+        return None
+
+# Fines
+
+def sync_overdue_fines(client, user_id=None):
+    """syncOverdueFines in lib/actions/fines.ts: a single sync_overdue_fines RPC"""
+    rows = client.rpc("sync_overdue_fines", {"p_user_id": user_id})
+    return rows[0]["fines_created"], rows[0]["fines_updated"]
+
+def overdue_fine_reason(title, due_date, now=None):
+    """Reason text syncOverdueFines writes for a loan that is still out"""
+    days = int(((now or _now()) - due_date).total_seconds() // 86400)
+    return f'Overdue fine for "{title}" ({days} days overdue)'
+
+def sync_overdue_fines_loop(client, user_id=None):
+    """The original per-loan syncOverdueFines: one fines lookup and two writes per overdue loan"""
+    params = {"select": "*,books(*)", "status": "eq.issued"}
+    if user_id:
+        params["user_id"] = f"eq.{user_id}"
+    transactions = client.select("transactions", params)
+
+    created = updated = 0
+    for transaction in transactions:
+        due = parse_timestamp(transaction["due_date"])
+        if due >= _now():
+            continue
+
+        amount = calculate_fine(due)
+        reason = overdue_fine_reason(transaction["books"]["title"], due)
+        try:
+            existing = client.select("fines", {
+                "select": "*", "transaction_id": f"eq.{transaction['id']}", "paid": "eq.false",
+            })
+            if existing:
+                if existing[0]["amount"] != amount:
+                    client.update("fines", {"id": f"eq.{existing[0]['id']}"}, {"amount": amount, "reason": reason})
+                    updated += 1
+            else:
+                client.insert("fines", [{
+                    "transaction_id": transaction["id"],
+                    "user_id": transaction["user_id"],
+                    "amount": amount,
+                    "reason": reason,
+                }], returning=False)
+                created += 1
+            client.update(
+                "transactions", {"id": f"eq.{transaction['id']}"}, {"fine_amount": amount, "status": "overdue"},
+            )
+        except SupabaseError:
+            # The action ignores the result of these writes as well
+            pass
+    return created, updated
+
+def get_user_fines(client):
+    """getUserFines in lib/actions/fines.ts"""
+    user = client.get_user()
+    return client.select("fines", {
+        "select": FINE_EMBED, "user_id": f"eq.{user['id']}", "order": "created_at.desc",
+    })
+
+# Listings
+
+def get_all_transactions(client, cursor=None, limit=DEFAULT_PAGE_SIZE, count=None):
+    """getAllTransactions in lib/actions/transactions.ts"""
+    return list_page(client, "transactions", TRANSACTION_EMBED, "issue_date", cursor, limit, count=count)
+
+def get_all_fines(client, cursor=None, limit=DEFAULT_PAGE_SIZE, count=None):
+    """getAllFines in lib/actions/fines.ts"""
+    return list_page(client, "fines", FINE_EMBED, "created_at", cursor, limit, count=count)
+
+def get_all_borrow_requests(client, cursor=None, limit=DEFAULT_PAGE_SIZE, count=None):
+    """getAllBorrowRequests in lib/actions/borrow-requests.ts"""
+    return list_page(client, "borrow_requests", BORROW_REQUEST_EMBED, "request_date", cursor, limit, count=count)
+
+def get_all_reservations(client, cursor=None, limit=DEFAULT_PAGE_SIZE, count=None):
+    """getAllReservations in lib/actions/reservations.ts"""
+    return list_page(client, "reservations", RESERVATION_EMBED, "reservation_date", cursor, limit, count=count)
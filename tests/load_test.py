@@ -0,0 +1,241 @@
+"""
+Load Generator
+Simulates hundreds of concurrent members and librarians against the Supabase calls behind each LMS page
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import threading
+import time
+
+import lms_actions
+from accounts import CREDENTIALS, load_accounts
+from latency_stats import percentile
+from supabase_rest import SupabaseClient, SupabaseError
+
+SEARCH_TERMS = ["code", "java", "design", "history", "harry", "data", "the", "martin", "python", "clean"]
+
+# Relative weight of each member operation in a session
+MEMBER_MIX = [
+    ("/member/books", 5),
+    ("/member/books search", 3),
+    ("createBorrowRequest", 1),
+    ("/member/fines", 2),
+]
+
+class Stats:
+    """Thread-safe latency and error counters per route"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, route, elapsed_ms, ok=True):
+        with self._lock:
+            self.latencies.setdefault(route, []).append(elapsed_ms)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+    def summary(self, duration):
+        rows = {}
+        for route, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            rows[route] = {
+                "requests": len(values),
+                "errors": self.errors.get(route, 0),
+                "throughput_rps": len(values) / duration if duration else 0,
+                "p50_ms": percentile(values, 50),
+                "p95_ms": percentile(values, 95),
+                "p99_ms": percentile(values, 99),
+                "mean_ms": statistics.fmean(values),
+            }
+        return rows
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        # Operations started once every user is running; only these count towards the report
+        self.stats = Stats()
+        # Operations started while users were still starting up, when the load was lighter
+        self.ramp_up_stats = Stats()
+        self.book_ids = []
+        self.steady_start = 0
+        self.deadline = 0
+
+    def record(self, route, start, ok=True):
+        """Latency of an operation started at perf_counter() time start"""
+        stats = self.stats if start >= self.steady_start else self.ramp_up_stats
+        stats.record(route, (time.perf_counter() - start) * 1000, ok)
+
+    def run_op(self, route, func, *func_args):
+        start = time.perf_counter()
+        ok = True
+        try:
+            func(*func_args)
+        except (SupabaseError, OSError, http.client.HTTPException):
+            ok = False
+        self.record(route, start, ok)
+
+    def fetch_page(self, client, path):
+        """GET a server-rendered page with the member's session cookies"""
+        app = urlparse(self.args.app_url)
+        conn_class = http.client.HTTPSConnection if app.scheme == "https" else http.client.HTTPConnection
+        conn = conn_class(app.hostname, app.port, timeout=30)
+        cookie = "; ".join(f"{name}={value}" for name, value in client.ssr_cookies().items())
+        try:
+            conn.request("GET", path, headers={"Cookie": cookie})
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                raise http.client.HTTPException(f"{path} returned {response.status}")
+        finally:
+            conn.close()
+
+    def member_session(self, client, rng):
+        routes = [route for route, _ in MEMBER_MIX]
+        weights = [weight for _, weight in MEMBER_MIX]
+        if self.args.app_url:
+            routes.append("/member (page)")
+            weights.append(2)
+
+        while time.perf_counter() < self.deadline:
+            route = rng.choices(routes, weights)[0]
+            if route == "/member/books":
+                self.run_op(route, self.browse_books, client)
+            elif route == "/member/books search":
+                self.run_op(route, lms_actions.get_all_books, client, rng.choice(SEARCH_TERMS))
+            elif route == "createBorrowRequest":
+                self.run_op(route, lms_actions.create_borrow_request, client, rng.choice(self.book_ids))
+            elif route == "/member/fines":
+                self.run_op(route, self.member_fines, client)
+            else:
+                self.run_op(route, self.fetch_page, client, "/member")
+            time.sleep(rng.uniform(0, self.args.think_time * 2))
+
+    def librarian_session(self, client, rng):
+        while time.perf_counter() < self.deadline:
+            start = time.perf_counter()
+            try:
+                pending = lms_actions.get_pending_borrow_requests(client)
+                self.record("/librarian/requests", start)
+            except (SupabaseError, OSError, http.client.HTTPException):
+                self.record("/librarian/requests", start, ok=False)
+                pending = []
+
+            for request in pending[:self.args.approvals_per_visit]:
+                self.run_op("approveBorrowRequest", lms_actions.approve_borrow_request, client, request["id"])
+            time.sleep(rng.uniform(0, self.args.think_time * 2))
+
+    def browse_books(self, client):
+        lms_actions.get_all_books(client)
+        lms_actions.get_genres(client)
+
+    def member_fines(self, client):
+        lms_actions.sync_overdue_fines(client)
+        lms_actions.get_user_fines(client)
+
+    def sign_in_all(self, credentials):
+        clients = []
+        for email, password in credentials:
+            client = SupabaseClient()
+            client.sign_in(email, password)
+            clients.append(client)
+        return clients
+
+    def run(self):
+        args = self.args
+        member_accounts = load_accounts(args.member_accounts) if args.member_accounts else [CREDENTIALS["member"]]
+        members = self.sign_in_all(member_accounts)
+        librarians = self.sign_in_all([CREDENTIALS["librarian"]])
+
+        self.book_ids = [book["id"] for book in members[0].select("books", {"select": "id", "limit": 1000})]
+        if not self.book_ids:
+            raise RuntimeError("No books found; seed the database first")
+
+        users = args.members + args.librarians
+        print(f"Starting {args.members} members and {args.librarians} librarians for {args.duration}s...")
+        self.steady_start = time.perf_counter() + args.ramp_up
+        self.deadline = self.steady_start + args.duration
+        seed = random.Random(args.seed)
+
+        with ThreadPoolExecutor(max_workers=users) as pool:
+            futures = []
+            for index in range(users):
+                rng = random.Random(seed.random())
+                if index < args.members:
+                    futures.append(pool.submit(self.member_session, members[index % len(members)], rng))
+                else:
+                    futures.append(pool.submit(self.librarian_session, librarians[0], rng))
+                # Spread session start-up over the ramp-up period
+                time.sleep(args.ramp_up / users)
+            for future in futures:
+                # Surface bugs in the session loops instead of silently losing users
+                future.result()
+
+        ramp_up_requests = sum(len(values) for values in self.ramp_up_stats.latencies.values())
+        print(f"Left {ramp_up_requests} requests started during the {args.ramp_up}s ramp-up out of the report")
+        # Throughput over the steady window only; every user was running for all of it
+        return self.stats.summary(args.duration)
+
+def print_report(summary):
+    print(f"\n  {'Route':<24}{'Reqs':>8}{'Errors':>8}{'Req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for route, row in summary.items():
+        print(
+            f"  {route:<24}{row['requests']:>8}{row['errors']:>8}{row['throughput_rps']:>9.1f}"
+            f"{row['p50_ms']:>9.0f}{row['p95_ms']:>9.0f}{row['p99_ms']:>9.0f}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the LMS Supabase backend with concurrent simulated users")
+    parser.add_argument("--members", type=int, default=100, help="concurrent simulated members")
+    parser.add_argument("--librarians", type=int, default=3, help="concurrent simulated librarians")
+    parser.add_argument("--duration", type=int, default=60, help="seconds of steady load")
+    parser.add_argument("--ramp-up", type=int, default=10, help="seconds over which users start")
+    parser.add_argument("--think-time", type=float, default=1.0, help="mean pause between operations, seconds")
+    parser.add_argument("--approvals-per-visit", type=int, default=5)
+    parser.add_argument("--member-accounts", help="CSV of email,password for the simulated members")
+    parser.add_argument("--app-url", help="also GET server-rendered pages from this Next.js app (e.g. http://localhost:3000)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="write the per-route summary to this file")
+    parser.add_argument(
+        "--telemetry", action="store_true",
+        help="also collect the server-action timings of the --app-url app (started with LMS_TELEMETRY_URL)",
+    )
+    args = parser.parse_args()
+
+    collector = None
+    if args.telemetry:
+        # Imported here: the collector imports this module for percentile()
+        import telemetry_collector
+        collector = telemetry_collector.Collector().start()
+        print(f"Collecting server-action timings at {collector.url}")
+    load_test = LoadTest(args)
+    try:
+        summary = load_test.run()
+    finally:
+        if collector:
+            collector.stop()
+    print_report(summary)
+    if collector:
+        path = telemetry_collector.report()
+        print(f"\nServer-action timings written to {path}" if path else "\nNo server-action timings received")
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump({
+                "args": vars(args),
+                "routes": summary,
+                "ramp_up_routes": load_test.ramp_up_stats.summary(args.ramp_up),
+            }, f, indent=2)
+        print(f"\nSummary written to {args.json}")
+
+if __name__ == "__main__":
+    main()
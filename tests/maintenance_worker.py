@@ -0,0 +1,176 @@
+"""
+Maintenance Worker
+Marks loans overdue, syncs overdue fines and expires reservations in batches on a schedule, visiting only rows that crossed a date since the last run
+"""
+
+from datetime import datetime, timezone
+import argparse
+import json
+import signal
+import sys
+import time
+
+import db
+
+# Applied in this order, so a loan is marked overdue before its fine is synced
+TASKS = ["overdue_status", "overdue_fines", "expire_reservations"]
+
+def lock_key(task):
+    return f"maintenance_worker:{task}"
+
+def window(conn, task):
+    """(processed_until of the last completed run or None, now) for a task"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT processed_until FROM maintenance_state WHERE task = %s", (task,))
+        row = cur.fetchone()
+        cur.execute("SELECT clock_timestamp()")
+        now = cur.fetchone()[0]
+    conn.commit()
+    return (row[0] if row else None), now
+
+def candidates(conn, task, start, end):
+    """Ids of the rows the task has to look at in the window (start, end]; start None means everything up to end"""
+    queries = {
+        "overdue_status": (
+            "SELECT id FROM transactions "
+            "WHERE return_date IS NULL AND status = 'issued' "
+            "AND (%(start)s::TIMESTAMPTZ IS NULL OR due_date > %(start)s) AND due_date <= %(end)s"
+        ),
+        "overdue_fines": "SELECT id FROM overdue_fine_candidates(%(start)s, %(end)s)",
+        "expire_reservations": (
+            "SELECT id FROM reservations "
+            "WHERE status = 'pending' "
+            "AND (%(start)s::TIMESTAMPTZ IS NULL OR expiry_date > %(start)s) AND expiry_date <= %(end)s"
+        ),
+    }
+    with conn.cursor() as cur:
+        cur.execute(queries[task], {"start": start, "end": end})
+        ids = sorted(str(row[0]) for row in cur.fetchall())
+    conn.commit()
+    return ids
+
+def process_batch(conn, task, ids, now):
+    """Apply the task to one batch in its own transaction. Returns {metric: count}."""
+    with conn.cursor() as cur:
+        if task == "overdue_status":
+            # Re-checked here: a loan may have been returned since it was listed
+            cur.execute(
+                "UPDATE transactions SET status = 'overdue' "
+                "WHERE id = ANY(%s::UUID[]) AND status = 'issued' AND return_date IS NULL",
+                (ids,),
+            )
+            result = {"rows": cur.rowcount}
+        elif task == "overdue_fines":
+            cur.execute("SELECT fines_created, fines_updated FROM sync_overdue_fines_batch(%s::UUID[], %s)", (ids, now))
+            created, updated = cur.fetchone()
+            result = {"rows": created + updated, "fines_created": created, "fines_updated": updated}
+        else:
+            cur.execute(
+                "UPDATE reservations SET status = 'expired' "
+                "WHERE id = ANY(%s::UUID[]) AND status = 'pending' AND expiry_date <= %s",
+                (ids, now),
+            )
+            result = {"rows": cur.rowcount}
+    conn.commit()
+    return result
+
+def save_window(conn, task, end, rows):
+    with conn.cursor() as cur:
+        cur.execute(
+            "INSERT INTO maintenance_state (task, processed_until, last_run_at, last_run_rows) "
+            "VALUES (%s, %s, NOW(), %s) "
+            "ON CONFLICT (task) DO UPDATE SET "
+            "processed_until = EXCLUDED.processed_until, last_run_at = EXCLUDED.last_run_at, "
+            "last_run_rows = EXCLUDED.last_run_rows",
+            (task, end, rows),
+        )
+    conn.commit()
+
+def run_task(conn, task, batch_size):
+    """Run one task if no other process holds it. Returns its metrics."""
+    started = time.perf_counter()
+    metrics = {"task": task, "started_at": datetime.now(timezone.utc).isoformat()}
+
+    with conn.cursor() as cur:
+        # Session-level lock: held across the batch commits until released below
+        cur.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (lock_key(task),))
+        locked = cur.fetchone()[0]
+    conn.commit()
+    if not locked:
+        return {**metrics, "status": "skipped", "reason": "running in another process"}
+
+    try:
+        start, end = window(conn, task)
+        ids = candidates(conn, task, start, end)
+        totals = {"rows": 0}
+        batches = 0
+        for offset in range(0, len(ids), batch_size):
+            for key, value in process_batch(conn, task, ids[offset:offset + batch_size], end).items():
+                totals[key] = totals.get(key, 0) + value
+            batches += 1
+        # Only a completed run moves the window; after a failure the next run redoes it, which is harmless
+        save_window(conn, task, end, totals["rows"])
+        metrics.update(
+            status="ok",
+            window_start=start.isoformat() if start else None,
+            window_end=end.isoformat(),
+            candidates=len(ids),
+            batches=batches,
+            **totals,
+        )
+    except Exception as e:
+        conn.rollback()
+        metrics.update(status="error", error=str(e))
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(hashtext(%s))", (lock_key(task),))
+        conn.commit()
+
+    metrics["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return metrics
+
+def emit(metrics, path=None):
+    """One JSON line per task run, on stdout and appended to path"""
+    line = json.dumps(metrics)
+    print(line, flush=True)
+    if path:
+        with open(path, "a") as f:
+            f.write(line + "\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run overdue, fine and reservation maintenance in the background")
+    parser.add_argument("--tasks", nargs="+", choices=TASKS, default=TASKS)
+    parser.add_argument("--batch-size", type=int, default=1000, help="rows updated per transaction")
+    parser.add_argument("--interval", type=float, default=300, help="seconds between runs")
+    parser.add_argument("--once", action="store_true", help="run every task once and exit")
+    parser.add_argument("--metrics-file", help="also append the JSON metrics lines to this file")
+    args = parser.parse_args()
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+
+    conn = db.connect()
+    failed = False
+    try:
+        while True:
+            for task in args.tasks:
+                metrics = run_task(conn, task, args.batch_size)
+                failed = failed or metrics["status"] == "error"
+                emit(metrics, args.metrics_file)
+            if args.once or stopping:
+                break
+            deadline = time.time() + args.interval
+            while time.time() < deadline and not stopping:
+                time.sleep(max(0, min(1, deadline - time.time())))
+            if stopping:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+
+    if args.once and failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Page Load Timing
+Navigates to a route and records Navigation Timing, Paint Timing and time-to-ready for it
+"""
+
+from urllib.parse import urlparse
+import json
+import os
+import statistics
+import time
+
+import query_budget
+import readiness
+import run_report
+
+BASE_URL = "http://localhost:3000"
+RESULTS_DIR = os.environ.get("LMS_RESULTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "results"))
+
+TIMING_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+if (!nav) return null;
+const fcp = performance.getEntriesByType('paint').find(p => p.name === 'first-contentful-paint');
+return {
+  ttfb_ms: nav.responseStart - nav.startTime,
+  dom_content_loaded_ms: nav.domContentLoadedEventEnd - nav.startTime,
+  load_ms: nav.loadEventEnd > 0 ? nav.loadEventEnd - nav.startTime : null,
+  fcp_ms: fcp ? fcp.startTime : null,
+  transfer_size: nav.transferSize,
+  ready_ms: performance.now(),
+};
+"""
+
+TIMING_FIELDS = ["ttfb_ms", "dom_content_loaded_ms", "fcp_ms", "ready_ms"]
+
+def run_id():
+    """Id shared by every process in one run; the runner sets it before starting workers"""
+    return os.environ.setdefault("LMS_RUN_ID", time.strftime("%Y%m%d-%H%M%S"))
+
+def timings_path(run=None, ext="jsonl"):
+    return os.path.join(RESULTS_DIR, f"timings-{run or run_id()}.{ext}")
+
+def navigate(driver, path, ready=None):
+    """Open path, wait until it is ready and record its timings.
+    Returns the timing record, or None if the app redirected somewhere else."""
+    counter = query_budget.Counter().start() if query_budget.enabled() else None
+
+    start = time.perf_counter()
+    driver.get(f"{BASE_URL}{path}")
+    loaded = time.perf_counter()
+    run_report.record_step("navigation", (loaded - start) * 1000, path)
+    if urlparse(driver.current_url).path.rstrip("/") != path.rstrip("/"):
+        return None
+
+    readiness.wait_until(
+        driver,
+        ready or readiness.page_ready(path),
+        message=f"{path} not ready after {readiness.TIMEOUT:.0f}s",
+    )
+    run_report.record_step("readiness", (time.perf_counter() - loaded) * 1000, path)
+    timing = driver.execute_script(TIMING_SCRIPT) or {}
+
+    record = {
+        "run_id": run_id(),
+        "route": path,
+        "timestamp": time.time(),
+        "wall_ms": (time.perf_counter() - start) * 1000,
+        **timing,
+    }
+    if counter:
+        record["queries"] = counter.stop()
+    _append(record)
+    return record
+
+def sample(driver, path, samples=3):
+    """Load path several times and return the timing record of each load"""
+    records = []
+    for _ in range(samples):
+        record = navigate(driver, path)
+        if record is None:
+            raise AssertionError(f"{path} redirected to {driver.current_url}")
+        records.append(record)
+    return records
+
+def _append(record):
+    # Each record is one short O_APPEND write, so worker processes can share the file
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(timings_path(), "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+def load_records(run=None):
+    """Read the records of a run, from the merged JSON file or the raw JSON lines"""
+    merged = timings_path(run, "json")
+    if os.path.exists(merged):
+        with open(merged) as f:
+            return json.load(f)["records"]
+
+    records = []
+    try:
+        with open(timings_path(run)) as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+    except OSError:
+        pass
+    return records
+
+def summarize(records):
+    """Median of every timing field per route, and the most queries a load ran when they were counted"""
+    by_route = {}
+    for record in records:
+        by_route.setdefault(record["route"], []).append(record)
+
+    summary = {}
+    for route, route_records in sorted(by_route.items()):
+        summary[route] = {"samples": len(route_records)}
+        for field in TIMING_FIELDS:
+            values = [r[field] for r in route_records if r.get(field) is not None]
+            summary[route][field] = statistics.median(values) if values else None
+        queries = [r["queries"] for r in route_records if r.get("queries") is not None]
+        if queries:
+            summary[route]["queries"] = max(queries)
+    return summary
+
+def write_run_file(run=None):
+    """Merge the run's JSON lines into timings-<run>.json and return its path"""
+    records = load_records(run)
+    if not records:
+        return None
+
+    path = timings_path(run, "json")
+    with open(path, "w") as f:
+        json.dump({"run_id": run or run_id(), "records": records, "summary": summarize(records)}, f, indent=2)
+    try:
+        os.remove(timings_path(run))
+    except OSError:
+        pass
+    return path
+
+def print_summary(records):
+    print("\nPage timings (median ms):")
+    print(f"  {'Route':<28}{'TTFB':>9}{'DCL':>9}{'FCP':>9}{'Ready':>9}")
+    for route, stats in summarize(records).items():
+        cells = "".join(
+            f"{stats[field]:>9.0f}" if stats[field] is not None else f"{'-':>9}"
+            for field in TIMING_FIELDS
+        )
+        print(f"  {route:<28}{cells}")
@@ -0,0 +1,156 @@
+"""
+Performance Budgets
+Checks per-route median timings against perf_budgets.json and a stored baseline run
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+
+import db
+import generate_dataset
+import page_timing
+
+BUDGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perf_budgets.json")
+BASELINE_PATH = os.path.join(page_timing.RESULTS_DIR, "baseline.json")
+# Synthetic books added by assert_flat_as_catalogue_grows, deleted again afterwards
+GROWTH_ISBN_PREFIX = "BENCH-GROWTH-"
+
+def load_budgets(path=BUDGETS_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+def load_baseline(path=BASELINE_PATH):
+    """Per-route summary of the baseline run, or None if there is no baseline yet"""
+    try:
+        with open(path) as f:
+            return json.load(f)["summary"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def save_baseline(records, path=BASELINE_PATH):
+    """Store the per-route medians of a run as the new baseline"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"summary": page_timing.summarize(records)}, f, indent=2)
+    return path
+
+def check(summary, budgets, baseline=None, regression_pct=None):
+    """Compare route medians with their budgets and the baseline.
+    Returns a list of violation messages, empty if everything is within limits."""
+    regression_pct = budgets.get("regression_pct", 20) if regression_pct is None else regression_pct
+    min_regression_ms = budgets.get("min_regression_ms", 0)
+    violations = []
+
+    for route, stats in summary.items():
+        for field, limit in budgets.get("routes", {}).get(route, {}).items():
+            value = stats.get(field)
+            if value is not None and value > limit:
+                violations.append(f"{route} {field} {value:.0f}ms exceeds budget of {limit}ms")
+
+        if not baseline or route not in baseline:
+            continue
+        queries, queries_before = stats.get("queries"), baseline[route].get("queries")
+        if queries is not None and queries_before is not None and queries > queries_before:
+            violations.append(f"{route} runs {queries} queries, baseline ran {queries_before}")
+        for field in page_timing.TIMING_FIELDS:
+            value = stats.get(field)
+            before = baseline[route].get(field)
+            if value is None or not before:
+                continue
+            slower_pct = (value - before) / before * 100
+            if slower_pct > regression_pct and value - before > min_regression_ms:
+                violations.append(
+                    f"{route} {field} {value:.0f}ms is {slower_pct:.0f}% slower than baseline ({before:.0f}ms)"
+                )
+
+    return violations
+
+def assert_within_budget(records, route, field="ttfb_ms"):
+    """Median of field over records; raises AssertionError if it exceeds the route's budget"""
+    median = statistics.median(record[field] for record in records)
+    limit = load_budgets().get("routes", {}).get(route, {}).get(field)
+    if limit is not None and median > limit:
+        raise AssertionError(f"{route} median {field} {median:.0f}ms exceeds budget of {limit}ms")
+    return median
+
+def assert_flat(records, grown_records, route, field="ttfb_ms"):
+    """Medians of field before and after the data grew. Raises AssertionError if the second is slower
+    by more than the budgets' regression_pct and min_regression_ms, the tolerance used against the baseline."""
+    budgets = load_budgets()
+    before = statistics.median(record[field] for record in records)
+    after = statistics.median(record[field] for record in grown_records)
+    slower_pct = (after - before) / before * 100 if before else 0
+    if slower_pct > budgets.get("regression_pct", 20) and after - before > budgets.get("min_regression_ms", 0):
+        raise AssertionError(
+            f"{route} median {field} grew from {before:.0f}ms to {after:.0f}ms ({slower_pct:.0f}% slower) with the data"
+        )
+    return before, after
+
+def assert_flat_as_catalogue_grows(driver, route, sizes, samples=3, field="ttfb_ms"):
+    """Time route with sizes[0] and then sizes[1] synthetic books added to the catalogue and
+    assert_flat() the two. Needs LMS_DATABASE_URL. Returns the two medians."""
+    small, large = sizes
+    conn = db.connect()
+    try:
+        delete_growth_books(conn)
+        generate_dataset.load_books(conn, 0, small, GROWTH_ISBN_PREFIX)
+        records = page_timing.sample(driver, route, samples)
+        generate_dataset.load_books(conn, small, large - small, GROWTH_ISBN_PREFIX)
+        grown_records = page_timing.sample(driver, route, samples)
+        return assert_flat(records, grown_records, route, field)
+    finally:
+        conn.rollback()
+        delete_growth_books(conn)
+        conn.close()
+
+def delete_growth_books(conn):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM books WHERE isbn LIKE %s", (f"{GROWTH_ISBN_PREFIX}%",))
+    conn.commit()
+
+def report(records, mode="warn", save=False, regression_pct=None):
+    """Print budget violations for a run's records. Returns False if the run should fail."""
+    if mode == "off" or not records:
+        return True
+
+    violations = check(
+        page_timing.summarize(records),
+        load_budgets(),
+        load_baseline(),
+        regression_pct,
+    )
+
+    if violations:
+        marker = "❌" if mode == "fail" else "⚠️"
+        print(f"\n{marker} {len(violations)} performance budget violation(s):")
+        for violation in violations:
+            print(f"  {violation}")
+    else:
+        print("\n✅ All routes within performance budgets")
+
+    if save:
+        print(f"  Baseline saved to {save_baseline(records)}")
+
+    return not (violations and mode == "fail")
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a test run's page timings against the performance budgets")
+    parser.add_argument("run_id", help="run id of results/timings-<run id>.json")
+    parser.add_argument("--mode", choices=["warn", "fail"], default="fail")
+    parser.add_argument("--regression-pct", type=float, help="allowed slowdown against the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args()
+
+    records = page_timing.load_records(args.run_id)
+    if not records:
+        print(f"No timings found for run {args.run_id}")
+        sys.exit(1)
+
+    ok = report(records, args.mode, args.save_baseline, args.regression_pct)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
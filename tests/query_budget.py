@@ -0,0 +1,123 @@
+"""
+Query Budgets
+Counts the database statements the app runs for each page load through pg_stat_statements and checks them against per-route limits
+"""
+
+import argparse
+import os
+import sys
+
+import db
+
+# PostgREST runs each request's statements as one of these roles, so their statements are the
+# app's round-trips. GoTrue (supabase_auth_admin) and this module's own queries are left out.
+APP_ROLES = ["anon", "authenticated", "service_role"]
+
+COUNT_SQL = """
+SELECT COALESCE(SUM(s.calls), 0)
+FROM extensions.pg_stat_statements s
+JOIN pg_roles r ON r.oid = s.userid
+WHERE s.dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+  AND s.toplevel
+  AND r.rolname = ANY(%s)
+"""
+
+_conn = None
+
+def enabled():
+    """Set by run_all_tests.py --count-queries; read on every call so worker processes see it"""
+    return os.environ.get("LMS_COUNT_QUERIES") == "1"
+
+def _connection():
+    global _conn
+    if _conn is None:
+        _conn = db.connect()
+        _conn.autocommit = True
+    return _conn
+
+def total_statements():
+    """Statements the app's roles have run since pg_stat_statements was last reset"""
+    try:
+        with _connection().cursor() as cur:
+            cur.execute(COUNT_SQL, (APP_ROLES,))
+            return int(cur.fetchone()[0])
+    except Exception as e:
+        raise RuntimeError(
+            f"Could not read pg_stat_statements ({e}); counting queries needs the local stack, "
+            "where the extension is installed in the extensions schema"
+        ) from e
+
+class Counter:
+    """Statements run between start() and stop(). Counts are server-wide, so only meaningful
+    while nothing else uses the app: one worker, no load test or maintenance worker."""
+
+    def __init__(self):
+        self.before = None
+        self.queries = None
+
+    def start(self):
+        self.before = total_statements()
+        return self
+
+    def stop(self):
+        self.queries = total_statements() - self.before
+        return self.queries
+
+def summarize(records):
+    """Most queries any load of each route ran; a route whose count varies between loads is worth a look"""
+    summary = {}
+    for record in records:
+        if record.get("queries") is not None:
+            summary[record["route"]] = max(summary.get(record["route"], 0), record["queries"])
+    return dict(sorted(summary.items()))
+
+def check(summary, budgets):
+    """Violation messages for routes over their max_queries budget"""
+    limits = budgets.get("max_queries", {})
+    return [
+        f"{route} ran {queries} queries, budget is {limits[route]}"
+        for route, queries in summary.items()
+        if route in limits and queries > limits[route]
+    ]
+
+def report(records, budgets, mode="warn"):
+    """Print per-route query counts and violations of budgets (perf_budget.load_budgets()).
+    Returns False if the run should fail."""
+    summary = summarize(records)
+    if mode == "off" or not summary:
+        return True
+
+    limits = budgets.get("max_queries", {})
+    print("\nDatabase queries per page load (max):")
+    print(f"  {'Route':<28}{'Queries':>9}{'Budget':>9}")
+    for route, queries in summary.items():
+        print(f"  {route:<28}{queries:>9}{limits.get(route, '-'):>9}")
+
+    violations = check(summary, budgets)
+    if violations:
+        marker = "❌" if mode == "fail" else "⚠️"
+        print(f"\n{marker} {len(violations)} query budget violation(s):")
+        for violation in violations:
+            print(f"  {violation}")
+    else:
+        print("\n✅ All routes within query budgets")
+    return not (violations and mode == "fail")
+
+def main():
+    # Only the command line needs these; page_timing imports this module to count each page load's queries
+    import page_timing
+    import perf_budget
+
+    parser = argparse.ArgumentParser(description="Check a test run's per-route query counts against the query budgets")
+    parser.add_argument("run_id", help="run id of results/timings-<run id>.json")
+    parser.add_argument("--mode", choices=["warn", "fail"], default="fail")
+    args = parser.parse_args()
+
+    records = page_timing.load_records(args.run_id)
+    if not summarize(records):
+        print(f"No query counts found for run {args.run_id}; run the tests with --count-queries")
+        sys.exit(1)
+    sys.exit(0 if report(records, perf_budget.load_budgets(), args.mode) else 1)
+
+if __name__ == "__main__":
+    main()
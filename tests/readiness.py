@@ -0,0 +1,118 @@
+"""
+Page Readiness Helpers
+Waits for page-specific "data loaded" conditions, polling with a backoff instead of fixed sleeps
+"""
+
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import (
+    NoSuchElementException,
+    StaleElementReferenceException,
+    TimeoutException,
+)
+from urllib.parse import urlparse
+import os
+import re
+import time
+
+TIMEOUT = float(os.environ.get("LMS_READY_TIMEOUT", "15"))
+INITIAL_INTERVAL = 0.05
+MAX_INTERVAL = 0.5
+BACKOFF = 1.5
+
+RESULT_COUNT_PATTERN = re.compile(r"Showing (\d+) of (\d+) books")
+
+def wait_until(driver, condition, timeout=TIMEOUT, message=""):
+    """Poll condition(driver) until it returns something truthy and return that value"""
+    start = time.perf_counter()
+    interval = INITIAL_INTERVAL
+    while True:
+        try:
+            value = condition(driver)
+        except (NoSuchElementException, StaleElementReferenceException):
+            value = None
+        if value:
+            return value
+
+        remaining = timeout - (time.perf_counter() - start)
+        if remaining <= 0:
+            raise TimeoutException(message or f"Page not ready after {timeout:.0f}s")
+        time.sleep(min(interval, remaining))
+        interval = min(interval * BACKOFF, MAX_INTERVAL)
+
+# Conditions: each returns a callable taking the driver
+
+def all_of(*conditions):
+    return lambda driver: all(condition(driver) for condition in conditions)
+
+def any_of(*conditions):
+    return lambda driver: any(condition(driver) for condition in conditions)
+
+def heading_present():
+    """The page heading has rendered"""
+    return lambda driver: any(h1.text.strip() for h1 in driver.find_elements(By.TAG_NAME, "h1"))
+
+def not_loading():
+    """No loading spinner is visible"""
+    return lambda driver: not any(
+        spinner.is_displayed() for spinner in driver.find_elements(By.CSS_SELECTOR, ".animate-spin")
+    )
+
+def page_loaded():
+    """Heading rendered and client-side data fetches finished"""
+    return all_of(heading_present(), not_loading())
+
+def table_has_rows(min_rows=1):
+    """A data table has at least min_rows body rows"""
+    return lambda driver: len(driver.find_elements(By.CSS_SELECTOR, "table tbody tr")) >= min_rows
+
+def text_present(text):
+    return lambda driver: text in driver.find_element(By.TAG_NAME, "body").text
+
+def toast_shown():
+    """A sonner toast is on screen"""
+    return lambda driver: len(driver.find_elements(By.CSS_SELECTOR, "[data-sonner-toast]")) > 0
+
+def result_count(driver):
+    """Books shown by the catalogue's "Showing X of Y books" line, or None"""
+    match = RESULT_COUNT_PATTERN.search(driver.find_element(By.TAG_NAME, "body").text)
+    return int(match.group(1)) if match else None
+
+def result_count_changed(before):
+    """The catalogue result count moved away from before"""
+    def condition(driver):
+        count = result_count(driver)
+        return count is not None and count != before
+    return condition
+
+def stat_value(driver, title):
+    """Value shown on the dashboard StatCard with the given title"""
+    return driver.find_element(
+        By.XPATH,
+        f"//*[@data-slot='card-title' and normalize-space()='{title}']"
+        "/ancestor::*[@data-slot='card'][1]//*[@data-slot='card-content']/div[1]",
+    ).text
+
+def books_loaded():
+    """Catalogue finished loading: either book cards or the empty state are on screen"""
+    return all_of(
+        page_loaded(),
+        lambda driver: result_count(driver) is not None,
+        any_of(
+            lambda driver: len(driver.find_elements(By.CSS_SELECTOR, "[data-slot='card']")) > 0,
+            text_present("No books found"),
+        ),
+    )
+
+# Route-specific readiness; anything not listed just needs page_loaded()
+ROUTE_CONDITIONS = {
+    "/member/books": books_loaded,
+}
+
+def page_ready(path):
+    """Readiness condition for a route"""
+    return ROUTE_CONDITIONS.get(path, page_loaded)()
+
+def wait_for_page(driver, path=None, timeout=TIMEOUT):
+    """Wait until the current page (or the given route) has loaded its data"""
+    path = path or urlparse(driver.current_url).path
+    return wait_until(driver, page_ready(path), timeout, f"{path} not ready after {timeout:.0f}s")
@@ -1,60 +1,317 @@
 """
 Run all tests
-Simple test runner that executes all test files
+Simple test runner that executes all test files, in sequence or across worker processes
 """
 
-import test_auth
-import test_member
-import test_admin
-import test_librarian
+import argparse
+import contextlib
+import importlib
+import io
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+import driver_pool
+import fixtures
+import page_timing
+import perf_budget
+import query_budget
+import run_report
+import telemetry_collector
+
+SUITES = [
+    ("AUTHENTICATION TESTS", "test_auth", [
+        "test_login_admin",
+        "test_login_librarian",
+        "test_login_member",
+        "test_login_invalid",
+    ]),
+    ("MEMBER TESTS", "test_member", [
+        "test_member_dashboard",
+        "test_browse_books",
+        "test_my_books",
+        "test_search_books",
+        "test_view_fines",
+        "test_member_pages_with_long_history",
+    ]),
+    ("ADMIN TESTS", "test_admin", [
+        "test_admin_dashboard",
+        "test_view_books",
+        "test_view_users",
+        "test_view_transactions",
+        "test_view_fines",
+        "test_view_reservations",
+        "test_page_borrow_requests",
+    ]),
+    ("LIBRARIAN TESTS", "test_librarian", [
+        "test_librarian_dashboard",
+        "test_view_requests",
+        "test_view_issue_page",
+        "test_view_return_page",
+        "test_view_overdue_page",
+    ]),
+    ("CATALOGUE IMPORT TESTS", "test_catalogue_io", [
+        "test_load_chunk",
+    ]),
+]
+
+def all_tests():
+    """List (suite title, module name, test name) in report order"""
+    return [
+        (title, module_name, test_name)
+        for title, module_name, test_names in SUITES
+        for test_name in test_names
+    ]
+
+def run_test(module_name, test_name):
+    """Run one test function, capturing its output"""
+    module = importlib.import_module(module_name)
+    output = io.StringIO()
+    run_report.begin()
+    start = time.perf_counter()
+    error = None
+
+    with contextlib.redirect_stdout(output):
+        try:
+            getattr(module, test_name)()
+        except Exception as e:
+            error = e
+
+    text = output.getvalue()
+    if error is not None:
+        text += f"❌ {test_name} raised: {error}\n"
+
+    return {
+        "module": module_name,
+        "test": test_name,
+        "passed": error is None and "❌" not in text,
+        "duration": time.perf_counter() - start,
+        "output": text,
+        **run_report.collected(),
+    }
+
+def worker(tasks, results):
+    """Worker process loop: owns one browser pool and runs tests until told to stop"""
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        index, module_name, test_name = task
+        results.put((index, run_test(module_name, test_name)))
+    driver_pool.shutdown()
+
+def run_sequential(tests, reset_each=False):
+    """Run tests one after another in this process, printing as they finish"""
+    results = []
+    current_title = None
+    for title, module_name, test_name in tests:
+        if title != current_title:
+            print_suite_header(title)
+            current_title = title
+        if reset_each:
+            fixtures.reset_app_database()
+        result = run_test(module_name, test_name)
+        print(result["output"], end="")
+        results.append(result)
+
+    driver_pool.shutdown()
+    print(f"\nChrome instances launched: {driver_pool.launched_count()}")
+    return results
+
+def run_parallel(tests, workers):
+    """Send tests to a pool of worker processes and collect results in order"""
+    ctx = multiprocessing.get_context("spawn")
+    tasks = ctx.Queue()
+    results_queue = ctx.Queue()
+
+    for index, (_, module_name, test_name) in enumerate(tests):
+        tasks.put((index, module_name, test_name))
+    for _ in range(workers):
+        tasks.put(None)
+
+    processes = [ctx.Process(target=worker, args=(tasks, results_queue)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+
+    collected = {}
+    while len(collected) < len(tests):
+        try:
+            index, result = results_queue.get(timeout=1)
+            collected[index] = result
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes):
+                break
+
+    for process in processes:
+        process.join()
+
+    results = []
+    current_title = None
+    for index, (title, module_name, test_name) in enumerate(tests):
+        if title != current_title:
+            print_suite_header(title)
+            current_title = title
+        result = collected.get(index) or {
+            "module": module_name,
+            "test": test_name,
+            "passed": False,
+            "duration": 0.0,
+            "output": f"❌ {test_name} did not report a result (worker crashed)\n",
+        }
+        print(result["output"], end="")
+        results.append(result)
+    return results
+
+def print_suite_header(title):
+    print("\n" + "-"*50)
+    print(f"  {title}")
+    print("-"*50)
+
+def parse_workers(value):
+    """Worker count from the command line; 0 means one per CPU core"""
+    workers = int(value)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
 
 def main():
+    parser = argparse.ArgumentParser(description="Run the LMS Selenium tests")
+    parser.add_argument(
+        "--workers",
+        type=parse_workers,
+        default=parse_workers(os.environ.get("LMS_TEST_WORKERS", "1")),
+        help="number of worker processes, each with its own browser (0 = one per CPU core)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="run the suites this many times; budgets use the median of all repeats",
+    )
+    parser.add_argument(
+        "--budget-mode",
+        choices=["off", "warn", "fail"],
+        default=os.environ.get("LMS_BUDGET_MODE", "warn"),
+        help="what to do when a route exceeds its budget or regresses against the baseline",
+    )
+    parser.add_argument(
+        "--regression-pct",
+        type=float,
+        help="allowed slowdown against the baseline (default from perf_budgets.json)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store this run's route medians as the baseline for later runs",
+    )
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        help="start a local Postgres/GoTrue/PostgREST stack and the app against it instead of the hosted project",
+    )
+    parser.add_argument(
+        "--reset-local",
+        action="store_true",
+        help="with --local, recreate the local database from sql_scripts/ before running",
+    )
+    parser.add_argument(
+        "--reset-db",
+        choices=["off", "run", "test"],
+        default=os.environ.get("LMS_RESET_DB", "off"),
+        help="restore the database from its fixtures.py snapshot before the run or before every test",
+    )
+    parser.add_argument(
+        "--telemetry",
+        action="store_true",
+        help="collect the app's server-action request timings (the app needs LMS_TELEMETRY_URL; --local sets it)",
+    )
+    parser.add_argument(
+        "--count-queries",
+        action="store_true",
+        help="count the database queries of every page load and check them against max_queries in perf_budgets.json",
+    )
+    args = parser.parse_args()
+    if args.count_queries:
+        if args.workers > 1:
+            # pg_stat_statements counts for the whole server, so parallel tests would count each other's queries
+            parser.error("--count-queries needs --workers 1")
+        os.environ["LMS_COUNT_QUERIES"] = "1"
+    if args.reset_db == "test" and args.workers > 1:
+        # Every worker shares the app's database, so a restore would pull it out from under the others
+        parser.error("--reset-db test needs --workers 1; use --reset-db run with several workers")
+
+    collector = telemetry_collector.Collector().start() if args.telemetry else None
+    if collector and not args.local:
+        print(f"Collecting server-action timings; the app must be running with LMS_TELEMETRY_URL={collector.url}")
+
+    app = None
+    if args.local:
+        import local_stack
+
+        print("Starting local Supabase stack...")
+        env = local_stack.up(reset=args.reset_local)
+        # Workers inherit these; keep local sessions apart from hosted-project ones
+        os.environ.update(env)
+        os.environ.setdefault("LMS_SESSION_CACHE_DIR", os.path.join(local_stack.STACK_DIR, ".session-cache"))
+        if collector:
+            env["LMS_TELEMETRY_URL"] = collector.url
+        print("Starting the app against it...")
+        app = local_stack.start_app(env)
+
+    try:
+        within_budget = run_suites(args)
+    finally:
+        if app:
+            local_stack.stop_app(app)
+        if collector:
+            collector.stop()
+
+    if collector:
+        path = telemetry_collector.report()
+        print(f"\nServer-action timings written to {path}" if path else "\nNo server-action timings received")
+
+    if not within_budget:
+        sys.exit(1)
+
+def run_suites(args):
+    """Run every suite and report timings; returns False when the budget check fails"""
     print("\n" + "="*50)
     print("    RUNNING ALL LMS SELENIUM TESTS")
     print("="*50 + "\n")
-    
-    # Authentication tests
-    print("\n" + "-"*50)
-    print("  AUTHENTICATION TESTS")
-    print("-"*50)
-    test_auth.test_login_admin()
-    test_auth.test_login_librarian()
-    test_auth.test_login_member()
-    test_auth.test_login_invalid()
-    
-    # Member tests
-    print("\n" + "-"*50)
-    print("  MEMBER TESTS")
-    print("-"*50)
-    test_member.test_member_dashboard()
-    test_member.test_browse_books()
-    test_member.test_my_books()
-    test_member.test_search_books()
-    test_member.test_view_fines()
-    
-    # Admin tests
-    print("\n" + "-"*50)
-    print("  ADMIN TESTS")
-    print("-"*50)
-    test_admin.test_admin_dashboard()
-    test_admin.test_view_books()
-    test_admin.test_view_users()
-    test_admin.test_view_transactions()
-    test_admin.test_view_fines()
-    
-    # Librarian tests
-    print("\n" + "-"*50)
-    print("  LIBRARIAN TESTS")
-    print("-"*50)
-    test_librarian.test_librarian_dashboard()
-    test_librarian.test_view_requests()
-    test_librarian.test_view_issue_page()
-    test_librarian.test_view_return_page()
-    test_librarian.test_view_overdue_page()
-    
+
+    # Set the run id before workers start so they all write to the same timings file
+    run = page_timing.run_id()
+    tests = all_tests() * max(args.repeat, 1)
+    if args.reset_db == "run":
+        print(f"Database restored from snapshot in {fixtures.reset_app_database():.0f}ms")
+    start = time.perf_counter()
+    if args.workers > 1:
+        print(f"Using {args.workers} worker processes")
+        results = run_parallel(tests, args.workers)
+    else:
+        results = run_sequential(tests, reset_each=args.reset_db == "test")
+    elapsed = time.perf_counter() - start
+
+    for (title, _, _), result in zip(tests, results):
+        result["suite"] = title
+    passed = sum(1 for result in results if result["passed"])
+    print(f"\nPassed {passed}/{len(results)} tests in {elapsed:.1f}s")
+
+    records = page_timing.load_records(run)
+    if records:
+        page_timing.print_summary(records)
+        print(f"\nTimings written to {page_timing.write_run_file(run)}")
+    json_path, xml_path = run_report.write(results, run, elapsed, args.workers)
+    print(f"Results written to {json_path} and {xml_path}")
+    within_budget = perf_budget.report(records, args.budget_mode, args.save_baseline, args.regression_pct)
+    within_budget = query_budget.report(records, perf_budget.load_budgets(), args.budget_mode) and within_budget
+
     print("\n" + "="*50)
     print("    ALL TESTS COMPLETE")
     print("="*50 + "\n")
+    return within_budget
 
 if __name__ == "__main__":
     main()
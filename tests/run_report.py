@@ -0,0 +1,157 @@
+"""
+Test Run Report
+Collects each test's outcome, duration, step timings and artifacts, and writes a run as JSON and JUnit XML
+"""
+
+import json
+import os
+import platform
+import re
+import time
+import xml.etree.ElementTree as ET
+
+import page_timing
+
+# Steps and artifacts of the test running in this process; run_all_tests.py resets them per test
+_steps = []
+_artifacts = []
+
+def results_path(run=None, ext="json"):
+    return os.path.join(page_timing.RESULTS_DIR, f"results-{run or page_timing.run_id()}.{ext}")
+
+def begin():
+    """Start collecting for a new test"""
+    _steps.clear()
+    _artifacts.clear()
+
+def record_step(kind, ms, target=None, **details):
+    """Record one timed step (login, navigation or readiness) of the current test"""
+    _steps.append({"kind": kind, "target": target, "ms": round(ms, 1), **details})
+
+def screenshot(driver, filename):
+    """Save a failure screenshot and attach it to the current test"""
+    driver.save_screenshot(filename)
+    path = os.path.abspath(filename)
+    _artifacts.append(path)
+    print(f"  Screenshot saved to {filename}")
+    return path
+
+def collected():
+    """Steps and artifacts recorded since begin()"""
+    return {"steps": list(_steps), "artifacts": list(_artifacts)}
+
+def failure_message(output):
+    """First ❌ line a test printed, without the marker"""
+    for line in output.splitlines():
+        if "❌" in line:
+            return line.replace("❌", "").strip()
+    return None
+
+def step_totals(result):
+    """Total ms per step kind for one test result"""
+    totals = {}
+    for step in result.get("steps", []):
+        totals[step["kind"]] = totals.get(step["kind"], 0) + step["ms"]
+    return {kind: round(ms, 1) for kind, ms in totals.items()}
+
+def build(results, run, elapsed, workers=1):
+    """The JSON document for a run: environment, totals, every test result and the route medians"""
+    tests = []
+    for result in results:
+        tests.append({
+            "suite": result.get("suite"),
+            "module": result["module"],
+            "test": result["test"],
+            "status": "passed" if result["passed"] else "failed",
+            "duration_ms": round(result["duration"] * 1000, 1),
+            "message": None if result["passed"] else failure_message(result["output"]),
+            "step_totals_ms": step_totals(result),
+            "steps": result.get("steps", []),
+            "artifacts": result.get("artifacts", []),
+            "output": result["output"],
+        })
+
+    passed = sum(1 for test in tests if test["status"] == "passed")
+    return {
+        "run_id": run,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "app_version": os.environ.get("LMS_APP_VERSION"),
+        "environment": {
+            "base_url": page_timing.BASE_URL,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "workers": workers,
+        },
+        "totals": {
+            "tests": len(tests),
+            "passed": passed,
+            "failed": len(tests) - passed,
+            "duration_ms": round(elapsed * 1000, 1),
+        },
+        "tests": tests,
+        "routes": page_timing.summarize(page_timing.load_records(run)),
+    }
+
+def _junit_text(text):
+    # XML 1.0 can't hold most control characters, which browser error messages sometimes contain
+    return re.sub(r"[\x00-\x08\x0b\x0c\x0e-\x1f]", "", text)
+
+def to_junit(report):
+    """JUnit XML for a run: one testsuite per test module, step totals as testcase properties"""
+    root = ET.Element("testsuites", {
+        "name": f"LMS Selenium tests {report['run_id']}",
+        "tests": str(report["totals"]["tests"]),
+        "failures": str(report["totals"]["failed"]),
+        "time": f"{report['totals']['duration_ms'] / 1000:.3f}",
+    })
+
+    by_module = {}
+    for test in report["tests"]:
+        by_module.setdefault(test["module"], []).append(test)
+
+    for module, tests in by_module.items():
+        suite = ET.SubElement(root, "testsuite", {
+            "name": module,
+            "tests": str(len(tests)),
+            "failures": str(sum(1 for test in tests if test["status"] == "failed")),
+            "time": f"{sum(test['duration_ms'] for test in tests) / 1000:.3f}",
+        })
+        for test in tests:
+            case = ET.SubElement(suite, "testcase", {
+                "classname": module,
+                "name": test["test"],
+                "time": f"{test['duration_ms'] / 1000:.3f}",
+            })
+            if test["step_totals_ms"]:
+                properties = ET.SubElement(case, "properties")
+                for kind, ms in test["step_totals_ms"].items():
+                    ET.SubElement(properties, "property", {"name": f"{kind}_ms", "value": f"{ms:.1f}"})
+            if test["status"] == "failed":
+                failure = ET.SubElement(case, "failure", {"message": _junit_text(test["message"] or "failed")})
+                failure.text = _junit_text(test["output"])
+            # [[ATTACHMENT|path]] is how Jenkins and GitLab pick up screenshots from JUnit output
+            attachments = "".join(f"[[ATTACHMENT|{path}]]\n" for path in test["artifacts"])
+            ET.SubElement(case, "system-out").text = _junit_text(test["output"] + attachments)
+
+    ET.indent(root)
+    return ET.tostring(root, encoding="unicode", xml_declaration=True)
+
+def write(results, run, elapsed, workers=1):
+    """Write results-<run>.json and results-<run>.xml and return their paths"""
+    report = build(results, run, elapsed, workers)
+    os.makedirs(page_timing.RESULTS_DIR, exist_ok=True)
+
+    json_path = results_path(run)
+    with open(json_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    xml_path = results_path(run, "xml")
+    with open(xml_path, "w") as f:
+        f.write(to_junit(report) + "\n")
+    return json_path, xml_path
+
+def load(run_or_path):
+    """Read a run report by run id or by path"""
+    path = run_or_path if os.path.exists(run_or_path) else results_path(run_or_path)
+    with open(path) as f:
+        return json.load(f)
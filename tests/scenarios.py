@@ -0,0 +1,466 @@
+"""
+End-to-End Scenarios
+Runs business flows across concurrent member and librarian browsers and times each step until the other role sees it
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+
+import db
+import driver_pool
+import page_timing
+import readiness
+import run_report
+import session_cache
+from fixtures import reset_app_database
+from latency_stats import percentile
+
+BASE_URL = "http://localhost:3000"
+
+SCENARIO_EMAIL_DOMAIN = "scenario.lms"
+SCENARIO_ISBN_PREFIX = "SCENARIO-"
+SCENARIO_PASSWORD = "scenario123"
+
+# How long a role waits for the other role's step, and how often it reloads the page to look for it
+STEP_TIMEOUT = float(os.environ.get("LMS_SCENARIO_TIMEOUT", "60"))
+POLL_INTERVAL = float(os.environ.get("LMS_SCENARIO_POLL", "0.5"))
+FINE_PER_DAY = 10
+
+def state_dir(run=None):
+    return os.path.join(page_timing.RESULTS_DIR, "scenarios", run or page_timing.run_id())
+
+class Fixtures:
+    """Scenario data written straight to the database, skipping the forms that would create it in the UI"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        # Role threads of every flow share the connection
+        self._lock = threading.Lock()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            with self.conn.cursor() as cur:
+                cur.execute(sql, params)
+                rows = cur.fetchall() if cur.description else []
+            self.conn.commit()
+        return rows
+
+    def create_member(self, tag):
+        """A member who can log in through the form. The on_auth_user_created trigger creates the profile."""
+        email = f"{tag}@{SCENARIO_EMAIL_DOMAIN}"
+        rows = self._execute(
+            "INSERT INTO auth.users (instance_id, id, aud, role, email, encrypted_password, email_confirmed_at, "
+            "confirmation_token, recovery_token, email_change_token_new, email_change, "
+            "raw_app_meta_data, raw_user_meta_data, created_at, updated_at) "
+            "VALUES ('00000000-0000-0000-0000-000000000000', gen_random_uuid(), 'authenticated', 'authenticated', "
+            "%s, extensions.crypt(%s, extensions.gen_salt('bf')), NOW(), '', '', '', '', "
+            "'{\"provider\": \"email\", \"providers\": [\"email\"]}', "
+            "jsonb_build_object('full_name', 'Scenario ' || %s, 'role', 'member'), NOW(), NOW()) "
+            "RETURNING id",
+            (email, SCENARIO_PASSWORD, tag),
+        )
+        return {"id": str(rows[0][0]), "email": email, "password": SCENARIO_PASSWORD}
+
+    def create_book(self, tag, copies=1):
+        title = f"Scenario Book {tag}"
+        rows = self._execute(
+            "INSERT INTO books (isbn, title, author, genre, total_copies, available_copies) "
+            "VALUES (%s, %s, 'Scenario Author', 'Other', %s, %s) RETURNING id",
+            (f"{SCENARIO_ISBN_PREFIX}{tag}", title, copies, copies),
+        )
+        return {"id": str(rows[0][0]), "title": title}
+
+    def make_overdue(self, user_id, book_id, days):
+        """Move the member's open loan of the book back in time so it is `days` whole days overdue"""
+        rows = self._execute(
+            "UPDATE transactions "
+            "SET issue_date = NOW() - make_interval(days => %s + 14), "
+            "due_date = NOW() - make_interval(days => %s) - INTERVAL '1 hour' "
+            "WHERE user_id = %s AND book_id = %s AND return_date IS NULL RETURNING id",
+            (days, days, user_id, book_id),
+        )
+        if not rows:
+            raise AssertionError("No open loan to make overdue")
+        return str(rows[0][0])
+
+    def loan_and_fine(self, user_id, book_id):
+        """(loan status, returned?, fine amount, fine paid?) of the member's latest loan of the book"""
+        rows = self._execute(
+            "SELECT t.status, t.return_date IS NOT NULL, f.amount, f.paid "
+            "FROM transactions t LEFT JOIN fines f ON f.transaction_id = t.id "
+            "WHERE t.user_id = %s AND t.book_id = %s ORDER BY t.issue_date DESC LIMIT 1",
+            (user_id, book_id),
+        )
+        return rows[0] if rows else None
+
+    def delete(self, fixtures):
+        # Deleting the member cascades to their requests, loans and fines
+        self._execute("DELETE FROM auth.users WHERE id = %s", (fixtures["member"]["id"],))
+        self._execute("DELETE FROM books WHERE id = %s", (fixtures["book"]["id"],))
+
+class Flow:
+    """One run of a scenario: its fixtures and the marks its roles have reached, saved after every step so it can resume"""
+
+    def __init__(self, scenario, index, path):
+        self.scenario = scenario
+        self.index = index
+        self.path = path
+        self.fixtures = None
+        self.marks = {}
+        self.notes = {}
+        self.error = None
+        self.resumed = False
+        self._changed = threading.Condition()
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            state = json.load(f)
+        flow = cls(state["scenario"], state["index"], path)
+        flow.fixtures = state["fixtures"]
+        flow.marks = state["marks"]
+        flow.notes = state.get("notes", {})
+        flow.resumed = True
+        return flow
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump({
+                "scenario": self.scenario,
+                "index": self.index,
+                "fixtures": self.fixtures,
+                "marks": self.marks,
+                "notes": self.notes,
+                "error": self.error,
+            }, f, indent=2)
+
+    def mark(self, name):
+        """Record that a step finished now, and wake any role waiting for it"""
+        with self._changed:
+            self.marks[name] = time.time()
+            self.save()
+            self._changed.notify_all()
+
+    def wait_for(self, name, timeout=STEP_TIMEOUT):
+        """Block until another role has marked name"""
+        with self._changed:
+            if not self._changed.wait_for(lambda: name in self.marks or self.error, timeout):
+                raise TimeoutException(f"waited {timeout:.0f}s for {name}")
+            if name not in self.marks:
+                raise AssertionError(f"gave up waiting for {name}: {self.error}")
+
+    def fail(self, error):
+        with self._changed:
+            self.error = self.error or error
+            self.save()
+            self._changed.notify_all()
+
+# Page helpers
+
+def poll(driver, path, condition, timeout=STEP_TIMEOUT):
+    """Reload path until condition(driver) holds, the way a user would refresh to see a change. Returns its value."""
+    deadline = time.time() + timeout
+    while True:
+        driver.get(f"{BASE_URL}{path}")
+        readiness.wait_for_page(driver, path)
+        try:
+            value = condition(driver)
+        except (NoSuchElementException, StaleElementReferenceException):
+            value = None
+        if value:
+            return value
+        if time.time() > deadline:
+            raise TimeoutException(f"{path}: condition not met after {timeout:.0f}s")
+        time.sleep(POLL_INTERVAL)
+
+def rows_with(driver, text, selector="table tbody tr"):
+    return [row for row in driver.find_elements(By.CSS_SELECTOR, selector) if text in row.text]
+
+def card_with(driver, title):
+    cards = driver.find_elements(
+        By.XPATH, f"//*[@data-slot='card'][.//h3[normalize-space()='{title}']]"
+    )
+    return cards[0] if cards else None
+
+def wait_for_toast(driver):
+    """Text of the success toast an action shows; raises with the text of an error toast"""
+    toast = readiness.wait_until(
+        driver,
+        lambda d: next(iter(d.find_elements(
+            By.CSS_SELECTOR, "[data-sonner-toast][data-type='success'], [data-sonner-toast][data-type='error']"
+        )), None),
+        message="no toast after the action",
+    )
+    text = toast.text
+    if toast.get_attribute("data-type") == "error":
+        raise AssertionError(f"action failed: {text}")
+    return text
+
+def login_member(driver, member):
+    session_cache.login_with_form(driver, member["email"], member["password"])
+    WebDriverWait(driver, 15).until(EC.url_contains("/member"))
+
+# borrow_return_fine: a member requests a book, a librarian approves it, the book comes back late,
+# and the member sees the fine and pays it
+
+def member_request_book(flow, driver, fixtures, options):
+    title = flow.fixtures["book"]["title"]
+    page_timing.navigate(driver, "/member/books")
+    search = driver.find_element(By.CSS_SELECTOR, "input[placeholder^='Search by title']")
+    search.send_keys(title)
+    card = readiness.wait_until(driver, lambda d: card_with(d, title), message=f"{title} not in the catalogue")
+    card.find_element(By.TAG_NAME, "button").click()
+    flow.notes["request_toast"] = wait_for_toast(driver)
+
+def member_see_approval(flow, driver, fixtures, options):
+    title = flow.fixtures["book"]["title"]
+    poll(driver, "/member/requests", lambda d: any("Approved" in row.text for row in rows_with(d, title)))
+
+def librarian_approve(flow, driver, fixtures, options):
+    title = flow.fixtures["book"]["title"]
+    flow.wait_for("requested")
+    row = poll(driver, "/librarian/requests", lambda d: next(iter(rows_with(d, title)), None))
+    flow.mark("request_seen")
+    row.find_element(By.XPATH, ".//button[contains(., 'Approve')]").click()
+    flow.notes["approve_toast"] = wait_for_toast(driver)
+
+def librarian_age_loan(flow, driver, fixtures, options):
+    # Fast-forward: the loan becomes overdue without waiting two weeks
+    flow.notes["loan_id"] = fixtures.make_overdue(
+        flow.fixtures["member"]["id"], flow.fixtures["book"]["id"], options.overdue_days
+    )
+
+def librarian_return(flow, driver, fixtures, options):
+    title = flow.fixtures["book"]["title"]
+    page_timing.navigate(driver, "/librarian/return")
+    search = driver.find_element(By.CSS_SELECTOR, "input[placeholder^='Enter member ID']")
+    search.send_keys(title, Keys.ENTER)
+    card = readiness.wait_until(driver, lambda d: card_with(d, title), message=f"no active loan of {title}")
+    card.find_element(By.XPATH, ".//button[contains(., 'Return Book')]").click()
+    flow.notes["return_toast"] = wait_for_toast(driver)
+
+def member_pay_fine(flow, driver, fixtures, options):
+    title = flow.fixtures["book"]["title"]
+    flow.wait_for("returned")
+    pay = poll(driver, "/member/fines", lambda d: next(iter(
+        button for row in rows_with(d, title)
+        for button in row.find_elements(By.XPATH, ".//button[contains(., 'Pay Fine')]")
+    ), None))
+    flow.mark("fine_seen")
+    pay.click()
+    wait_for_toast(driver)
+    # The page reloads the fines; the paid one moves to the payment history
+    readiness.wait_until(
+        driver,
+        lambda d: not any(row.find_elements(By.XPATH, ".//button[contains(., 'Pay Fine')]") for row in rows_with(d, title)),
+        message=f"fine for {title} still unpaid",
+    )
+
+def verify_borrow_return_fine(flow, fixtures, options):
+    loan = fixtures.loan_and_fine(flow.fixtures["member"]["id"], flow.fixtures["book"]["id"])
+    if loan is None:
+        return ["no loan was created"]
+    status, returned, amount, paid = loan
+    expected = options.overdue_days * FINE_PER_DAY
+    problems = []
+    if not returned:
+        problems.append(f"loan is still out ({status})")
+    if amount != expected:
+        problems.append(f"fine is {amount}, expected {expected} for {options.overdue_days} days overdue")
+    if not paid:
+        problems.append("fine is not paid")
+    return problems
+
+SCENARIOS = {
+    "borrow_return_fine": {
+        # Each role runs its steps in order; a step is (mark it sets when done, function)
+        "roles": {
+            "member": [
+                ("requested", member_request_book),
+                ("approval_seen", member_see_approval),
+                ("fine_paid", member_pay_fine),
+            ],
+            "librarian": [
+                ("approved", librarian_approve),
+                ("overdue", librarian_age_loan),
+                ("returned", librarian_return),
+            ],
+        },
+        # Business steps, timed from the first mark to the second
+        "spans": [
+            ("request_seen_by_librarian", "requested", "request_seen"),
+            ("request_to_approval_seen", "requested", "approval_seen"),
+            ("librarian_approval", "request_seen", "approved"),
+            ("return_to_fine_seen", "returned", "fine_seen"),
+            ("fine_payment", "fine_seen", "fine_paid"),
+            ("end_to_end", "requested", "fine_paid"),
+        ],
+        "verify": verify_borrow_return_fine,
+    },
+}
+
+def run_role(flow, role, steps, fixtures, options):
+    """Log one role in on its own browser and run its steps, skipping those a resumed flow already finished"""
+    driver = driver_pool.acquire()
+    current = "login"
+    try:
+        if role == "member":
+            login_member(driver, flow.fixtures["member"])
+        else:
+            session_cache.login_as(driver, role)
+        for mark, step in steps:
+            if mark in flow.marks:
+                continue
+            if flow.error:
+                return
+            current = step.__name__
+            step(flow, driver, fixtures, options)
+            flow.mark(mark)
+    except Exception as e:
+        flow.fail(f"{role} {current}: {e}")
+        run_report.screenshot(driver, os.path.join(os.path.dirname(flow.path), f"error_{flow.scenario}_{flow.index}_{role}.png"))
+    finally:
+        driver_pool.release(driver)
+
+def run_flow(flow, executor, fixtures, options):
+    """Create the flow's fixtures unless it is resuming, then run every role at once"""
+    scenario = SCENARIOS[flow.scenario]
+    if flow.fixtures is None:
+        tag = f"{page_timing.run_id()}-{flow.index}".lower()
+        flow.fixtures = {"member": fixtures.create_member(tag), "book": fixtures.create_book(tag)}
+        flow.save()
+    futures = [
+        executor.submit(run_role, flow, role, steps, fixtures, options)
+        for role, steps in scenario["roles"].items()
+    ]
+    for future in futures:
+        future.result()
+
+    if not flow.error:
+        problems = scenario["verify"](flow, fixtures, options)
+        if problems:
+            flow.fail("; ".join(problems))
+    flow.save()
+    return flow
+
+def spans(flow):
+    """ms of each business step the flow completed"""
+    result = {}
+    for name, start, end in SCENARIOS[flow.scenario]["spans"]:
+        if start in flow.marks and end in flow.marks:
+            result[name] = round((flow.marks[end] - flow.marks[start]) * 1000, 1)
+    return result
+
+def complete(flow):
+    steps = [mark for role in SCENARIOS[flow.scenario]["roles"].values() for mark, _ in role]
+    return not flow.error and all(mark in flow.marks for mark in steps)
+
+def write_results(flows, run):
+    summary = {}
+    for flow in flows:
+        for name, ms in spans(flow).items():
+            summary.setdefault(name, []).append(ms)
+    summary = {
+        name: {"flows": len(values), "p50_ms": percentile(sorted(values), 50), "p95_ms": percentile(sorted(values), 95)}
+        for name, values in summary.items()
+    }
+    path = os.path.join(page_timing.RESULTS_DIR, f"scenarios-{run}.json")
+    os.makedirs(page_timing.RESULTS_DIR, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({
+            "run_id": run,
+            "flows": [
+                {
+                    "scenario": flow.scenario,
+                    "index": flow.index,
+                    "status": "passed" if complete(flow) else "failed",
+                    "error": flow.error,
+                    "resumed": flow.resumed,
+                    "spans_ms": spans(flow),
+                    "notes": flow.notes,
+                }
+                for flow in flows
+            ],
+            "summary": summary,
+        }, f, indent=2)
+    return path, summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Run end-to-end business flows across member and librarian browsers")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="borrow_return_fine")
+    parser.add_argument("--flows", type=int, default=2, help="copies of the scenario run at once, each with its own member and book")
+    parser.add_argument("--overdue-days", type=int, default=5, help="how late the book comes back")
+    parser.add_argument("--resume", metavar="RUN_ID", help="continue the unfinished flows of an earlier run")
+    parser.add_argument("--keep", action="store_true", help="leave the fixtures of finished flows in the database")
+    parser.add_argument("--reset-db", action="store_true", help="restore the database from its fixtures.py snapshot first")
+    args = parser.parse_args()
+    if args.reset_db and args.resume:
+        parser.error("--reset-db would delete the fixtures of the flows being resumed")
+
+    if args.resume:
+        os.environ["LMS_RUN_ID"] = args.resume
+    run = page_timing.run_id()
+
+    if args.reset_db:
+        print(f"Database restored from snapshot in {reset_app_database():.0f}ms")
+    conn = db.connect()
+    fixtures = Fixtures(conn)
+    if args.resume:
+        flows = [Flow.load(path) for path in sorted(glob.glob(os.path.join(state_dir(run), "*.json")))]
+        flows = [flow for flow in flows if not complete(flow)]
+        for flow in flows:
+            flow.error = None
+        if not flows:
+            print(f"No unfinished flows in run {run}")
+            return
+    else:
+        flows = [
+            Flow(args.scenario, index, os.path.join(state_dir(run), f"{args.scenario}-{index}.json"))
+            for index in range(args.flows)
+        ]
+
+    roles = max(len(SCENARIOS[flow.scenario]["roles"]) for flow in flows)
+    print(f"\nRunning {len(flows)} {args.scenario if not args.resume else 'resumed'} flow(s), run {run}")
+    try:
+        # One thread per flow plus one per role browser, so every flow's roles run at the same time
+        with ThreadPoolExecutor(max_workers=len(flows) * (roles + 1)) as executor:
+            futures = [executor.submit(run_flow, flow, executor, fixtures, args) for flow in flows]
+            for future in futures:
+                future.result()
+
+        path, summary = write_results(flows, run)
+        if not args.keep:
+            for flow in flows:
+                if complete(flow):
+                    fixtures.delete(flow.fixtures)
+    finally:
+        driver_pool.shutdown()
+        conn.close()
+
+    print(f"\n  {'Step':<28}{'Flows':>7}{'p50':>10}{'p95':>10}")
+    for name, stats in summary.items():
+        print(f"  {name:<28}{stats['flows']:>7}{stats['p50_ms']:>8.0f}ms{stats['p95_ms']:>8.0f}ms")
+    print(f"\nResults written to {path}")
+
+    failed = [flow for flow in flows if not complete(flow)]
+    for flow in failed:
+        print(f"  {flow.scenario} #{flow.index}: {flow.error}")
+    if failed:
+        print(f"\n❌ {len(failed)} of {len(flows)} flows failed; rerun with --resume {run} to continue them")
+        sys.exit(1)
+    print(f"\n✅ {len(flows)} flows completed")
+
+if __name__ == "__main__":
+    main()
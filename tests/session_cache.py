@@ -0,0 +1,117 @@
+"""
+Authenticated Session Cache
+Logs in once per role and injects the saved Supabase auth cookies and localStorage into later drivers
+"""
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+import json
+import os
+import tempfile
+import time
+
+import page_timing
+import run_report
+from accounts import CREDENTIALS
+
+BASE_URL = "http://localhost:3000"
+
+# Keep this below the Supabase access token lifetime (1 hour) so the middleware
+# never has to refresh a cached token. Refresh tokens rotate on use, and replaying
+# a rotated one in another browser gets the session revoked.
+CACHE_TTL = int(os.environ.get("LMS_SESSION_TTL", "1800"))
+CACHE_DIR = os.environ.get("LMS_SESSION_CACHE_DIR", os.path.join(tempfile.gettempdir(), "lms-session-cache"))
+
+_sessions = {}
+
+def login_with_form(driver, email, password):
+    """Log in through the real /login form"""
+    driver.get(f"{BASE_URL}/login")
+    driver.find_element(By.ID, "email").send_keys(email)
+    driver.find_element(By.ID, "password").send_keys(password)
+    driver.find_element(By.CSS_SELECTOR, "button[type='submit']").click()
+
+def capture_session(driver):
+    """Snapshot the auth cookies and localStorage of the current page"""
+    return {
+        "saved_at": time.time(),
+        "cookies": driver.get_cookies(),
+        "local_storage": driver.execute_script(
+            "return Object.fromEntries(Object.entries(window.localStorage));"
+        ),
+    }
+
+def inject_session(driver, session):
+    """Load a snapshot into the driver; it must be on the app origin to set cookies"""
+    driver.get(f"{BASE_URL}/favicon.ico")
+    for cookie in session["cookies"]:
+        cookie = {key: value for key, value in cookie.items() if key != "domain"}
+        driver.add_cookie(cookie)
+    driver.execute_script(
+        "for (const [key, value] of Object.entries(arguments[0])) window.localStorage.setItem(key, value);",
+        session["local_storage"],
+    )
+
+def _cache_path(role):
+    return os.path.join(CACHE_DIR, f"{role}.json")
+
+def load_session(role):
+    """Return a cached snapshot for the role, or None if missing or expired"""
+    session = _sessions.get(role)
+    if session is None:
+        try:
+            with open(_cache_path(role)) as f:
+                session = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    if time.time() - session["saved_at"] > CACHE_TTL:
+        invalidate(role)
+        return None
+
+    _sessions[role] = session
+    return session
+
+def save_session(role, session):
+    """Keep a snapshot in memory and on disk so worker processes can share it"""
+    _sessions[role] = session
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{_cache_path(role)}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(session, f)
+    os.replace(tmp_path, _cache_path(role))
+
+def invalidate(role):
+    """Forget the cached snapshot for a role"""
+    _sessions.pop(role, None)
+    try:
+        os.remove(_cache_path(role))
+    except OSError:
+        pass
+
+def login_as(driver, role, path=None):
+    """Open path (default: the role dashboard) as a logged-in user of the given role,
+    recording its page timings"""
+    path = path or f"/{role}"
+    session = load_session(role)
+
+    if session is not None:
+        start = time.perf_counter()
+        inject_session(driver, session)
+        run_report.record_step("login", (time.perf_counter() - start) * 1000, role, cached=True)
+        if page_timing.navigate(driver, path) is not None:
+            return
+        # The middleware redirected us (to /login), so the token was rejected
+        invalidate(role)
+
+    start = time.perf_counter()
+    email, password = CREDENTIALS[role]
+    login_with_form(driver, email, password)
+    WebDriverWait(driver, 15).until(EC.url_contains(f"/{role}"))
+    save_session(role, capture_session(driver))
+    run_report.record_step("login", (time.perf_counter() - start) * 1000, role, cached=False)
+
+    # Load the target with a real navigation so its timings are recorded too
+    if page_timing.navigate(driver, path) is None:
+        raise AssertionError(f"Logged in as {role} but {path} redirected to {driver.current_url}")
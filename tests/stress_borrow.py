@@ -0,0 +1,184 @@
+"""
+Borrow Contention Stress Test
+Fires hundreds of concurrent issue and approve calls at one popular book and checks it is never issued past total_copies
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import random
+import sys
+import threading
+import time
+
+import db
+import lms_actions
+from accounts import CREDENTIALS
+from latency_stats import percentile
+from supabase_rest import SupabaseClient, SupabaseError
+
+BENCH_BOOK_ISBN = "BENCH-BORROW-1"
+BENCH_EMAIL_DOMAIN = "bench-borrow.lms"
+BENCH_USER_PREFIX = "bb000000-0000-4000-8000-"
+
+def member_id(index):
+    return f"{BENCH_USER_PREFIX}{index:012d}"
+
+def cleanup(conn):
+    with conn.cursor() as cur:
+        # Deleting the users cascades to their profiles, requests, transactions and fines
+        cur.execute("DELETE FROM auth.users WHERE email LIKE %s", (f"%@{BENCH_EMAIL_DOMAIN}",))
+        cur.execute("DELETE FROM books WHERE isbn = %s", (BENCH_BOOK_ISBN,))
+    conn.commit()
+
+def seed(conn, members, copies, request_share, rng):
+    """One book with `copies` copies and `members` members who all want it. Returns (book id, operations)."""
+    cleanup(conn)
+    with conn.cursor() as cur:
+        # The on_auth_user_created trigger creates the profiles
+        cur.execute(
+            "INSERT INTO auth.users (instance_id, id, aud, role, email, raw_user_meta_data, created_at, updated_at) "
+            "SELECT '00000000-0000-0000-0000-000000000000', (%s::TEXT || lpad(n::TEXT, 12, '0'))::UUID, "
+            "'authenticated', 'authenticated', 'member' || n || '@' || %s, "
+            "jsonb_build_object('full_name', 'Borrow Bench ' || n, 'role', 'member'), NOW(), NOW() "
+            "FROM generate_series(0, %s - 1) AS n",
+            (BENCH_USER_PREFIX, BENCH_EMAIL_DOMAIN, members),
+        )
+        cur.execute(
+            "INSERT INTO books (isbn, title, author, genre, total_copies, available_copies) "
+            "VALUES (%s, 'Contended Bestseller', 'Bench Author', 'Other', %s, %s) RETURNING id",
+            (BENCH_BOOK_ISBN, copies, copies),
+        )
+        book_id = cur.fetchone()[0]
+
+        requesters = sorted(rng.sample(range(members), int(members * request_share)))
+        cur.execute(
+            "INSERT INTO borrow_requests (book_id, user_id, requested_due_date, status) "
+            "SELECT %s, (%s::TEXT || lpad(n::TEXT, 12, '0'))::UUID, NOW() + INTERVAL '14 days', 'pending' "
+            "FROM unnest(%s::INTEGER[]) AS n RETURNING id",
+            (book_id, BENCH_USER_PREFIX, requesters),
+        )
+        request_ids = [str(row[0]) for row in cur.fetchall()]
+    conn.commit()
+
+    # Members with a pending request get approved; everyone else is issued the book at the desk
+    requester_set = set(requesters)
+    operations = [("approve", request_id) for request_id in request_ids]
+    operations += [("issue", member_id(n)) for n in range(members) if n not in requester_set]
+    rng.shuffle(operations)
+    return str(book_id), operations
+
+def verify(conn, book_id, issued_ok):
+    """The book's counters must match its open loans, and every reported success must be exactly one loan"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT total_copies, available_copies FROM books WHERE id = %s", (book_id,))
+        total, available = cur.fetchone()
+        cur.execute(
+            "SELECT COUNT(*) FROM transactions WHERE book_id = %s AND return_date IS NULL", (book_id,)
+        )
+        open_loans = cur.fetchone()[0]
+        cur.execute(
+            "SELECT COUNT(*) FROM borrow_requests r "
+            "WHERE r.book_id = %s AND r.status = 'approved' AND NOT EXISTS ("
+            "  SELECT 1 FROM transactions t WHERE t.book_id = r.book_id AND t.user_id = r.user_id)",
+            (book_id,),
+        )
+        approved_without_loan = cur.fetchone()[0]
+
+    problems = []
+    if open_loans > total:
+        problems.append(f"{open_loans} copies issued, only {total} exist")
+    if available != total - open_loans:
+        problems.append(f"available_copies is {available}, {total} copies minus {open_loans} loans is {total - open_loans}")
+    if issued_ok != open_loans:
+        problems.append(f"{issued_ok} calls reported success, {open_loans} loans exist")
+    if approved_without_loan:
+        problems.append(f"{approved_without_loan} requests approved without a loan")
+    return problems, open_loans, available
+
+def run(client, book_id, operations, workers, issue, approve):
+    """Fire every operation at once from `workers` threads. Returns (elapsed seconds, sorted latencies, outcome counts)."""
+    lock = threading.Lock()
+    latencies = []
+    counts = {"ok": 0, "refused": 0, "error": 0}
+    start_gate = threading.Event()
+
+    def call(operation):
+        kind, target = operation
+        start_gate.wait()
+        start = time.perf_counter()
+        try:
+            ok = approve(client, target) if kind == "approve" else issue(client, book_id, target)
+            outcome = "ok" if ok else "refused"
+        except SupabaseError:
+            outcome = "error"
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            counts[outcome] += 1
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(call, operation) for operation in operations]
+        # Release all workers together so the first calls really race for the last copies
+        started = time.perf_counter()
+        start_gate.set()
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - started
+
+    return elapsed, sorted(latencies), counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress concurrent issues and approvals of a single book")
+    parser.add_argument("--members", type=int, default=400, help="members competing for the book, one call each")
+    parser.add_argument("--copies", type=int, default=10)
+    parser.add_argument("--request-share", type=float, default=0.5, help="share of members approved from a borrow request")
+    parser.add_argument("--workers", type=int, default=100, help="concurrent calls in flight")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--loop", action="store_true", help="also run the old read-then-write actions to show them oversell")
+    parser.add_argument("--keep", action="store_true", help="leave the benchmark rows in the database")
+    args = parser.parse_args()
+
+    conn = db.connect()
+    client = SupabaseClient()
+    client.sign_in(*CREDENTIALS["librarian"])
+
+    variants = []
+    if args.loop:
+        variants.append(("read-then-write", lms_actions.issue_book_loop, lms_actions.approve_borrow_request_loop))
+    variants.append(("atomic RPC", lms_actions.issue_book, lms_actions.approve_borrow_request))
+
+    print(f"\n  {args.members} members, {args.copies} copies, {args.workers} concurrent calls")
+    print(f"\n  {'Path':<18}{'Time':>9}{'Calls/s':>10}{'p50':>8}{'p95':>8}{'OK':>6}{'Refused':>9}{'Errors':>8}{'Issued':>8}")
+    atomic_problems = []
+    try:
+        for label, issue, approve in variants:
+            rng = random.Random(args.seed)
+            book_id, operations = seed(conn, args.members, args.copies, args.request_share, rng)
+            elapsed, latencies, counts = run(client, book_id, operations, args.workers, issue, approve)
+            problems, open_loans, _ = verify(conn, book_id, counts["ok"])
+
+            print(
+                f"  {label:<18}{elapsed:>8.2f}s{len(operations) / elapsed:>10.0f}"
+                f"{percentile(latencies, 50):>6.0f}ms{percentile(latencies, 95):>6.0f}ms"
+                f"{counts['ok']:>6}{counts['refused']:>9}{counts['error']:>8}{open_loans:>8}"
+            )
+            for problem in problems:
+                print(f"    {label}: {problem}")
+            if label == "atomic RPC":
+                atomic_problems = problems
+                if counts["error"]:
+                    atomic_problems.append(f"{counts['error']} calls failed with an unexpected error")
+                if open_loans < min(args.copies, len(operations)):
+                    atomic_problems.append(f"only {open_loans} of {args.copies} copies were issued")
+    finally:
+        if not args.keep:
+            cleanup(conn)
+        conn.close()
+
+    if atomic_problems:
+        print("\n❌ Atomic issue path is not contention-safe")
+        sys.exit(1)
+    print(f"\n✅ {args.copies} copies issued exactly once under {args.workers}-way contention")
+
+if __name__ == "__main__":
+    main()
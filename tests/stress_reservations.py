@@ -0,0 +1,250 @@
+"""
+Reservation Queue Stress Test
+Races thousands of concurrent reservations against returns of one book and checks every returned copy goes to the next member in line
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import random
+import sys
+import threading
+import time
+
+import db
+import lms_actions
+from accounts import CREDENTIALS
+from latency_stats import percentile
+from supabase_rest import SupabaseClient, SupabaseError
+
+BENCH_BOOK_ISBN = "BENCH-RESERVE-1"
+BENCH_EMAIL_DOMAIN = "bench-reserve.lms"
+BENCH_USER_PREFIX = "bc000000-0000-4000-8000-"
+
+def member_id(index):
+    return f"{BENCH_USER_PREFIX}{index:012d}"
+
+def cleanup(conn):
+    with conn.cursor() as cur:
+        # Deleting the users cascades to their reservations and loans, the book to its queue
+        cur.execute("DELETE FROM auth.users WHERE email LIKE %s", (f"%@{BENCH_EMAIL_DOMAIN}",))
+        cur.execute("DELETE FROM books WHERE isbn = %s", (BENCH_BOOK_ISBN,))
+    conn.commit()
+
+def seed(conn, members, copies):
+    """One book whose `copies` copies are all on loan, and `members` members waiting for it. Returns (book id, waiting ids)."""
+    cleanup(conn)
+    with conn.cursor() as cur:
+        # The on_auth_user_created trigger creates the profiles; the first `copies` members hold the copies
+        cur.execute(
+            "INSERT INTO auth.users (instance_id, id, aud, role, email, raw_user_meta_data, created_at, updated_at) "
+            "SELECT '00000000-0000-0000-0000-000000000000', (%s::TEXT || lpad(n::TEXT, 12, '0'))::UUID, "
+            "'authenticated', 'authenticated', 'member' || n || '@' || %s, "
+            "jsonb_build_object('full_name', 'Reserve Bench ' || n, 'role', 'member'), NOW(), NOW() "
+            "FROM generate_series(0, %s - 1) AS n",
+            (BENCH_USER_PREFIX, BENCH_EMAIL_DOMAIN, copies + members),
+        )
+        cur.execute(
+            "INSERT INTO books (isbn, title, author, genre, total_copies, available_copies) "
+            "VALUES (%s, 'Long Waiting List', 'Bench Author', 'Other', %s, 0) RETURNING id",
+            (BENCH_BOOK_ISBN, copies),
+        )
+        book_id = cur.fetchone()[0]
+        cur.execute(
+            "INSERT INTO transactions (book_id, user_id, due_date, status) "
+            "SELECT %s, (%s::TEXT || lpad(n::TEXT, 12, '0'))::UUID, NOW() + INTERVAL '14 days', 'issued' "
+            "FROM generate_series(0, %s - 1) AS n",
+            (book_id, BENCH_USER_PREFIX, copies),
+        )
+    conn.commit()
+    return str(book_id), [member_id(n) for n in range(copies, copies + members)]
+
+def verify(conn, book_id, reserved_ok):
+    """Tickets, positions and hand-offs must all follow the order members joined the queue"""
+    problems = []
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT queue_ticket, status, queue_position, user_id FROM reservations "
+            "WHERE book_id = %s ORDER BY queue_ticket",
+            (book_id,),
+        )
+        reservations = cur.fetchall()
+        cur.execute(
+            "SELECT queue_ticket FROM reservations "
+            "WHERE book_id = %s AND status = 'fulfilled' ORDER BY fulfilled_date, queue_ticket",
+            (book_id,),
+        )
+        handed_off = [row[0] for row in cur.fetchall()]
+        cur.execute("SELECT length FROM reservation_queues WHERE book_id = %s", (book_id,))
+        row = cur.fetchone()
+        queue_length = row[0] if row else 0
+        cur.execute("SELECT total_copies, available_copies FROM books WHERE id = %s", (book_id,))
+        total, available = cur.fetchone()
+        cur.execute("SELECT COUNT(*) FROM transactions WHERE book_id = %s AND return_date IS NULL", (book_id,))
+        open_loans = cur.fetchone()[0]
+        cur.execute(
+            "SELECT COUNT(*) FROM reservations r "
+            "WHERE r.book_id = %s AND r.status = 'fulfilled' AND NOT EXISTS ("
+            "  SELECT 1 FROM transactions t WHERE t.book_id = r.book_id AND t.user_id = r.user_id "
+            "  AND t.notes = 'Issued from reservation queue')",
+            (book_id,),
+        )
+        fulfilled_without_loan = cur.fetchone()[0]
+
+    tickets = [ticket for ticket, _, _, _ in reservations]
+    if len(reservations) != reserved_ok:
+        problems.append(f"{reserved_ok} reservations reported success, {len(reservations)} exist")
+    if tickets != list(range(1, len(tickets) + 1)):
+        problems.append("queue tickets are not 1..n without gaps or repeats")
+    if any(b <= a for a, b in zip(handed_off, handed_off[1:])):
+        problems.append("copies were not handed off in ticket order")
+    pending = [(ticket, position) for ticket, status, position, _ in reservations if status == "pending"]
+    if handed_off and pending and min(ticket for ticket, _ in pending) < handed_off[-1]:
+        problems.append("a member was skipped: a pending reservation is older than the last hand-off")
+    if [position for _, position in pending] != list(range(1, len(pending) + 1)):
+        problems.append("pending queue positions are not 1..n in ticket order")
+    if queue_length != len(pending):
+        problems.append(f"queue length is {queue_length}, {len(pending)} reservations are pending")
+    if available != total - open_loans:
+        problems.append(f"available_copies is {available}, {total} copies minus {open_loans} loans is {total - open_loans}")
+    if pending and available:
+        problems.append(f"{available} copies on the shelf while {len(pending)} members wait")
+    if fulfilled_without_loan:
+        problems.append(f"{fulfilled_without_loan} reservations fulfilled without a loan")
+    return problems, len(handed_off), len(pending)
+
+def head_uses_index(conn, book_id):
+    """The head of the queue must be one probe of idx_reservations_queue, not a sort of the book's reservations"""
+    with conn.cursor() as cur:
+        # The bench table is small enough that the planner may prefer a scan; the question is whether the index fits
+        cur.execute("SET LOCAL enable_seqscan = off")
+        cur.execute("SET LOCAL enable_bitmapscan = off")
+        cur.execute(
+            "EXPLAIN SELECT id FROM reservations WHERE book_id = %s AND status = 'pending' "
+            "ORDER BY queue_ticket LIMIT 1",
+            (book_id,),
+        )
+        plan = "\n".join(row[0] for row in cur.fetchall())
+    conn.commit()
+    return "idx_reservations_queue" in plan and "Sort" not in plan
+
+def run(client, book_id, waiting, workers, returners, rng):
+    """Reserve for every waiting member while `returners` threads keep returning loans of the book.
+    Returns (elapsed seconds, {op: sorted latencies}, outcome counts)."""
+    lock = threading.Lock()
+    latencies = {"reserve": [], "return": []}
+    counts = {"reserved": 0, "refused": 0, "returned": 0, "error": 0}
+    reserving = threading.Event()
+    reserving.set()
+    start_gate = threading.Event()
+
+    def timed(op, call):
+        start = time.perf_counter()
+        try:
+            result = call()
+        except SupabaseError:
+            result = SupabaseError
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies[op].append(elapsed)
+        return result
+
+    def reserve(user_id):
+        start_gate.wait()
+        result = timed("reserve", lambda: lms_actions.reserve_book(client, book_id, user_id))
+        with lock:
+            counts["error" if result is SupabaseError else "reserved" if result else "refused"] += 1
+
+    def keep_returning():
+        start_gate.wait()
+        while True:
+            queues = client.select("reservation_queues", {"select": "length", "book_id": f"eq.{book_id}"})
+            length = queues[0]["length"] if queues else 0
+            # While members are still joining, leave enough queued that no copy lands back on the shelf
+            if length <= (returners if reserving.is_set() else 0):
+                if not reserving.is_set():
+                    return
+                time.sleep(0.01)
+                continue
+            loans = client.select("transactions", {
+                "select": "id", "book_id": f"eq.{book_id}", "return_date": "is.null", "limit": str(returners * 2),
+            })
+            if not loans:
+                # Every copy is back on the shelf with members still queued; verify() reports it
+                return
+            result = timed("return", lambda: lms_actions.return_book(client, rng.choice(loans)["id"]))
+            with lock:
+                if result is SupabaseError:
+                    counts["error"] += 1
+                elif result:
+                    counts["returned"] += 1
+
+    with ThreadPoolExecutor(max_workers=workers + returners) as executor:
+        return_futures = [executor.submit(keep_returning) for _ in range(returners)]
+        reserve_futures = [executor.submit(reserve, user_id) for user_id in waiting]
+        started = time.perf_counter()
+        start_gate.set()
+        for future in reserve_futures:
+            future.result()
+        reserving.clear()
+        for future in return_futures:
+            future.result()
+        elapsed = time.perf_counter() - started
+
+    return elapsed, {op: sorted(values) for op, values in latencies.items()}, counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress concurrent reservations and returns of a single book")
+    parser.add_argument("--members", type=int, default=1000, help="members reserving the book, one call each")
+    parser.add_argument("--copies", type=int, default=5, help="copies of the book, all on loan at the start")
+    parser.add_argument("--workers", type=int, default=100, help="concurrent reservation calls in flight")
+    parser.add_argument("--returners", type=int, default=5, help="threads returning loans of the book")
+    parser.add_argument("--max-p95-ms", type=float, default=500, help="fail if either operation's p95 is slower")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep", action="store_true", help="leave the benchmark rows in the database")
+    args = parser.parse_args()
+
+    conn = db.connect()
+    client = SupabaseClient()
+    client.sign_in(*CREDENTIALS["librarian"])
+
+    problems = []
+    try:
+        book_id, waiting = seed(conn, args.members, args.copies)
+        print(f"\n  {args.members} members, {args.copies} copies, {args.workers} concurrent reservations, {args.returners} returners")
+        elapsed, latencies, counts = run(client, book_id, waiting, args.workers, args.returners, random.Random(args.seed))
+        problems, handed_off, pending = verify(conn, book_id, counts["reserved"])
+
+        print(f"\n  {'Operation':<12}{'Calls':>8}{'p50':>8}{'p95':>8}{'Max':>8}")
+        for op, values in latencies.items():
+            if values:
+                print(
+                    f"  {op:<12}{len(values):>8}{percentile(values, 50):>6.0f}ms"
+                    f"{percentile(values, 95):>6.0f}ms{values[-1]:>6.0f}ms"
+                )
+                if percentile(values, 95) > args.max_p95_ms:
+                    problems.append(f"{op} p95 {percentile(values, 95):.0f}ms is over {args.max_p95_ms:.0f}ms")
+        print(
+            f"\n  {elapsed:.2f}s: {counts['reserved']} reserved, {counts['refused']} refused, "
+            f"{counts['returned']} returned, {handed_off} handed off, {pending} still waiting"
+        )
+
+        if counts["error"]:
+            problems.append(f"{counts['error']} calls failed with an unexpected error")
+        if counts["refused"]:
+            problems.append(f"{counts['refused']} reservations refused although no copy was on the shelf")
+        if not head_uses_index(conn, book_id):
+            problems.append("the head of the queue is not read from idx_reservations_queue")
+    finally:
+        if not args.keep:
+            cleanup(conn)
+        conn.close()
+
+    for problem in problems:
+        print(f"  {problem}")
+    if problems:
+        print("\n❌ Reservation queue is not FIFO-safe under contention")
+        sys.exit(1)
+    print(f"\n✅ {args.members} reservations queued and handed off in order")
+
+if __name__ == "__main__":
+    main()
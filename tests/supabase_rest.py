@@ -0,0 +1,155 @@
+"""
+Minimal Supabase REST Client
+Talks to PostgREST and GoTrue with the standard library so load and stress tools need no extra packages
+"""
+
+from urllib.parse import urlencode, urlparse, quote
+import base64
+import http.client
+import json
+import os
+import threading
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SSR_COOKIE_CHUNK_SIZE = 3180
+
+def load_env_file(path=os.path.join(ROOT_DIR, ".env.local")):
+    """Read KEY=VALUE pairs from the app's .env.local, if present"""
+    values = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#") and "=" in line:
+                    key, value = line.split("=", 1)
+                    values[key.strip()] = value.strip().strip('"').strip("'")
+    except OSError:
+        pass
+    return values
+
+def supabase_settings():
+    """Supabase URL and anon key from the environment, falling back to .env.local"""
+    env_file = load_env_file()
+    url = (
+        os.environ.get("SUPABASE_URL")
+        or os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
+        or env_file.get("NEXT_PUBLIC_SUPABASE_URL")
+    )
+    anon_key = (
+        os.environ.get("SUPABASE_ANON_KEY")
+        or os.environ.get("NEXT_PUBLIC_SUPABASE_ANON_KEY")
+        or env_file.get("NEXT_PUBLIC_SUPABASE_ANON_KEY")
+    )
+    if not url or not anon_key:
+        raise RuntimeError("Set SUPABASE_URL and SUPABASE_ANON_KEY (or NEXT_PUBLIC_* in .env.local)")
+    return url.rstrip("/"), anon_key
+
+class SupabaseError(Exception):
+    def __init__(self, status, body):
+        super().__init__(f"HTTP {status}: {body}")
+        self.status = status
+        self.body = body
+
+class SupabaseClient:
+    """One authenticated Supabase user. Keeps a keep-alive connection per thread."""
+
+    def __init__(self, url=None, anon_key=None, access_token=None):
+        default_url, default_key = supabase_settings() if not (url and anon_key) else (url, anon_key)
+        self.url = (url or default_url).rstrip("/")
+        self.anon_key = anon_key or default_key
+        self.access_token = access_token
+        self.session = None
+        self.user_id = None
+        self._parsed = urlparse(self.url)
+        self._local = threading.local()
+
+    # Connection handling
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn_class = http.client.HTTPSConnection if self._parsed.scheme == "https" else http.client.HTTPConnection
+            conn = conn_class(self._parsed.hostname, self._parsed.port, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def request(self, method, path, params=None, body=None, headers=None):
+        """Send a request and return (status, decoded JSON body or None)"""
+        query = f"?{urlencode(params)}" if params else ""
+        all_headers = {
+            "apikey": self.anon_key,
+            "Authorization": f"Bearer {self.access_token or self.anon_key}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        all_headers.update(headers or {})
+        payload = json.dumps(body) if body is not None else None
+
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, f"{self._parsed.path}{path}{query}", body=payload, headers=all_headers)
+                response = conn.getresponse()
+                raw = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError, OSError):
+                # Server closed the keep-alive connection; reconnect once
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+
+        data = json.loads(raw) if raw else None
+        if response.status >= 400:
+            raise SupabaseError(response.status, data)
+        return response.status, data
+
+    # Auth
+
+    def sign_in(self, email, password):
+        _, session = self.request(
+            "POST", "/auth/v1/token", {"grant_type": "password"}, {"email": email, "password": password}
+        )
+        self.session = session
+        self.access_token = session["access_token"]
+        self.user_id = session["user"]["id"]
+        return session
+
+    def get_user(self):
+        _, user = self.request("GET", "/auth/v1/user")
+        return user
+
+    def ssr_cookies(self):
+        """Session cookies in the format @supabase/ssr reads, so plain HTTP requests reach protected pages"""
+        project_ref = (self._parsed.hostname or "").split(".")[0]
+        name = f"sb-{project_ref}-auth-token"
+        encoded = base64.urlsafe_b64encode(json.dumps(self.session).encode()).decode().rstrip("=")
+        value = quote(f"base64-{encoded}", safe="")
+        if len(value) <= SSR_COOKIE_CHUNK_SIZE:
+            return {name: value}
+        chunks = [value[i:i + SSR_COOKIE_CHUNK_SIZE] for i in range(0, len(value), SSR_COOKIE_CHUNK_SIZE)]
+        return {f"{name}.{index}": chunk for index, chunk in enumerate(chunks)}
+
+    # PostgREST
+
+    def select(self, table, params=None, count=None):
+        """GET rows. count='exact' or 'estimated' makes PostgREST compute the total like the app's actions do."""
+        headers = {"Prefer": f"count={count}"} if count else None
+        _, data = self.request("GET", f"/rest/v1/{table}", params, headers=headers)
+        return data
+
+    def insert(self, table, rows, returning=True):
+        prefer = "return=representation" if returning else "return=minimal"
+        _, data = self.request("POST", f"/rest/v1/{table}", body=rows, headers={"Prefer": prefer})
+        return data
+
+    def update(self, table, params, values, returning=False):
+        prefer = "return=representation" if returning else "return=minimal"
+        _, data = self.request("PATCH", f"/rest/v1/{table}", params, values, headers={"Prefer": prefer})
+        return data
+
+    def rpc(self, function, args=None, params=None, count=None):
+        """POST to a database function. params filter, order and page set-returning functions like select."""
+        headers = {"Prefer": f"count={count}"} if count else None
+        _, data = self.request("POST", f"/rest/v1/rpc/{function}", params, args or {}, headers=headers)
+        return data
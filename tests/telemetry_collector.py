@@ -0,0 +1,192 @@
+"""
+Server Action Telemetry Collector
+Receives the Supabase request spans the app sends when LMS_TELEMETRY_URL is set and aggregates them into per-action histograms
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import os
+import threading
+
+import page_timing
+from latency_stats import percentile
+
+PORT = int(os.environ.get("LMS_TELEMETRY_PORT", "4319"))
+# Upper bounds of the histogram buckets in ms; the last bucket holds everything slower
+BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+# Requests listed under each action in the printed summary
+TOP_REQUESTS = 3
+
+def telemetry_path(run=None, ext="jsonl"):
+    return os.path.join(page_timing.RESULTS_DIR, f"telemetry-{run or page_timing.run_id()}.{ext}")
+
+class Collector:
+    """HTTP endpoint that appends every span it receives to telemetry-<run>.jsonl"""
+
+    def __init__(self, port=PORT, run=None):
+        self.path = telemetry_path(run)
+        self.url = f"http://localhost:{port}/v1/spans"
+        self.received = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        collector = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                try:
+                    body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                    spans = json.loads(body)["spans"]
+                except (ValueError, KeyError, TypeError):
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+                collector.add(spans)
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                # One line per batch would drown the test output
+                pass
+
+        self.server = ThreadingHTTPServer(("localhost", port), Handler)
+
+    def add(self, spans):
+        os.makedirs(page_timing.RESULTS_DIR, exist_ok=True)
+        with self._lock, open(self.path, "a") as f:
+            for span in spans:
+                f.write(json.dumps(span) + "\n")
+            self.received += len(spans)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def load_spans(run=None):
+    try:
+        with open(telemetry_path(run)) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+def invocations(spans):
+    """One entry per action call: its request count, time spent in requests and time from createClient to the last response"""
+    grouped = {}
+    for span in spans:
+        grouped.setdefault(span["invocation"], []).append(span)
+
+    calls = []
+    for requests in grouped.values():
+        first = requests[0]
+        calls.append({
+            "action": first["action"],
+            "queries": len(requests),
+            "db_ms": sum(span["duration_ms"] for span in requests),
+            "wall_ms": max(span["start"] + span["duration_ms"] for span in requests) - first["action_start"],
+        })
+    return calls
+
+def histogram(values):
+    """Count of values per bucket, keyed by upper bound like an OTLP explicit-bucket histogram"""
+    counts = {f"le_{bound}": 0 for bound in BUCKETS_MS}
+    counts["inf"] = 0
+    for value in values:
+        bucket = next((f"le_{bound}" for bound in BUCKETS_MS if value <= bound), "inf")
+        counts[bucket] += 1
+    return counts
+
+def distribution(values):
+    values = sorted(values)
+    return {
+        "p50": round(percentile(values, 50), 1),
+        "p95": round(percentile(values, 95), 1),
+        "max": round(values[-1], 1),
+    }
+
+def summarize(spans):
+    """Per action: call count, query count, DB and wall time distributions, and the requests it makes"""
+    calls_by_action = {}
+    for call in invocations(spans):
+        calls_by_action.setdefault(call["action"], []).append(call)
+    requests_by_action = {}
+    for span in spans:
+        requests_by_action.setdefault(span["action"], {}).setdefault(span["name"], []).append(span)
+
+    summary = {}
+    for action, calls in calls_by_action.items():
+        requests = {}
+        for name, request_spans in requests_by_action[action].items():
+            requests[name] = {
+                "count": len(request_spans),
+                "errors": sum(1 for span in request_spans if not 200 <= span["status"] < 400),
+                "ms": distribution([span["duration_ms"] for span in request_spans]),
+            }
+        summary[action] = {
+            "calls": len(calls),
+            "queries": distribution([call["queries"] for call in calls]),
+            "db_ms": distribution([call["db_ms"] for call in calls]),
+            "wall_ms": distribution([call["wall_ms"] for call in calls]),
+            "histogram_db_ms": histogram([call["db_ms"] for call in calls]),
+            "requests": dict(sorted(requests.items(), key=lambda item: -item[1]["ms"]["p95"])),
+        }
+    # Slowest first, so the top of the report is where to look
+    return dict(sorted(summary.items(), key=lambda item: -item[1]["db_ms"]["p95"]))
+
+def print_summary(summary):
+    print("\nServer actions (ms per call):")
+    print(f"  {'Action':<44}{'Calls':>7}{'Queries':>9}{'DB p50':>9}{'DB p95':>9}{'Wall p95':>10}")
+    for action, stats in summary.items():
+        print(
+            f"  {action:<44}{stats['calls']:>7}{stats['queries']['p50']:>9.0f}"
+            f"{stats['db_ms']['p50']:>9.0f}{stats['db_ms']['p95']:>9.0f}{stats['wall_ms']['p95']:>10.0f}"
+        )
+        for name, request in list(stats["requests"].items())[:TOP_REQUESTS]:
+            errors = f", {request['errors']} errors" if request["errors"] else ""
+            print(f"      {name:<40}{request['count']:>7}x  p95 {request['ms']['p95']:.0f}ms{errors}")
+
+def report(run=None):
+    """Print the summary of a run's spans and write telemetry-<run>.json. Returns its path, or None without spans."""
+    spans = load_spans(run)
+    if not spans:
+        return None
+    summary = summarize(spans)
+    print_summary(summary)
+    path = telemetry_path(run, "json")
+    with open(path, "w") as f:
+        json.dump({"run_id": run or page_timing.run_id(), "buckets_ms": BUCKETS_MS, "actions": summary}, f, indent=2)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect and summarize server-action request timings")
+    commands = parser.add_subparsers(dest="command")
+    serve_parser = commands.add_parser("serve", help="receive spans until interrupted (the default)")
+    serve_parser.add_argument("--port", type=int, default=PORT)
+    report_parser = commands.add_parser("report", help="summarize the spans of an earlier run")
+    report_parser.add_argument("run", help="run id")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        path = report(args.run)
+        print(f"\nSummary written to {path}" if path else f"No spans recorded for run {args.run}")
+        return
+
+    collector = Collector(getattr(args, "port", PORT)).start()
+    print(f"Start the app with LMS_TELEMETRY_URL={collector.url}")
+    print(f"Writing spans to {collector.path}; Ctrl+C to stop and summarize")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        collector.stop()
+
+    path = report()
+    print(f"\nSummary written to {path}" if path else "\nNo spans received")
+
+if __name__ == "__main__":
+    main()
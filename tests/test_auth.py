@@ -3,35 +3,26 @@ Simple Authentication Tests
 Tests login and registration functionality
 """
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import time
-import os
 
-BASE_URL = "http://localhost:3000"
-CHROME_BINARY = "/home/srihasrc/Music/lms/chrome-linux64/chrome"
-CHROMEDRIVER_PATH = "/home/srihasrc/Music/lms/tests/drivers/chromedriver"
+import driver_pool
+import page_timing
+import readiness
+import run_report
 
-def get_driver():
-    """Create and return a Chrome driver instance"""
-    chrome_options = Options()
-    chrome_options.binary_location = CHROME_BINARY
-    service = Service(CHROMEDRIVER_PATH)
-    return webdriver.Chrome(service=service, options=chrome_options)
+BASE_URL = "http://localhost:3000"
 
 def test_login_admin():
     """Test admin login"""
-    driver = get_driver()
+    driver = driver_pool.acquire()
     wait = WebDriverWait(driver, 15)
     
     try:
         print("Testing admin login...")
         
-        driver.get(f"{BASE_URL}/login")
+        page_timing.navigate(driver, "/login")
         
         driver.find_element(By.ID, "email").send_keys("admin@lms.com")
         driver.find_element(By.ID, "password").send_keys("admin123")
@@ -45,20 +36,19 @@ def test_login_admin():
         
     except Exception as e:
         print(f"❌ Admin login failed: {e}")
-        driver.save_screenshot("error_admin_login.png")
-        print(f"  Screenshot saved to error_admin_login.png")
+        run_report.screenshot(driver, "error_admin_login.png")
     finally:
-        driver.quit()
+        driver_pool.release(driver)
 
 def test_login_librarian():
     """Test librarian login"""
-    driver = get_driver()
+    driver = driver_pool.acquire()
     wait = WebDriverWait(driver, 15)
     
     try:
         print("Testing librarian login...")
         
-        driver.get(f"{BASE_URL}/login")
+        page_timing.navigate(driver, "/login")
         
         driver.find_element(By.ID, "email").send_keys("librarian@lms.com")
         driver.find_element(By.ID, "password").send_keys("lib123")
@@ -72,20 +62,19 @@ def test_login_librarian():
         
     except Exception as e:
         print(f"❌ Librarian login failed: {e}")
-        driver.save_screenshot("error_librarian_login.png")
-        print(f"  Screenshot saved to error_librarian_login.png")
+        run_report.screenshot(driver, "error_librarian_login.png")
     finally:
-        driver.quit()
+        driver_pool.release(driver)
 
 def test_login_member():
     """Test member login"""
-    driver = get_driver()
+    driver = driver_pool.acquire()
     wait = WebDriverWait(driver, 15)
     
     try:
         print("Testing member login...")
         
-        driver.get(f"{BASE_URL}/login")
+        page_timing.navigate(driver, "/login")
         
         driver.find_element(By.ID, "email").send_keys("m1@lms.com")
         driver.find_element(By.ID, "password").send_keys("mem1123")
@@ -99,25 +88,25 @@ def test_login_member():
         
     except Exception as e:
         print(f"❌ Member login failed: {e}")
-        driver.save_screenshot("error_member_login.png")
-        print(f"  Screenshot saved to error_member_login.png")
+        run_report.screenshot(driver, "error_member_login.png")
     finally:
-        driver.quit()
+        driver_pool.release(driver)
 
 def test_login_invalid():
     """Test login with invalid credentials"""
-    driver = get_driver()
+    driver = driver_pool.acquire()
     
     try:
         print("Testing invalid login...")
         
-        driver.get(f"{BASE_URL}/login")
+        page_timing.navigate(driver, "/login")
         
         driver.find_element(By.ID, "email").send_keys("invalid@test.com")
         driver.find_element(By.ID, "password").send_keys("wrongpassword")
         driver.find_element(By.CSS_SELECTOR, "button[type='submit']").click()
         
-        time.sleep(2)
+        # Wait for the error toast instead of a fixed sleep
+        readiness.wait_until(driver, readiness.toast_shown())
         
         assert "/login" in driver.current_url
         print("  Still on login page as expected")
@@ -125,10 +114,9 @@ def test_login_invalid():
         
     except Exception as e:
         print(f"❌ Invalid login test failed: {e}")
-        driver.save_screenshot("error_invalid_login.png")
-        print(f"  Screenshot saved to error_invalid_login.png")
+        run_report.screenshot(driver, "error_invalid_login.png")
     finally:
-        driver.quit()
+        driver_pool.release(driver)
 
 if __name__ == "__main__":
     print("\n=== Running Authentication Tests ===\n")
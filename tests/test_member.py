@@ -3,46 +3,60 @@ Simple Member Dashboard Tests
 Tests member features like browsing books and viewing borrowed books
 """
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+import random
+import re
 import time
 import os
 
+import db
+import driver_pool
+import lms_actions
+import page_timing
+import perf_budget
+import readiness
+import run_report
+import session_cache
+from accounts import CREDENTIALS
+from latency_stats import percentile
+from supabase_rest import SupabaseClient
+
 BASE_URL = "http://localhost:3000"
-CHROME_BINARY = "/home/srihasrc/Music/lms/chrome-linux64/chrome"
-CHROMEDRIVER_PATH = "/home/srihasrc/Music/lms/tests/drivers/chromedriver"
-
-def get_driver():
-    """Create and return a Chrome driver instance"""
-    chrome_options = Options()
-    chrome_options.binary_location = CHROME_BINARY
-    service = Service(CHROMEDRIVER_PATH)
-    return webdriver.Chrome(service=service, options=chrome_options)
-
-def login_as_member(driver):
-    """Helper function to login as member"""
-    wait = WebDriverWait(driver, 15)
-    driver.get(f"{BASE_URL}/login")
-    driver.find_element(By.ID, "email").send_keys("m1@lms.com")
-    driver.find_element(By.ID, "password").send_keys("mem1123")
-    driver.find_element(By.CSS_SELECTOR, "button[type='submit']").click()
-    wait.until(EC.url_contains("/member"))
+
+# Catalogue search: queries per run (built from real books) and the p95 budget per search action
+SEARCH_QUERIES = int(os.environ.get("LMS_SEARCH_QUERIES", "200"))
+SEARCH_P95_MS = float(os.environ.get("LMS_SEARCH_P95_MS", "300"))
+SEARCH_SEED = int(os.environ.get("LMS_SEARCH_SEED", "1"))
+SEARCH_COLUMNS = ("title", "author", "isbn", "genre")
+
+# Long history: the member is given this many returned loans (and a tenth as many reviewed requests)
+# when LMS_DATABASE_URL is set, then each member page is loaded and held to its perf_budgets.json budget
+HISTORY_LOANS = int(os.environ.get("LMS_MEMBER_HISTORY_LOANS", "5000"))
+HISTORY_SAMPLES = int(os.environ.get("LMS_MEMBER_PAGE_SAMPLES", "3"))
+HISTORY_ISBN_PREFIX = "BENCH-HISTORY-"
+HISTORY_BOOKS = 500
+# /member renders on the server; the other pages fetch their rows after the first paint
+HISTORY_ROUTES = {
+    "/member": "ttfb_ms",
+    "/member/my-books": "ready_ms",
+    "/member/history": "ready_ms",
+    "/member/requests": "ready_ms",
+}
+
+def login_as_member(driver, path=None):
+    """Helper function to open a page as a logged-in member"""
+    session_cache.login_as(driver, "member", path)
 
 def test_member_dashboard():
     """Test member dashboard loads"""
-    driver = get_driver()
-    wait = WebDriverWait(driver, 15)
+    driver = driver_pool.acquire()
     
     try:
         print("Testing member dashboard...")
         login_as_member(driver)
         
         # Wait for dashboard to load
-        wait.until(EC.presence_of_element_located((By.TAG_NAME, "h1")))
+        readiness.wait_for_page(driver)
         
         # Check dashboard title
         title = driver.find_element(By.TAG_NAME, "h1")
@@ -52,25 +66,20 @@ def test_member_dashboard():
         
     except Exception as e:
         print(f"❌ Member dashboard test failed: {e}")
-        driver.save_screenshot("error_member_dashboard.png")
-        print(f"  Screenshot saved to error_member_dashboard.png")
+        run_report.screenshot(driver, "error_member_dashboard.png")
     finally:
-        driver.quit()
+        driver_pool.release(driver)
 
 def test_browse_books():
     """Test browsing books page"""
-    driver = get_driver()
-    wait = WebDriverWait(driver, 15)
+    driver = driver_pool.acquire()
     
     try:
         print("Testing browse books...")
-        login_as_member(driver)
-        
-        # Navigate to books
-        driver.get(f"{BASE_URL}/member/books")
+        login_as_member(driver, "/member/books")
         
         # Wait for page to load
-        wait.until(EC.presence_of_element_located((By.TAG_NAME, "h1")))
+        readiness.wait_for_page(driver)
         
         # Check we're on books page
         assert "/member/books" in driver.current_url
@@ -80,28 +89,23 @@ def test_browse_books():
         
     except Exception as e:
         print(f"❌ Browse books test failed: {e}")
-        driver.save_screenshot("error_browse_books.png")
-        print(f"  Screenshot saved to error_browse_books.png")
+        run_report.screenshot(driver, "error_browse_books.png")
     finally:
-        driver.quit()
+        driver_pool.release(driver)
 
 def test_my_books():
     """Test my books page"""
-    driver = get_driver()
-    wait = WebDriverWait(driver, 15)  # Increased timeout
+    driver = driver_pool.acquire()
     
     try:
         print("Testing my books page...")
-        login_as_member(driver)
+        login_as_member(driver, "/member/my-books")
         
-        # Navigate to my books
-        driver.get(f"{BASE_URL}/member/my-books")
-        
-        # Wait for page to load - wait for h1 or the page content
+        # Wait for page to load - heading rendered and loans fetched
         try:
-            wait.until(EC.presence_of_element_located((By.TAG_NAME, "h1")))
+            readiness.wait_for_page(driver)
         except Exception as e:
-            print(f"  Timeout waiting for h1 element: {e}")
+            print(f"  Timeout waiting for page to load: {e}")
             # Check if page loaded at all
             print(f"  Current URL: {driver.current_url}")
             print(f"  Page title: {driver.title}")
@@ -120,24 +124,93 @@ def test_my_books():
         
     except Exception as e:
         print(f"❌ My books test failed: {e}")
-        driver.save_screenshot("error_my_books.png")
-        print(f"  Screenshot saved to error_my_books.png")
+        run_report.screenshot(driver, "error_my_books.png")
     finally:
-        driver.quit()
+        driver_pool.release(driver)
+
+def sample_books(client, n, rng):
+    """Up to n books, read in ISBN order from a random point in the catalogue"""
+    start = f"97{rng.choice('89')}{rng.randrange(10 ** 10):010d}"
+    params = {"select": "id,title,author,isbn,genre", "order": "isbn.asc", "limit": n}
+    books = client.select("books", {**params, "isbn": f"gte.{start}"})
+    if len(books) < n:
+        books += client.select("books", {**params, "isbn": f"lt.{start}"})
+    return books[:n]
+
+def matches(book, query):
+    return any(query.lower() in book[column].lower() for column in SEARCH_COLUMNS)
+
+def substring_matches_first(query):
+    """Some result contains the query, and no fuzzy-only match is ranked above one that does"""
+    def check(results):
+        flags = [matches(book, query) for book in results]
+        return any(flags) and flags == sorted(flags, reverse=True)
+    return check
+
+def search_cases(books, rng):
+    """(kind, query, check) for each sampled book; check(results) tells whether the answer is correct"""
+    cases = []
+    for book in books:
+        words = [word for word in re.findall(r"[A-Za-z]+", book["title"]) if len(word) >= 4]
+        kind = rng.choice(["title", "prefix", "word", "author", "isbn", "typo"])
+        if kind == "typo" and not any(len(word) >= 6 for word in words):
+            kind = "word"
+        if kind == "word" and not words:
+            kind = "title"
+
+        if kind == "title":
+            query = book["title"]
+            check = lambda results, q=query: bool(results) and results[0]["title"].lower().startswith(q.lower())
+        elif kind == "prefix":
+            query = book["title"][:max(3, len(book["title"]) // 2)].strip()
+            check = lambda results, q=query: bool(results) and results[0]["title"].lower().startswith(q.lower())
+        elif kind == "word":
+            query = rng.choice(words)
+            check = substring_matches_first(query)
+        elif kind == "author":
+            query = book["author"].split()[-1]
+            check = substring_matches_first(query)
+        elif kind == "isbn":
+            query = book["isbn"]
+            check = lambda results, book_id=book["id"]: any(result["id"] == book_id for result in results)
+        else:
+            # Middle letter dropped, e.g. "Mountain" -> "Mountin"; the intended word must still be found
+            word = max(words, key=len)
+            query = word[:len(word) // 2] + word[len(word) // 2 + 1:]
+            check = lambda results, w=word.lower(): any(
+                w in result["title"].lower() or w in result["author"].lower() for result in results
+            )
+        cases.append((kind, query, check))
+    return cases
+
+def run_search_latency(client, cases):
+    """Times searchBooks and getAllBooks(search) for every case. Returns (latencies per action, wrong answers)."""
+    actions = {
+        "searchBooks": lambda query: lms_actions.search_books(client, query),
+        "getAllBooks": lambda query: lms_actions.get_all_books(client, search=query)[0],
+    }
+    latencies = {name: [] for name in actions}
+    wrong = []
+    for kind, query, check in cases:
+        for name, action in actions.items():
+            start = time.perf_counter()
+            results = action(query)
+            latencies[name].append((time.perf_counter() - start) * 1000)
+            if not check(results):
+                wrong.append(f"{name} {kind} {query!r} -> {[book['title'] for book in results[:3]]}")
+    return latencies, wrong
 
 def test_search_books():
     """Test searching for books"""
-    driver = get_driver()
-    wait = WebDriverWait(driver, 15)
+    driver = driver_pool.acquire()
     
     try:
         print("Testing book search...")
-        login_as_member(driver)
+        login_as_member(driver, "/member/books")
         
-        driver.get(f"{BASE_URL}/member/books")
-        
-        # Wait for page to load
-        time.sleep(2)
+        # Wait for the catalogue to load
+        readiness.wait_for_page(driver)
+        before = readiness.result_count(driver)
         
         # Find search input
         try:
@@ -147,30 +220,153 @@ def test_search_books():
         except Exception as e:
             print(f"  Could not find search input: {e}")
         
-        # Wait a bit for search to process
-        time.sleep(2)
+        # Wait for the result count to react to the search
+        readiness.wait_until(driver, readiness.any_of(
+            readiness.result_count_changed(before),
+            readiness.text_present("No books found"),
+        ))
+        print(f"  Results: {before} -> {readiness.result_count(driver)}")
+        
+        # Many real queries against the catalogue behind the page, timed at the API
+        client = SupabaseClient()
+        client.sign_in(*CREDENTIALS["member"])
+        rng = random.Random(SEARCH_SEED)
+        cases = search_cases(sample_books(client, SEARCH_QUERIES, rng), rng)
+        latencies, wrong = run_search_latency(client, cases)
+        
+        slow = []
+        for name, values in latencies.items():
+            values.sort()
+            p50, p95 = percentile(values, 50), percentile(values, 95)
+            print(f"  {name}: {len(values)} queries, p50 {p50:.0f}ms, p95 {p95:.0f}ms")
+            if p95 > SEARCH_P95_MS:
+                slow.append(f"{name} p95 {p95:.0f}ms exceeds {SEARCH_P95_MS:.0f}ms")
+        for answer in wrong[:5]:
+            print(f"  Wrong result: {answer}")
+        assert not slow, "; ".join(slow)
+        assert not wrong, f"{len(wrong)} of {len(cases) * len(latencies)} searches returned wrong results"
         
         print("✅ Book search works")
         
     except Exception as e:
         print(f"❌ Book search test failed: {e}")
-        driver.save_screenshot("error_search_books.png")
-        print(f"  Screenshot saved to error_search_books.png")
+        run_report.screenshot(driver, "error_search_books.png")
+    finally:
+        driver_pool.release(driver)
+
+def clear_history(conn):
+    with conn.cursor() as cur:
+        # Cascades to the loans and requests, and from them to member_loans and member_requests
+        cur.execute("DELETE FROM books WHERE isbn LIKE %s", (f"{HISTORY_ISBN_PREFIX}%",))
+    conn.commit()
+
+def seed_history(conn, loans):
+    """Give the member `loans` returned loans over the last few years, some late with a paid fine.
+    Returns the member's total number of loans."""
+    clear_history(conn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT id FROM profiles WHERE email = %s", (CREDENTIALS["member"][0],))
+        user_id = cur.fetchone()[0]
+        cur.execute(
+            "INSERT INTO books (isbn, title, author, genre, total_copies, available_copies, location) "
+            "SELECT %s || n, 'History Book ' || n, 'Bench Author ' || n %% 50, 'Other', 1, 1, 'Shelf H' || n %% 20 "
+            "FROM generate_series(1, %s) AS n",
+            (HISTORY_ISBN_PREFIX, HISTORY_BOOKS),
+        )
+        # One statement, so the read model triggers run once for the whole history
+        cur.execute(
+            """
+            INSERT INTO transactions (book_id, user_id, issue_date, due_date, return_date, status, fine_amount, fine_paid)
+            SELECT
+              b.id, %s, l.issue_date, l.issue_date + INTERVAL '14 days', l.issue_date + l.kept * INTERVAL '1 day',
+              CASE WHEN l.kept > 14 THEN 'overdue' ELSE 'returned' END, GREATEST(l.kept - 14, 0) * 10, TRUE
+            FROM (
+              SELECT n, NOW() - INTERVAL '30 days' - n * INTERVAL '5 hours' AS issue_date, (n * 7) %% 21 AS kept
+              FROM generate_series(0, %s - 1) AS n
+            ) l
+            JOIN (
+              SELECT id, row_number() OVER (ORDER BY isbn) - 1 AS k FROM books WHERE isbn LIKE %s
+            ) b ON b.k = l.n %% %s
+            """,
+            (user_id, loans, f"{HISTORY_ISBN_PREFIX}%", HISTORY_BOOKS),
+        )
+        cur.execute(
+            """
+            INSERT INTO borrow_requests (book_id, user_id, request_date, requested_due_date, status, reviewed_at, rejection_reason)
+            SELECT
+              t.book_id, t.user_id, t.issue_date - INTERVAL '1 day', t.due_date,
+              CASE WHEN t.n %% 2 = 0 THEN 'approved' ELSE 'rejected' END, t.issue_date,
+              CASE WHEN t.n %% 2 = 1 THEN 'No copies left' END
+            FROM (
+              SELECT t.*, row_number() OVER (ORDER BY t.issue_date) AS n
+              FROM transactions t JOIN books b ON b.id = t.book_id
+              WHERE t.user_id = %s AND b.isbn LIKE %s
+            ) t
+            WHERE t.n %% 10 = 0
+            """,
+            (user_id, f"{HISTORY_ISBN_PREFIX}%"),
+        )
+        cur.execute("SELECT COUNT(*) FROM transactions WHERE user_id = %s", (user_id,))
+        total = cur.fetchone()[0]
+    conn.commit()
+    return total
+
+def test_member_pages_with_long_history():
+    """Test the member pages stay fast for a member with thousands of past loans"""
+    driver = driver_pool.acquire()
+    conn = None
+    
+    try:
+        print("Testing member pages with a long loan history...")
+        expected_loans = None
+        if os.environ.get("LMS_DATABASE_URL") or os.environ.get("DATABASE_URL"):
+            conn = db.connect()
+            expected_loans = seed_history(conn, HISTORY_LOANS)
+            print(f"  Seeded {HISTORY_LOANS} past loans ({expected_loans} in total)")
+        else:
+            print("  LMS_DATABASE_URL not set, timing the member's existing history")
+        
+        login_as_member(driver)
+        readiness.wait_for_page(driver)
+        
+        slow = []
+        for route, field in HISTORY_ROUTES.items():
+            records = page_timing.sample(driver, route, HISTORY_SAMPLES)
+            try:
+                median = perf_budget.assert_within_budget(records, route, field)
+                print(f"  {route}: {field} median {median:.0f}ms over {len(records)} loads")
+            except AssertionError as e:
+                slow.append(str(e))
+            
+            # The whole history is listed, and the dashboard counts all of it
+            if route == "/member/history" and expected_loans is not None:
+                rows = driver.execute_script("return document.querySelectorAll('tbody tr').length")
+                assert rows == expected_loans, f"/member/history lists {rows} loans, expected {expected_loans}"
+            if route == "/member" and expected_loans is not None:
+                total = readiness.stat_value(driver, "Total Borrowed")
+                assert total == str(expected_loans), f"Total Borrowed shows {total}, expected {expected_loans}"
+        assert not slow, "; ".join(slow)
+        
+        print("✅ Member pages fast with a long history")
+        
+    except Exception as e:
+        print(f"❌ Long history test failed: {e}")
+        run_report.screenshot(driver, "error_member_long_history.png")
     finally:
-        driver.quit()
+        if conn is not None:
+            clear_history(conn)
+            conn.close()
+        driver_pool.release(driver)
 
 def test_view_fines():
     """Test viewing fines page"""
-    driver = get_driver()
-    wait = WebDriverWait(driver, 15)
+    driver = driver_pool.acquire()
     
     try:
         print("Testing fines page...")
-        login_as_member(driver)
-        
-        driver.get(f"{BASE_URL}/member/fines")
+        login_as_member(driver, "/member/fines")
         
-        wait.until(EC.presence_of_element_located((By.TAG_NAME, "h1")))
+        readiness.wait_for_page(driver)
         
         assert "/member/fines" in driver.current_url
         print(f"  On correct page: {driver.current_url}")
@@ -179,10 +375,9 @@ def test_view_fines():
         
     except Exception as e:
         print(f"❌ Fines page test failed: {e}")
-        driver.save_screenshot("error_fines.png")
-        print(f"  Screenshot saved to error_fines.png")
+        run_report.screenshot(driver, "error_fines.png")
     finally:
-        driver.quit()
+        driver_pool.release(driver)
 
 if __name__ == "__main__":
     print("\n=== Running Member Tests ===\n")
@@ -191,4 +386,5 @@ if __name__ == "__main__":
     test_my_books()
     test_search_books()
     test_view_fines()
+    test_member_pages_with_long_history()
     print("\n=== Tests Complete ===\n")
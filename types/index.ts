@@ -68,6 +68,7 @@ export interface Reservation {
   expiry_date?: string;
   fulfilled_date?: string;
   queue_position?: number;
+  queue_ticket?: number;
   created_at: string;
   updated_at: string;
   // Joined data
@@ -110,6 +111,39 @@ export interface BorrowRequest {
   reviewed_by_profile?: Profile;
 }
 
+// Read models behind the member pages: one row per loan / request with the book columns they render
+export interface MemberLoan {
+  id: string;
+  user_id: string;
+  book_id: string;
+  title: string;
+  author: string;
+  genre: string;
+  isbn: string;
+  location?: string;
+  issue_date: string;
+  due_date: string;
+  return_date?: string;
+  status: TransactionStatus;
+  fine_amount: number;
+  fine_paid: boolean;
+}
+
+export interface MemberRequest {
+  id: string;
+  user_id: string;
+  book_id: string;
+  title: string;
+  author: string;
+  request_date: string;
+  requested_due_date: string;
+  status: BorrowRequestStatus;
+  reviewed_by?: string;
+  reviewer_name?: string;
+  reviewed_at?: string;
+  rejection_reason?: string;
+}
+
 // Form Types
 export interface LoginFormData {
   email: string;
@@ -156,6 +190,15 @@ export interface DashboardStats {
   totalReservations: number;
 }
 
+// Catalogue read cache counters (lib/cache.ts)
+export interface CacheStats {
+  hits: number;
+  misses: number;
+  invalidations: number;
+  entries: number;
+  hitRate: number;
+}
+
 // API Response Types
 export interface ApiResponse<T = unknown> {
   success: boolean;
@@ -173,14 +216,13 @@ export interface BookFilters {
 }
 
 export interface PaginationParams {
-  page: number;
-  limit: number;
+  cursor?: string | null;
+  limit?: number;
+  count?: 'exact' | 'planned' | 'estimated';
 }
 
 export interface PaginatedResponse<T> {
   data: T[];
-  total: number;
-  page: number;
-  limit: number;
-  totalPages: number;
+  nextCursor: string | null;
+  total: number | null;
 }